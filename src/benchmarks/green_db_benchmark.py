@@ -0,0 +1,98 @@
+'''
+Benchmark of request latency in an eventlet worker while a slow PostgreSQL
+query is running, with and without cooperative psycopg2 wait callbacks.
+
+Usage:
+    DATABASE_URL=postgresql://... python3 src/benchmarks/green_db_benchmark.py
+'''
+
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import eventlet
+
+from slackr import APP, IS_POSTGRES, db
+from slackr.controllers import auth, channels
+from slackr.utils.green_db import make_psycopg2_blocking, make_psycopg2_green
+
+SLOW_QUERY_SECONDS = 2
+CLIENTS = 10
+REQUESTS_PER_CLIENT = 20
+THINK_TIME = 0.1
+
+
+def slow_query():
+    ''' Hold a connection on the server for SLOW_QUERY_SECONDS '''
+    with db.engine.connect() as conn:
+        conn.execute(db.text('SELECT pg_sleep(:seconds)'),
+                     seconds=SLOW_QUERY_SECONDS)
+
+
+def client(token, latencies):
+    ''' Poll a cheap endpoint on a fixed schedule and record the latency of
+    each request, measured from when it was due so that time spent waiting
+    on a blocked hub is counted '''
+    test_client = APP.test_client()
+    start = time.monotonic()
+    for i in range(REQUESTS_PER_CLIENT):
+        due = start + i * THINK_TIME
+        eventlet.sleep(max(0, due - time.monotonic()))
+        test_client.get('/channels/listall', query_string={'token': token})
+        latencies.append(time.monotonic() - due)
+
+
+def run(token):
+    ''' Run the clients concurrently with one slow query
+
+    Returns (list):
+        Latency of every request in seconds
+    '''
+    latencies = []
+    pool = eventlet.GreenPool()
+
+    for _ in range(CLIENTS):
+        pool.spawn(client, token, latencies)
+
+    # Let the clients get going before the slow query starts
+    eventlet.sleep(THINK_TIME)
+    pool.spawn(slow_query)
+    pool.waitall()
+
+    return latencies
+
+
+def report(name, latencies):
+    ''' Print a summary of the recorded latencies '''
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f'{name:<10} requests={len(latencies):<5} '
+          f'p50={statistics.median(latencies) * 1000:8.1f}ms '
+          f'p95={p95 * 1000:8.1f}ms '
+          f'max={latencies[-1] * 1000:8.1f}ms')
+
+
+def main():
+    if not IS_POSTGRES:
+        sys.exit('DATABASE_URL must point at a PostgreSQL database')
+
+    db.create_all()
+
+    user = auth.auth_register(f'{uuid.uuid4().hex[:12]}@benchmark.com',
+                              'password', 'Bench', 'Mark')
+    channels.channels_create(user['token'], 'Benchmark', True)
+    db.session.remove()
+
+    make_psycopg2_blocking()
+    report('blocking', run(user['token']))
+
+    make_psycopg2_green()
+    report('green', run(user['token']))
+
+
+if __name__ == '__main__':
+    main()
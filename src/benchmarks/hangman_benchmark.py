@@ -0,0 +1,89 @@
+'''
+Benchmark of hangman guesses per second over many concurrent games, with the
+state written behind by the engine and written after every guess.
+
+Usage:
+    DATABASE_URL=... python3 src/benchmarks/hangman_benchmark.py
+'''
+
+import os
+import string
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import eventlet
+
+from slackr import db
+from slackr.controllers import auth, channels
+from slackr.hangman_engine import HANGMAN_ENGINE
+
+GAMES = 50
+PLAYERS_PER_GAME = 4
+GUESSES_PER_PLAYER = 5
+
+
+def player(channel_id, letters, flush):
+    ''' Guess each letter in turn, ignoring games that have ended '''
+    for letter in letters:
+        try:
+            HANGMAN_ENGINE.guess(channel_id, letter)
+        except Exception:  # pylint: disable=broad-except
+            continue
+        if flush:
+            HANGMAN_ENGINE.flush()
+    db.session.remove()
+
+
+def run(channel_ids, flush):
+    ''' Start a game in every channel and play them concurrently
+
+    Returns (tuple):
+        Number of guesses made and the seconds they took
+    '''
+    HANGMAN_ENGINE.clear()
+    for channel_id in channel_ids:
+        HANGMAN_ENGINE.start(channel_id)
+    db.session.remove()
+
+    pool = eventlet.GreenPool()
+    start = time.monotonic()
+    for channel_id in channel_ids:
+        for i in range(PLAYERS_PER_GAME):
+            offset = i * GUESSES_PER_PLAYER
+            pool.spawn(player, channel_id,
+                       string.ascii_lowercase[offset:offset +
+                                              GUESSES_PER_PLAYER], flush)
+    pool.waitall()
+    HANGMAN_ENGINE.flush()
+    elapsed = time.monotonic() - start
+
+    return len(channel_ids) * PLAYERS_PER_GAME * GUESSES_PER_PLAYER, elapsed
+
+
+def report(name, guesses, elapsed):
+    ''' Print the rate of guesses '''
+    print(f'{name:<14} guesses={guesses:<6} '
+          f'time={elapsed * 1000:8.1f}ms '
+          f'rate={guesses / elapsed:10.1f}/s')
+
+
+def main():
+    db.create_all()
+
+    user = auth.auth_register(f'{uuid.uuid4().hex[:12]}@benchmark.com',
+                              'password', 'Bench', 'Mark')
+    channel_ids = [
+        channels.channels_create(user['token'], f'Hangman {i}',
+                                 True)['channel_id'] for i in range(GAMES)
+    ]
+    db.session.remove()
+
+    report('write-through', *run(channel_ids, flush=True))
+    report('write-behind', *run(channel_ids, flush=False))
+
+
+if __name__ == '__main__':
+    main()
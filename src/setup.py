@@ -1,7 +1,9 @@
-from slackr import db
+from slackr import db, message_search, migrations
 from slackr.models.user import User
 from slackr.utils.bot_loader import load_hangman_bot
 
 db.create_all()
+migrations.migrate()
+message_search.install()
 
 load_hangman_bot()
\ No newline at end of file
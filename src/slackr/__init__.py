@@ -11,6 +11,12 @@ from slackr.utils.constants import DATABASE_URL, SECRET_KEY
 
 eventlet.monkey_patch()
 
+IS_POSTGRES = DATABASE_URL.startswith(('postgres://', 'postgresql'))
+
+if IS_POSTGRES:
+    from slackr.utils.green_db import engine_options, make_psycopg2_green
+    make_psycopg2_green()
+
 
 def default_handler(err):
     '''Default handler for errors'''
@@ -33,6 +39,8 @@ APP.register_error_handler(Exception, default_handler)
 
 APP.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
 APP.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+if IS_POSTGRES:
+    APP.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options()
 db = SQLAlchemy(APP)
 
 APP.config['SECRET_KEY'] = SECRET_KEY
@@ -54,11 +62,13 @@ def handle_leave(data):
 from slackr.sockets import message_socket
 from slackr.sockets import channel_socket
 from slackr.sockets import admin_socket
+from slackr.sockets import bootstrap_socket
 from slackr.sockets import hangman_socket
 from slackr.sockets import standup_socket
 
 from slackr.routes.admin_route import ADMIN_ROUTE
 from slackr.routes.auth_route import AUTH_ROUTE
+from slackr.routes.bootstrap_route import BOOTSTRAP_ROUTE
 from slackr.routes.channel_route import CHANNEL_ROUTE
 from slackr.routes.channels_route import CHANNELS_ROUTE
 from slackr.routes.hangman_route import HANGMAN_ROUTE
@@ -71,6 +81,7 @@ from slackr.routes.workspace_route import WORKSPACE_ROUTE
 
 APP.register_blueprint(ADMIN_ROUTE)
 APP.register_blueprint(AUTH_ROUTE)
+APP.register_blueprint(BOOTSTRAP_ROUTE)
 APP.register_blueprint(CHANNEL_ROUTE)
 APP.register_blueprint(CHANNELS_ROUTE)
 APP.register_blueprint(HANGMAN_ROUTE)
@@ -80,3 +91,21 @@ APP.register_blueprint(OTHER_ROUTE)
 APP.register_blueprint(STANDUP_ROUTE)
 APP.register_blueprint(USER_ROUTE)
 APP.register_blueprint(WORKSPACE_ROUTE)
+
+from slackr.message_scheduler import SCHEDULER
+from slackr.token_revocation import REVOCATIONS
+
+SCHEDULER.start()
+REVOCATIONS.start()
+
+from slackr.bots import BOTS
+from slackr.channel_purger import PURGER
+from slackr.hangman_engine import HANGMAN_ENGINE
+
+BOTS.start()
+PURGER.start()
+HANGMAN_ENGINE.start_writer()
+
+from slackr.word_bank import WORD_BANK
+
+WORD_BANK.start_refresh()
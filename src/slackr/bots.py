@@ -0,0 +1,129 @@
+'''
+Bots that answer events in channels, such as a hangman guess. A bot
+registers a handler for an event under its u_id, and the handler returns the
+text of its reply, which is posted as the bot with message.post_message, so
+no token is minted or decoded for it.
+
+Dispatched events are run by a fixed number of worker threads, each with a
+bounded queue, so the socket handler that raised an event returns straight
+away. The events of a channel always go to the same worker, and are
+answered in the order they were dispatched.
+'''
+
+import queue
+import threading
+import traceback
+
+from werkzeug.exceptions import HTTPException
+
+from slackr import db
+from slackr.controllers import message
+from slackr.error import InputError
+from slackr.utils.constants import BOT_QUEUE_SIZE, BOT_WORKERS
+
+
+class BotDispatcher:
+    ''' Handlers of bots by event, and the workers that run them '''
+    def __init__(self, workers=BOT_WORKERS, queue_size=BOT_QUEUE_SIZE):
+        self._handlers = {}
+        self._queues = [queue.Queue(queue_size) for _ in range(workers)]
+        self._lock = threading.Lock()
+        self._threads = None
+
+    def register(self, event, u_id, handler):
+        ''' Register a bot's handler for an event
+
+        Parameters:
+            event (str): Name of the event, e.g. 'hangman_guess'
+            u_id (int): The bot's u_id, usually one of RESERVED_UID
+            handler (function): Called with the channel_id and payload of the
+                                event, returns the text of the reply or None
+
+        '''
+        self._handlers.setdefault(event, []).append((u_id, handler))
+
+    def on(self, event, u_id):
+        ''' Decorator form of register '''
+        def decorator(handler):
+            self.register(event, u_id, handler)
+            return handler
+
+        return decorator
+
+    def run(self, event, channel_id, payload=None):
+        ''' Answer an event straight away. Errors raised by a handler are
+        raised to the caller.
+
+        Parameters:
+            event (str): Name of the event
+            channel_id (int): ID of the channel it happened in
+            payload (dict): Anything the handlers need to know about it
+
+        Returns:
+            (list): Details of every reply posted, see message_send
+
+        '''
+        replies = []
+        for u_id, handler in self._handlers.get(event, ()):
+            text = handler(channel_id, payload or {})
+            if text is not None:
+                replies.append(message.post_message(u_id, channel_id, text))
+        return replies
+
+    def dispatch(self, event, channel_id, payload=None, callback=None):
+        ''' Queue an event to be answered by a worker. A reply that a handler
+        rejects with an InputError or AccessError is dropped.
+
+        Parameters:
+            event (str): Name of the event
+            channel_id (int): ID of the channel it happened in
+            payload (dict): Anything the handlers need to know about it
+            callback (function): Called with the channel ID and the details
+                                 of each reply
+
+        '''
+        if event not in self._handlers:
+            return
+
+        worker = self._queues[channel_id % len(self._queues)]
+        try:
+            worker.put_nowait((event, channel_id, payload, callback))
+        except queue.Full:
+            raise InputError(
+                description='Bots are busy, please try again later')
+
+    def join(self):
+        ''' Wait until every queued event has been answered '''
+        for worker in self._queues:
+            worker.join()
+
+    def start(self):
+        ''' Start the worker threads '''
+        with self._lock:
+            if self._threads is not None:
+                return
+            self._threads = [
+                threading.Thread(target=self._work, args=[worker], daemon=True)
+                for worker in self._queues
+            ]
+        for thread in self._threads:
+            thread.start()
+
+    def _work(self, worker):
+        while True:
+            event, channel_id, payload, callback = worker.get()
+            try:
+                for reply in self.run(event, channel_id, payload):
+                    if callback is not None:
+                        callback(channel_id, reply)
+            except HTTPException:
+                db.session.rollback()
+            except Exception:  # pylint: disable=broad-except
+                traceback.print_exc()
+                db.session.rollback()
+            finally:
+                db.session.remove()
+                worker.task_done()
+
+
+BOTS = BotDispatcher()
@@ -0,0 +1,186 @@
+'''
+Per-channel feed of changes to messages, so a client that reconnects can
+fetch what changed since it last synced instead of every page again.
+
+Each channel counts its changes in channel.change_seq, and message_change
+keeps one row per message holding the sequence number of its latest send,
+edit, react, pin or removal. Removed messages are kept as tombstones. A sync
+is then one range scan of the (channel_id, seq) index.
+
+Changes are collected from the session as they are flushed and written just
+before the transaction commits. Bumping change_seq locks the channel's row
+until then, so sequence numbers are handed out in commit order.
+'''
+
+from sqlalchemy.orm import Query
+
+from slackr import db
+from slackr.models import user_react_identifier
+from slackr.models.channel import Channel
+from slackr.models.message import Message
+from slackr.models.message_change import MessageChange
+from slackr.models.react import React
+
+
+def changes(channel_id, since, user):
+    ''' Get the messages of a channel that changed after a sequence number
+
+    Parameters:
+        channel_id (int): ID of the channel
+        since (int): Sequence number the client has synced up to
+        user (obj): The user viewing the messages
+
+    Returns (dict):
+        messages (list): Details of the changed messages, oldest first
+        removed (list): IDs of the removed messages
+        seq (int): Sequence number to sync from next time
+
+    '''
+    rows = MessageChange.query.filter(
+        MessageChange.channel_id == channel_id,
+        MessageChange.seq > since).order_by(MessageChange.seq,
+                                            MessageChange.message_id).all()
+
+    changed = [row.message_id for row in rows if not row.is_removed]
+    messages = Message.query.filter(
+        Message.message_id.in_(changed),
+        Message.is_hidden.is_(False)).order_by(
+            Message.time_created,
+            Message.message_id).all() if changed else []
+
+    return {
+        'messages': Message.details_batch(messages, user),
+        'removed': [row.message_id for row in rows if row.is_removed],
+        # Taken from the rows themselves, as a later commit may already have
+        # moved change_seq past what the scan saw
+        'seq': rows[-1].seq if rows else since
+    }
+
+
+def record_reacts_of(user):
+    ''' Record a change to every message a user has reacted to, before their
+    reacts are deleted with set-based statements
+
+    Parameters:
+        user (obj): A user object
+
+    '''
+    reactors = user_react_identifier.c
+    rows = db.session.query(Message.channel_id, Message.message_id).join(
+        React, React.message_id == Message.message_id).join(
+            user_react_identifier, reactors.id == React.id).filter(
+                reactors.u_id == user.u_id).distinct()
+
+    for channel_id, message_id in rows:
+        _record(db.session, channel_id, message_id, False)
+
+
+def _pending(session):
+    return session.info.setdefault('message_changes', {})
+
+
+def _record(session, channel_id, message_id, is_removed):
+    changed = _pending(session).setdefault(channel_id, {})
+    changed[message_id] = changed.get(message_id, False) or is_removed
+
+
+def _record_flush(session, flush_context):
+    for target in session.new | session.dirty | session.deleted:
+        if isinstance(target, Message):
+            is_removed = target in session.deleted
+            # Scheduled messages are recorded when they are revealed
+            if target.is_hidden and not is_removed:
+                continue
+            _record(session, target.channel_id, target.message_id,
+                    is_removed)
+        elif isinstance(target, React) and target.message is not None:
+            _record(session, target.message.channel_id, target.message_id,
+                    False)
+
+
+def _record_bulk_update(query, update_context):
+    # Messages are only updated in bulk when scheduled sends are revealed
+    if query.column_descriptions[0]['entity'] is not Message:
+        return
+
+    for channel_id, message_id in query.with_entities(Message.channel_id,
+                                                      Message.message_id):
+        _record(query.session, channel_id, message_id, False)
+
+
+def _record_bulk_delete(query, delete_context):
+    if query.column_descriptions[0]['entity'] is not Message:
+        return
+
+    for channel_id, message_id in query.with_entities(Message.channel_id,
+                                                      Message.message_id):
+        _record(query.session, channel_id, message_id, True)
+
+
+def _write_pending(session):
+    # Changes still in the session are recorded as they are flushed
+    session.flush()
+
+    pending = session.info.pop('message_changes', None)
+    if not pending:
+        return
+
+    table = MessageChange.__table__
+
+    # Channels are locked in order, so transactions that touch several
+    # channels cannot deadlock
+    for channel_id in sorted(pending):
+        changed = pending[channel_id]
+        bumped = session.execute(Channel.__table__.update().where(
+            Channel.channel_id == channel_id).values(
+                change_seq=Channel.change_seq + 1))
+        # The channel was deleted in this transaction
+        if not bumped.rowcount:
+            continue
+
+        seq = session.execute(
+            db.select([Channel.change_seq
+                       ]).where(Channel.channel_id == channel_id)).scalar()
+        # Read by the history cache once the transaction commits
+        session.info.setdefault('change_seqs', {})[channel_id] = seq
+
+        existing = {
+            message_id
+            for message_id, in session.execute(
+                db.select([table.c.message_id]).where(
+                    table.c.message_id.in_(list(changed))))
+        }
+
+        for is_removed in (False, True):
+            message_ids = [
+                message_id for message_id in existing
+                if changed[message_id] is is_removed
+            ]
+            if message_ids:
+                session.execute(table.update().where(
+                    table.c.message_id.in_(message_ids)).values(
+                        channel_id=channel_id,
+                        seq=seq,
+                        is_removed=is_removed))
+
+        missing = [{
+            'message_id': message_id,
+            'channel_id': channel_id,
+            'seq': seq,
+            'is_removed': is_removed
+        } for message_id, is_removed in changed.items()
+                   if message_id not in existing]
+        if missing:
+            session.execute(table.insert(), missing)
+
+
+def _discard_pending(session, previous_transaction):
+    session.info.pop('message_changes', None)
+    session.info.pop('change_seqs', None)
+
+
+db.event.listen(db.session, 'after_flush', _record_flush)
+db.event.listen(Query, 'before_compile_update', _record_bulk_update)
+db.event.listen(Query, 'before_compile_delete', _record_bulk_delete)
+db.event.listen(db.session, 'before_commit', _write_pending)
+db.event.listen(db.session, 'after_soft_rollback', _discard_pending)
@@ -0,0 +1,193 @@
+'''
+Background purge of deleted channels and removed users that have too many
+messages to delete within a request. channels_delete and admin_user_remove
+detach such a channel or user, so it disappears straight away, and record a
+job in the channel_purge or user_purge table. A thread per worker then
+deletes the messages a chunk per transaction, so no single statement holds
+locks on all of them, and pending jobs survive a restart.
+'''
+
+import threading
+import traceback
+
+from slackr import db
+from slackr.models.channel import Channel
+from slackr.models.channel_purge import ChannelPurge
+from slackr.models.message import Message
+from slackr.models.user import User
+from slackr.models.user_purge import UserPurge
+from slackr.utils.constants import PURGE_CHUNK_SIZE, PURGE_RELOAD_INTERVAL
+
+
+class ChannelPurger:
+    ''' Deletes detached channels and users and their messages in the
+    background.
+
+    Every statement of a purge is safe to repeat, so workers that share a
+    database may pick up the same job without harm. Each worker checks the
+    table periodically, which picks up jobs left by a worker that has since
+    gone away.
+    '''
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._pending = False
+        self._thread = None
+
+    @staticmethod
+    def needs_purge(messages):
+        ''' Whether there are too many messages to delete within a request
+
+        Parameters:
+            messages (obj): A query over the messages, e.g. channel.messages
+
+        Returns:
+            (bool): Whether the messages should be purged in the background
+
+        '''
+        return db.session.query(
+            messages.offset(PURGE_CHUNK_SIZE).exists()).scalar()
+
+    def enqueue(self, channel):
+        ''' Detach a channel and queue it to be purged
+
+        Parameters:
+            channel (obj): A channel object
+
+        '''
+        channel.detach()
+        db.session.add(ChannelPurge(channel.channel_id))
+        db.session.commit()
+        self._notify()
+
+    def enqueue_user(self, user):
+        ''' Detach a user and queue them to be purged
+
+        Parameters:
+            user (obj): A user object
+
+        '''
+        user.detach()
+        db.session.add(UserPurge(user.u_id))
+        db.session.commit()
+        self._notify()
+
+    def start(self):
+        ''' Start the purge thread, which picks up pending jobs '''
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def purge_pending(self):
+        ''' Purge every channel and user that is queued
+
+        Returns:
+            (int): The number of channels and users purged by this worker
+
+        '''
+        # The tables do not exist yet when starting against a fresh database
+        if not all(
+                db.engine.dialect.has_table(db.engine, model.__tablename__)
+                for model in (ChannelPurge, UserPurge)):
+            return 0
+
+        channel_ids = [
+            channel_id for channel_id, in db.session.query(
+                ChannelPurge.channel_id).order_by(ChannelPurge.id)
+        ]
+        u_ids = [
+            u_id for u_id, in db.session.query(UserPurge.u_id).order_by(
+                UserPurge.id)
+        ]
+        db.session.commit()
+
+        for channel_id in channel_ids:
+            self.purge(channel_id)
+
+        for u_id in u_ids:
+            self.purge_user(u_id)
+
+        return len(channel_ids) + len(u_ids)
+
+    @classmethod
+    def purge(cls, channel_id):
+        ''' Delete a channel's messages a chunk per transaction, then the
+        channel itself
+
+        Parameters:
+            channel_id (int): ID of the channel
+
+        '''
+        cls._delete_messages(Message.channel_id == channel_id)
+
+        channel = Channel.query.get(channel_id)
+        if channel is not None:
+            channel.delete_all()
+
+        ChannelPurge.query.filter_by(channel_id=channel_id).delete(
+            synchronize_session=False)
+        db.session.commit()
+
+    @classmethod
+    def purge_user(cls, u_id):
+        ''' Delete a user's messages a chunk per transaction, then the user
+        themselves
+
+        Parameters:
+            u_id (int): User ID
+
+        '''
+        cls._delete_messages(Message.u_id == u_id)
+
+        user = User.query.get(u_id)
+        if user is not None:
+            user.delete_all()
+
+        UserPurge.query.filter_by(u_id=u_id).delete(
+            synchronize_session=False)
+        db.session.commit()
+
+    @staticmethod
+    def _delete_messages(criterion):
+        while True:
+            message_ids = [
+                message_id for message_id, in db.session.query(
+                    Message.message_id).filter(criterion).limit(
+                        PURGE_CHUNK_SIZE)
+            ]
+
+            if not message_ids:
+                break
+
+            Message.bulk_delete(Message.message_id.in_(message_ids))
+            db.session.commit()
+
+    def _notify(self):
+        with self._condition:
+            self._pending = True
+            self._condition.notify()
+
+    def _wait(self, timeout):
+        with self._condition:
+            if not self._pending:
+                self._condition.wait(timeout)
+            self._pending = False
+
+    def _run(self):
+        while True:
+            self._run_safely(self.purge_pending)
+            self._wait(PURGE_RELOAD_INTERVAL)
+
+    @staticmethod
+    def _run_safely(func):
+        try:
+            func()
+        except Exception:  # pylint: disable=broad-except
+            traceback.print_exc()
+            db.session.rollback()
+        finally:
+            db.session.remove()
+
+
+PURGER = ChannelPurger()
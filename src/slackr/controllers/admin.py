@@ -4,9 +4,12 @@ allow admins to change user permissions and delete users.
 '''
 
 from slackr.error import AccessError, InputError
-from slackr.token_validation import decode_token
+from slackr.token_validation import authenticate, forget_user
 from slackr.models.user import User
-from slackr import db
+from slackr import change_feed, db, permissions, versions
+from slackr.channel_purger import PURGER
+from slackr.history_cache import HISTORY_CACHE
+from slackr.roster_cache import ROSTER_CACHE
 from slackr.utils.constants import PERMISSIONS
 
 
@@ -14,9 +17,7 @@ def admin_is_admin(token):
     if None in {token}:
         raise InputError(description='Insufficient parameters')
 
-    token_payload = decode_token(token)
-    u_id = token_payload['u_id']
-    user = User.query.get(u_id)
+    user = authenticate(token).user
 
     if user is None:
         raise InputError(description='u_id does not refer to a valid user')
@@ -40,11 +41,9 @@ def admin_userpermission_change(token, u_id, permission_id):
     if None in {token, u_id, permission_id}:
         raise InputError(description='Insufficient parameters')
 
-    token_payload = decode_token(token)
-    admin_u_id = token_payload['u_id']
-
-    admin = User.query.get(admin_u_id)
-    user = User.query.get(u_id)
+    admin = authenticate(token).user
+    admin_u_id = admin.u_id
+    user = User.find(u_id)
 
     if user is None:
         raise InputError(description='u_id does not refer to a valid user')
@@ -56,18 +55,21 @@ def admin_userpermission_change(token, u_id, permission_id):
     if admin.permission_id != PERMISSIONS['owner']:
         raise AccessError(description='The authorised user is not an owner')
 
-    admin_users = User.query.filter_by(
-        permission_id=PERMISSIONS['owner']).all()
+    admin_count = User.active().filter_by(
+        permission_id=PERMISSIONS['owner']).count()
 
     if admin_u_id == u_id and \
-        len(admin_users) == 1 and permission_id == PERMISSIONS['member']:
+        admin_count == 1 and permission_id == PERMISSIONS['member']:
         raise InputError(
             description=
             'You must assign another user to be an admin before becoming a member'
         )
 
     user.permission_id = permission_id
+    versions.bump('users')
     db.session.commit()
+    forget_user(user.u_id)
+    permissions.forget()
 
     return {'u_id': user.u_id, 'permission_id': permission_id}
 
@@ -87,11 +89,8 @@ def admin_user_remove(token, u_id):
     if None in {token, u_id}:
         raise InputError(description='Insufficient parameters')
 
-    token_payload = decode_token(token)
-    admin_u_id = token_payload['u_id']
-
-    admin = User.query.get(admin_u_id)
-    target_user = User.query.get(u_id)
+    admin = authenticate(token).user
+    target_user = User.find(u_id)
 
     if target_user is None:
         raise InputError(description='u_id does not refer to a valid user')
@@ -99,19 +98,31 @@ def admin_user_remove(token, u_id):
     if admin.permission_id != PERMISSIONS['owner']:
         raise AccessError(description='The authorised user is not an owner')
 
-    admin_users = User.query.filter_by(
-        permission_id=PERMISSIONS['owner']).all()
+    admin_count = User.active().filter_by(
+        permission_id=PERMISSIONS['owner']).count()
 
-    if admin.u_id == u_id and len(admin_users) == 1:
+    if admin.u_id == u_id and admin_count == 1:
         raise InputError(
             description=
             'You must assign another user to be an admin before removing yourself'
         )
 
-    target_user.delete_all()
-
-    db.session.delete(target_user)
-    db.session.commit()
+    # Their reacts are deleted without going through the session
+    change_feed.record_reacts_of(target_user)
+    versions.bump('users')
+    ROSTER_CACHE.user_removed(versions.bump('profiles'), target_user)
+
+    # Users with many messages are detached now and their messages purged
+    # in the background
+    if PURGER.needs_purge(target_user.messages):
+        PURGER.enqueue_user(target_user)
+    else:
+        target_user.delete_all()
+        db.session.commit()
+    forget_user(u_id)
+    # Their reacts are gone from messages in every channel
+    HISTORY_CACHE.clear()
+    permissions.forget()
 
     return {'u_id': u_id}
 
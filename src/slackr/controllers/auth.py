@@ -7,12 +7,13 @@ import math
 import smtplib
 from email.message import EmailMessage
 
-from slackr import db, helpers
+from slackr import db, helpers, versions
 from slackr.email_validation import invalid_email
 from slackr.error import InputError
-from slackr.models.expired_token import ExpiredToken
 from slackr.models.user import User
-from slackr.token_validation import decode_token, encode_token
+from slackr.token_revocation import REVOCATIONS
+from slackr.token_validation import (authenticate, encode_token, forget_token,
+                                     token_id)
 from slackr.utils.constants import PERMISSIONS, RESERVED_UID
 
 
@@ -60,13 +61,12 @@ def auth_register(email, password, name_first, name_last):
     handle = generate_handle(name_first, name_last)
     user = User(email, password, name_first, name_last, handle)
 
-    if len(
-            list(
-                filter(lambda u_id: u_id not in RESERVED_UID.values(),
-                       [user.u_id for user in User.query.all()]))) == 0:
+    if User.query.filter(User.u_id.notin_(
+            RESERVED_UID.values())).count() == 0:
         user.permission_id = PERMISSIONS['owner']
 
     db.session.add(user)
+    versions.bump('users')
     db.session.commit()
 
     return {
@@ -120,12 +120,12 @@ def auth_logout(token):
         raise InputError(
             description='Insufficient parameters. Requires token.')
 
-    decode_token(token)
+    payload = authenticate(token).payload
 
-    db.session.add(ExpiredToken(token))
-    db.session.commit()
+    REVOCATIONS.revoke(token_id(token, payload), payload.get('exp'))
+    forget_token(token)
 
-    is_success = ExpiredToken.query.filter_by(token=token).first() is not None
+    is_success = REVOCATIONS.is_revoked(token_id(token, payload))
 
     return {'is_success': is_success}
 
@@ -0,0 +1,127 @@
+'''
+Functionality to load everything a client shows after logging in with one
+request: the user's profile, their channels with the members and owners of
+each, and the first page of each channel's messages.
+'''
+
+from slackr import db
+from slackr.error import InputError
+from slackr.models import owner_channel_identifier, user_channel_identifier
+from slackr.models.channel import Channel
+from slackr.models.message import Message
+from slackr.models.user import User
+from slackr.token_validation import authenticate
+from slackr.utils.constants import BOOTSTRAP_CHUNK_SIZE, MESSAGE_PAGE_SIZE
+
+
+def bootstrap(token):
+    ''' Load a client session.
+
+    Parameters:
+        token (str): JWT of session.
+
+    Returns (dict):
+        user (dict): the user's profile, see user_profile.
+        channels (list): the user's channels, see bootstrap_sections.
+    '''
+
+    result = {'channels': []}
+    for section in bootstrap_sections(token):
+        result['channels'] += section.pop('channels')
+        result.update(section)
+
+    return result
+
+
+def bootstrap_sections(token):
+    ''' Load a client session in sections, so they can be sent as each is
+    ready. Every section takes the same few queries for up to
+    BOOTSTRAP_CHUNK_SIZE channels.
+
+    Parameters:
+        token (str): JWT of session.
+
+    Yields (dict):
+        user (dict): the user's profile, in the first section only.
+        channels (list):
+            channel_id (int): ID of the channel.
+            name (str): name of the channel.
+            is_public (bool): whether the channel is public.
+            owner_members (list): see channel_details.
+            all_members (list): see channel_details.
+            messages (list): the first page of messages, see
+                             channel_messages.
+            start (int): 0.
+            end (int): see channel_messages.
+    '''
+
+    if token is None:
+        raise InputError(description='Insufficient parameters')
+
+    user = authenticate(token).user
+
+    members = user_channel_identifier.c
+    channels = db.session.query(
+        Channel.channel_id, Channel.name, Channel.is_public).join(
+            user_channel_identifier,
+            members.channel_id == Channel.channel_id).filter(
+                members.u_id == user.u_id).order_by(Channel.channel_id).all()
+
+    yield {'user': user.profile, 'channels': []}
+
+    for i in range(0, len(channels), BOOTSTRAP_CHUNK_SIZE):
+        yield {
+            'channels':
+            _load_channels(channels[i:i + BOOTSTRAP_CHUNK_SIZE], user)
+        }
+
+
+def _load_channels(channels, user):
+    channel_ids = [channel.channel_id for channel in channels]
+
+    all_members = _rosters(user_channel_identifier, channel_ids)
+    owner_members = _rosters(owner_channel_identifier, channel_ids)
+    for roster in all_members.values():
+        roster.sort(key=lambda member: member['name_first'] + member[
+            'name_last'])
+
+    pages = Message.first_pages(channel_ids, MESSAGE_PAGE_SIZE)
+    details = iter(
+        Message.details_batch([
+            message for channel_id in channel_ids
+            for message in pages[channel_id][0]
+        ], user))
+
+    loaded = []
+    for channel in channels:
+        messages, _ = pages[channel.channel_id]
+        loaded.append({
+            'channel_id': channel.channel_id,
+            'name': channel.name,
+            'is_public': channel.is_public,
+            'owner_members': owner_members.get(channel.channel_id, []),
+            'all_members': all_members.get(channel.channel_id, []),
+            'messages': [next(details) for _ in messages],
+            'start': 0,
+            'end':
+            MESSAGE_PAGE_SIZE if len(messages) == MESSAGE_PAGE_SIZE else -1
+        })
+
+    return loaded
+
+
+def _rosters(table, channel_ids):
+    rows = db.session.query(table.c.channel_id, User.u_id, User.name_first,
+                            User.name_last, User.profile_img_url).join(
+                                User, User.u_id == table.c.u_id).filter(
+                                    table.c.channel_id.in_(channel_ids))
+
+    rosters = {}
+    for channel_id, u_id, name_first, name_last, profile_img_url in rows:
+        rosters.setdefault(channel_id, []).append({
+            'u_id': u_id,
+            'name_first': name_first,
+            'name_last': name_last,
+            'profile_img_url': profile_img_url
+        })
+    return rosters
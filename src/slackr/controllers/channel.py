@@ -3,12 +3,16 @@ Functions to provide channel management services to the program. Will allow
 users to join, invite, leave, view details, view messages, and manage owners.
 '''
 
-from slackr import db
+from slackr import change_feed, db, permissions, versions
 from slackr.error import AccessError, InputError
+from slackr.history_cache import HISTORY_CACHE
 from slackr.models.channel import Channel
+from slackr.models.message import Message
 from slackr.models.user import User
-from slackr.token_validation import decode_token
-from slackr.utils.constants import PERMISSIONS
+from slackr.roster_cache import ROSTER_CACHE
+from slackr.token_validation import authenticate
+from slackr.utils.constants import (MEMBERS_PAGE_MAX, MESSAGE_PAGE_MAX,
+                                    MESSAGE_PAGE_SIZE)
 
 
 def channel_invite(token, channel_id, u_id):
@@ -26,10 +30,9 @@ def channel_invite(token, channel_id, u_id):
     if None in {token, channel_id, u_id}:
         raise InputError(description='Insufficient parameters')
 
-    token_data = decode_token(token)
-    inviter = User.query.get(token_data['u_id'])
-    invitee = User.query.get(u_id)
-    channel = Channel.query.get(channel_id)
+    inviter = authenticate(token).user
+    invitee = User.find(u_id)
+    channel = Channel.find(channel_id)
 
     if channel is None:
         raise InputError(description='Channel does not exist')
@@ -37,13 +40,18 @@ def channel_invite(token, channel_id, u_id):
     if invitee is None:
         raise InputError(description='User does not exist')
 
-    if channel.is_member(inviter) is False:
+    if not permissions.resolve(inviter.u_id, channel.channel_id).is_member:
         raise AccessError(
             description='The authorised user is not a member of the channel')
 
-    if channel.is_member(invitee) is False:
+    if not permissions.resolve(invitee.u_id, channel.channel_id).is_member:
         channel.all_members.append(invitee)
+        ROSTER_CACHE.member_added(channel.channel_id,
+                                  versions.bump_channel(channel.channel_id),
+                                  invitee)
+        versions.bump_channel_lists([invitee.u_id])
         db.session.commit()
+        permissions.forget()
 
     return {
         'channel': {
@@ -55,36 +63,64 @@ def channel_invite(token, channel_id, u_id):
     }
 
 
-def channel_details(token, channel_id):
-    ''' Provides relevant data of channel.
+def channel_details(token, channel_id, start=None, limit=None):
+    ''' Provides relevant data of channel. Members are ordered by name, and
+    only a page of them is returned when a limit is given.
 
     Parameters:
         token (str): JWT of session.
         channel_id (int): ID of the channel desired.
+        start (int): number of members to skip.
+        limit (int): number of members in the page.
 
     Returns (dict):
         name (str): Name of channel.
         owner_members (list): list of user IDs of owner members.
-        all_members (list): list of user IDs of all members.
+        all_members (list): list of user IDs of all members, or of the
+                            members in the page.
+        owner_count (int): number of owner members.
+        member_count (int): number of members.
+        start (int): start index of the page, only returned with a limit.
+        end (int): start index of the next page, -1 if none. Only returned
+                   with a limit.
     '''
 
     if None in {token, channel_id}:
         raise InputError(description='Insufficient parameters')
 
-    token_data = decode_token(token)
-    user = User.query.get(int(token_data['u_id']))
-    channel = Channel.query.get(int(channel_id))
+    user = authenticate(token).user
+    channel = Channel.find(int(channel_id))
 
     # if channel doesn't exist.
     if channel is None:
         raise InputError(description='Channel does not exist.')
 
     # if user asking for details is not in the channel.
-    if channel.is_member(user) is False:
+    if not permissions.resolve(user.u_id, channel.channel_id).is_member:
         raise AccessError(
             description='The authorised user is not a member of the channel')
 
-    return channel.details
+    if limit is None:
+        return {'name': channel.name, **ROSTER_CACHE.roster(channel)}
+
+    start = 0 if start is None else int(start)
+    limit = int(limit)
+
+    if start < 0:
+        raise InputError(description='Invalid start value')
+
+    if not 1 <= limit <= MEMBERS_PAGE_MAX:
+        raise InputError(
+            description=f'Limit is not between 1 and {MEMBERS_PAGE_MAX}')
+
+    details = {
+        'name': channel.name,
+        **ROSTER_CACHE.roster(channel, start, limit)
+    }
+    end = start + limit
+    details.update(start=start,
+                   end=end if details['member_count'] > end else -1)
+    return details
 
 
 def channel_messages(token, channel_id, start):
@@ -104,9 +140,8 @@ def channel_messages(token, channel_id, start):
     if None in {token, channel_id, start}:
         raise InputError(description='Insufficient parameters')
 
-    token_data = decode_token(token)
-    user = User.query.get(int(token_data['u_id']))
-    channel = Channel.query.get(int(channel_id))
+    user = authenticate(token).user
+    channel = Channel.find(int(channel_id))
 
     start = int(start)
 
@@ -114,31 +149,150 @@ def channel_messages(token, channel_id, start):
     if channel is None:
         raise InputError(description='Channel does not exist.')
 
-    if start > len(channel.messages) or start < 0:
+    # Offsets count visible messages, while start is checked against all
+    total, visible = db.session.query(
+        db.func.count(Message.message_id),
+        db.func.count(db.case([(Message.is_hidden.is_(False), 1)]))).filter(
+            Message.channel_id == channel.channel_id).one()
+    if start > total or start < 0:
         raise InputError(description='Invalid start value')
 
     # access error when authorized user not a member of channel.
-    if channel.is_member(user) is False:
+    if not permissions.resolve(user.u_id, channel.channel_id).is_member:
         raise AccessError(
             description='The authorised user is not a member of the channel')
 
-    end = start + 50
-
-    sent_messages = [m for m in channel.messages if not m.is_hidden]
-    sent_messages.sort(key=lambda m: m.time_created)
+    messages, _ = HISTORY_CACHE.page(channel, start, MESSAGE_PAGE_SIZE, user,
+                                     visible)
 
-    messages = []
-    for i in range(50):
-        try:
-            message = sent_messages[start + i]
-            messages.append(message.details(user))
-        except IndexError:
-            end = -1
-            break
+    # A full page always has an end, even when nothing follows it
+    end = start + MESSAGE_PAGE_SIZE if len(
+        messages) == MESSAGE_PAGE_SIZE else -1
 
     return {'messages': messages, 'start': start, 'end': end}
 
 
+def channel_history(token, channel_id, before=None, after=None, limit=None):
+    ''' Returns a page of messages relative to a message cursor.
+
+    Parameters:
+        token (str): JWT of session.
+        channel_id (int): ID of channel desired.
+        before (int): Message ID. Returns the messages sent before it.
+        after (int): Message ID. Returns the messages sent after it.
+        limit (int): Number of messages in the page.
+
+    Returns (dict):
+        messages (list): list of messages in chronological order.
+        before (int): cursor of the previous page, -1 if none.
+        after (int): cursor of the next page, -1 if none.
+    '''
+
+    if None in {token, channel_id}:
+        raise InputError(description='Insufficient parameters')
+
+    if None not in {before, after}:
+        raise InputError(description='Cannot page before and after a message')
+
+    user = authenticate(token).user
+    channel = Channel.find(int(channel_id))
+
+    limit = MESSAGE_PAGE_SIZE if limit is None else int(limit)
+
+    # input error if channel doesn't exist.
+    if channel is None:
+        raise InputError(description='Channel does not exist.')
+
+    if not 1 <= limit <= MESSAGE_PAGE_MAX:
+        raise InputError(
+            description=f'Limit is not between 1 and {MESSAGE_PAGE_MAX}')
+
+    # access error when authorized user not a member of channel.
+    if not permissions.resolve(user.u_id, channel.channel_id).is_member:
+        raise AccessError(
+            description='The authorised user is not a member of the channel')
+
+    cursor = before if before is not None else after
+    if cursor is not None:
+        cursor = Message.query.get(int(cursor))
+        if cursor is None or cursor.channel_id != channel.channel_id:
+            raise InputError(description='Invalid message cursor')
+
+    # The newest page is served from the channel's ring buffer
+    if cursor is None:
+        messages, has_older = HISTORY_CACHE.latest(channel, limit, user)
+        return {
+            'messages': messages,
+            'before': messages[0]['message_id'] if has_older else -1,
+            'after': -1
+        }
+
+    if after is not None:
+        page, has_more = Message.history(channel.channel_id,
+                                         after=cursor,
+                                         limit=limit)
+        has_older, has_newer = bool(page), has_more
+    else:
+        page, has_more = Message.history(channel.channel_id,
+                                         before=cursor,
+                                         limit=limit)
+        has_older, has_newer = has_more, bool(page) and cursor is not None
+
+    # An empty page still has the cursor message on the side it came from
+    if not page:
+        return {
+            'messages': [],
+            'before': cursor.message_id if after is not None else -1,
+            'after': cursor.message_id if before is not None else -1
+        }
+
+    return {
+        'messages': Message.details_batch(page, user),
+        'before': page[0].message_id if has_older else -1,
+        'after': page[-1].message_id if has_newer else -1
+    }
+
+
+def channel_changes(token, channel_id, since):
+    ''' Returns the messages that changed after a sequence number, so a
+    client can catch up without fetching every page again.
+
+    Parameters:
+        token (str): JWT of session.
+        channel_id (int): ID of channel desired.
+        since (int): sequence number the client has synced up to, 0 for
+                     everything.
+
+    Returns (dict):
+        messages (list): messages that were sent, edited, reacted to or
+                         pinned, oldest first.
+        removed (list): IDs of messages that were removed.
+        seq (int): sequence number to pass as since next time.
+    '''
+
+    if None in {token, channel_id, since}:
+        raise InputError(description='Insufficient parameters')
+
+    user = authenticate(token).user
+    channel = Channel.find(int(channel_id))
+
+    since = int(since)
+
+    # input error if channel doesn't exist.
+    if channel is None:
+        raise InputError(description='Channel does not exist.')
+
+    if since < 0:
+        raise InputError(description='Invalid sequence number')
+
+    # access error when authorized user not a member of channel.
+    if not permissions.resolve(user.u_id, channel.channel_id).is_member:
+        raise AccessError(
+            description='The authorised user is not a member of the channel')
+
+    return change_feed.changes(channel.channel_id, since, user)
+
+
 def channel_leave(token, channel_id):
     ''' Removes user from channel.
 
@@ -153,26 +307,31 @@ def channel_leave(token, channel_id):
     if None in {token, channel_id}:
         raise InputError(description='Insufficient parameters')
 
-    token_data = decode_token(token)
-    user = User.query.get(int(token_data['u_id']))
-    channel = Channel.query.get(int(channel_id))
+    user = authenticate(token).user
+    channel = Channel.find(int(channel_id))
 
     # input error if channel doesn't exist.
     if channel is None:
         raise InputError(description='Channel does not exist.')
 
+    perms = permissions.resolve(user.u_id, channel.channel_id)
+
     # access error when authorized user not a member of channel.
-    if channel.is_member(user) is False:
+    if not perms.is_member:
         raise AccessError(
             description='The authorised user is not a member of the channel')
 
-    if user in channel.all_members:
-        channel.all_members.remove(user)
+    channel.all_members.remove(user)
 
-    if user in channel.owner_members:
+    if perms.is_owner:
         channel.owner_members.remove(user)
 
+    ROSTER_CACHE.member_removed(channel.channel_id,
+                                versions.bump_channel(channel.channel_id),
+                                user)
+    versions.bump_channel_lists([user.u_id])
     db.session.commit()
+    permissions.forget()
 
     return {
         'channel': {
@@ -198,11 +357,10 @@ def channel_join(token, channel_id):
     if None in {token, channel_id}:
         raise InputError(description='Insufficient parameters')
 
-    token_data = decode_token(token)
-    user = User.query.get(int(token_data['u_id']))
+    user = authenticate(token).user
 
     channel_id = int(channel_id)
-    channel = Channel.query.get(int(channel_id))
+    channel = Channel.find(int(channel_id))
 
     # input error if channel doesn't exist.
     if channel is None:
@@ -213,9 +371,14 @@ def channel_join(token, channel_id):
         raise AccessError(description='Channel is private.')
 
     # Add user to channel if user is not already a member.
-    if channel.is_member(user) is False:
+    if not permissions.resolve(user.u_id, channel.channel_id).is_member:
         channel.all_members.append(user)
+        ROSTER_CACHE.member_added(channel.channel_id,
+                                  versions.bump_channel(channel.channel_id),
+                                  user)
+        versions.bump_channel_lists([user.u_id])
         db.session.commit()
+        permissions.forget()
 
     return {
         'channel': {
@@ -242,10 +405,9 @@ def channel_addowner(token, channel_id, u_id):
     if None in {token, channel_id, u_id}:
         raise InputError(description='Insufficient parameters')
 
-    token_data = decode_token(token)
-    admin = User.query.get(token_data['u_id'])
-    channel = Channel.query.get(int(channel_id))
-    user = User.query.get(u_id)
+    admin = authenticate(token).user
+    channel = Channel.find(int(channel_id))
+    user = User.find(u_id)
 
     # input error if channel doesn't exist.
     if channel is None:
@@ -255,22 +417,26 @@ def channel_addowner(token, channel_id, u_id):
     if user is None:
         raise InputError(description='User does not exist.')
 
+    perms = permissions.resolve(user.u_id, channel.channel_id)
+
     # input error if user already an owner of channel.
-    if channel.is_owner(user) is True:
+    if perms.is_owner:
         raise InputError(description='User already owner of channel.')
 
     # access error when authorized user not owner of channel or owner of slackr.
-    if admin.permission_id != PERMISSIONS['owner'] and not channel.is_owner(
-            admin):
+    if not permissions.resolve(admin.u_id, channel.channel_id).is_admin:
         raise AccessError(
             description='The authorised user is not an owner of the channel')
 
-    if channel.is_member(user) is False:
+    if not perms.is_member:
         raise InputError(
             description='The authorised user is not a member of the channel')
 
     channel.owner_members.append(user)
+    ROSTER_CACHE.owner_added(channel.channel_id,
+                             versions.bump_channel(channel.channel_id), user)
     db.session.commit()
+    permissions.forget()
 
     return user.details
 
@@ -289,12 +455,11 @@ def channel_removeowner(token, channel_id, u_id):
     if None in {token, channel_id, u_id}:
         raise InputError(description='Insufficient parameters')
 
-    token_data = decode_token(token)
-    admin = User.query.get(token_data['u_id'])
+    admin = authenticate(token).user
 
     channel_id = int(channel_id)
-    channel = Channel.query.get(int(channel_id))
-    user = User.query.get(int(u_id))
+    channel = Channel.find(int(channel_id))
+    user = User.find(int(u_id))
 
     # input error if channel doesn't exist.
     if channel is None:
@@ -305,18 +470,20 @@ def channel_removeowner(token, channel_id, u_id):
         raise InputError(description='User does not exist.')
 
     # input error when user is not an owner
-    if channel.is_owner(user) is False:
+    if not permissions.resolve(user.u_id, channel.channel_id).is_owner:
         raise InputError(
             description='The authorised user is not an owner of the channel')
 
     # access error when authorized user not owner of channel or owner of slackr.
-    if admin.permission_id != PERMISSIONS['owner'] and not channel.is_owner(
-            admin):
+    if not permissions.resolve(admin.u_id, channel.channel_id).is_admin:
         raise AccessError(
             description='The authorised user is not a member of the channel')
 
     channel.owner_members.remove(user)
+    ROSTER_CACHE.owner_removed(channel.channel_id,
+                               versions.bump_channel(channel.channel_id), user)
     db.session.commit()
+    permissions.forget()
 
     return user.details
 
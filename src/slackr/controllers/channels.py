@@ -4,9 +4,10 @@ users to create channels and generate lists of channels.
 '''
 
 from slackr.error import InputError, AccessError
-from slackr.token_validation import decode_token
-from slackr import db
-from slackr.models.user import User
+from slackr.token_validation import authenticate
+from slackr import db, permissions, versions
+from slackr.channel_purger import PURGER
+from slackr.models import user_channel_identifier
 from slackr.models.channel import Channel
 from slackr.utils.constants import PERMISSIONS
 
@@ -23,8 +24,7 @@ def channels_list(token):
     if token is None:
         raise InputError(description='Insufficient parameters')
 
-    token_payload = decode_token(token)
-    user = User.query.get(token_payload['u_id'])
+    user = authenticate(token).user
     channels = [channel.id_name for channel in user.channels]
     return {'channels': channels}
 
@@ -42,7 +42,7 @@ def channels_listall(token):
     if token is None:
         raise InputError(description='Insufficient parameters')
 
-    decode_token(token)
+    authenticate(token)
     public_channels = Channel.query.filter_by(is_public=True).all()
     channels = [channel.id_name for channel in public_channels]
     return {'channels': channels}
@@ -63,16 +63,19 @@ def channels_create(token, name, is_public):
     if None in {token, name, is_public}:
         raise InputError(description='Insufficient parameters')
 
-    token_payload = decode_token(token)
+    user = authenticate(token).user
 
     if len(name) > 20:
         raise InputError(description='Name is more than 20 characters long')
 
-    user = User.query.get(token_payload['u_id'])
     channel = Channel(user, name, is_public)
 
     db.session.add(channel)
+    versions.bump_channel_lists([user.u_id])
+    if is_public:
+        versions.bump('channels')
     db.session.commit()
+    permissions.forget()
 
     return {
         'channel_id': channel.channel_id,
@@ -86,28 +89,40 @@ def channels_delete(token, channel_id):
     if None in {token, channel_id}:
         raise InputError(description='Insufficient parameters')
 
-    token_payload = decode_token(token)
-
-    user = User.query.get(token_payload['u_id'])
+    user = authenticate(token).user
 
     if user.permission_id != PERMISSIONS['owner']:
         raise AccessError('User is not authorised to delete channel')
 
-    channel = Channel.query.get(int(channel_id))
+    channel = Channel.find(int(channel_id))
 
     if not channel:
         raise InputError('Channel does not exist')
 
-    channel.delete_all()
-    db.session.delete(channel)
-    db.session.commit()
-
-    return {
+    deleted = {
         'channel_id': channel.channel_id,
         'is_public': channel.is_public,
         'name': channel.name
     }
 
+    members = user_channel_identifier.c
+    versions.bump_channel_lists(
+        db.select([members.u_id
+                   ]).where(members.channel_id == channel.channel_id))
+    if channel.is_public:
+        versions.bump('channels')
+
+    # Large channels are detached now and their messages purged in the
+    # background
+    if PURGER.needs_purge(channel.messages):
+        PURGER.enqueue(channel)
+    else:
+        channel.delete_all()
+        db.session.commit()
+    permissions.forget()
+
+    return deleted
+
 
 if __name__ == "__main__":
     pass
@@ -3,11 +3,11 @@ Functions to allow users to play a game of hangman in the program. Will allow
 users to start a game in the channel and guess letters until they win/lose.
 '''
 
-import slackr.controllers.message as message
+from slackr.bots import BOTS
 from slackr.error import InputError
+from slackr.hangman_engine import HANGMAN_ENGINE
 from slackr.models.channel import Channel
-from slackr.models.message import Message
-from slackr.token_validation import decode_token, encode_token
+from slackr.token_validation import authenticate
 from slackr.utils.constants import RESERVED_UID
 
 # Game stages
@@ -26,88 +26,93 @@ STAGES = {
 }
 
 
-def start_hangman(token, channel_id):
+def start_hangman(token, channel_id, callback=None):
     '''
-    Initializes the hangman game.
+    Initializes the hangman game. The hangman bot answers straight away, or
+    on one of its workers when a callback is given.
+
+    Parameters:
+        token (str): JWT
+        channel_id (int): ID of the channel
+        callback (function): Called with the channel ID and the details of
+                             the bot's reply
+
+    Returns:
+        (dict): The bot's welcome message, or an empty dictionary when a
+                callback is given
     '''
-    decode_token(token)
+    channel_id = _game_channel(token, channel_id)
+    return _answer('hangman_start', channel_id, {}, callback)
 
-    # getting channel.
-    channel_id = int(channel_id)
-    channel = Channel.query.get(channel_id)
-
-    if channel is None:
-        raise InputError(description='Channel does not exist.')
 
-    if channel.hangman.is_active:
-        raise InputError(description='Game already in progress.')
-
-    dashes = channel.hangman.start()
-
-    bot_token = encode_token(RESERVED_UID['hangman_bot'])
+def guess_hangman(token, channel_id, guess, callback=None):
+    '''
+    Main logic for hangman guesses, see start_hangman.
+    '''
+    channel_id = _game_channel(token, channel_id)
 
-    # sending the welcome message.
-    welcome_msg = (f'Welcome to Hangman!\nWord:\t{dashes}')
-    prev = message.message_send(bot_token, channel_id, welcome_msg)
-    # channel.hangman.set_prev_msg_id(prev['message_id'])
+    if guess is None:
+        raise InputError(description='Insufficient parameters')
 
-    return prev
+    return _answer('hangman_guess', channel_id, {'guess': guess}, callback)
 
 
-def guess_hangman(token, channel_id, guess):
+@BOTS.on('hangman_start', RESERVED_UID['hangman_bot'])
+def start_reply(channel_id, payload):
     '''
-    Main logic for hangman guesses.
+    The hangman bot's reply to a new game.
     '''
+    dashes = HANGMAN_ENGINE.start(channel_id)
 
-    decode_token(token)
-    channel_id = int(channel_id)
-    channel = Channel.query.get(channel_id)
-    bot_token = encode_token(RESERVED_UID['hangman_bot'])
-
-    if channel is None:
-        raise InputError(description='Channel does not exist.')
+    # sending the welcome message.
+    return (f'Welcome to Hangman!\nWord:\t{dashes}')
 
-    # Check if game is already active.
-    if channel.hangman.is_active is False:
-        raise InputError(description='Game not active')
 
-    # Check if there is a message to delete
-    # prev_msg_id = channel.hangman.prev_msg_id
-    # if None not in {prev_msg_id, Message.query.get(prev_msg_id)}:
-    #     message.message_remove(bot_token, prev_msg_id)
+@BOTS.on('hangman_guess', RESERVED_UID['hangman_bot'])
+def guess_reply(channel_id, payload):
+    '''
+    The hangman bot's reply to a guess.
+    '''
 
     # Append guess to list of guesses.
-    is_correct = channel.hangman.guess(guess)
+    result = HANGMAN_ENGINE.guess(channel_id, payload['guess'])
 
-    stage = channel.hangman.stage
+    stage = result['stage']
+    dashed = result['dashed']
 
-    # Get dashed word
-    dashed = channel.hangman.get_dashed()
+    if result['is_won']:
+        return (f'Congratulations!\nYou win!\nThe word was {dashed}')
 
-    if dashed == channel.hangman.word:
-        msg = (f'Congratulations!\nYou win!\nThe word was {dashed}')
-        channel.hangman.stop()
-
-    elif stage >= 10:
-        msg = (f'Game Over.\n'
-               f'{STAGES[stage]}\n'
-               f'The word was:  {channel.hangman.word}\n')
-        channel.hangman.stop()
+    if result['is_lost']:
+        return (f'Game Over.\n'
+                f'{STAGES[stage]}\n'
+                f'The word was:  {result["word"]}\n')
 
     # incorrect guess.
+    if result['is_correct'] is False:
+        guess_result = 'Incorrect Guess.'
     else:
-        if is_correct is False:
-            guess_result = 'Incorrect Guess.'
-        else:
-            guess_result = 'That was right!'
+        guess_result = 'That was right!'
 
-        msg = (
-            f'{guess_result}\n'
+    return (f'{guess_result}\n'
             f'{STAGES[stage]}\n'
             f'{dashed}\n'
-            f'You have guessed: [ {", ".join(channel.hangman.incorrect)} ]\n')
+            f'You have guessed: [ {", ".join(result["incorrect"])} ]\n')
+
+
+def _game_channel(token, channel_id):
+    authenticate(token)
+    channel_id = int(channel_id)
+
+    if Channel.find(channel_id) is None:
+        raise InputError(description='Channel does not exist.')
+
+    return channel_id
+
 
-    prev = message.message_send(bot_token, channel_id, msg)
-    # channel.hangman.set_prev_msg_id(prev['message_id'])
+def _answer(event, channel_id, payload, callback):
+    if callback is None:
+        return BOTS.run(event, channel_id, payload)[0]
 
-    return prev
+    BOTS.dispatch(event, channel_id, payload, callback)
+    return {}
@@ -4,16 +4,13 @@ allow users to send messages, react to messages, pin messages, and alter/remove
 their own messages.
 '''
 
-import threading
-
-from slackr import db, helpers
+from slackr import db, helpers, permissions
 from slackr.error import AccessError, InputError
-from slackr.models.channel import Channel
+from slackr.message_scheduler import SCHEDULER
 from slackr.models.message import Message
 from slackr.models.react import React
-from slackr.models.user import User
-from slackr.token_validation import decode_token
-from slackr.utils.constants import PERMISSIONS, REACTIONS
+from slackr.token_validation import authenticate
+from slackr.utils.constants import REACTIONS
 
 
 def message_send(token, channel_id, message):
@@ -35,14 +32,13 @@ def message_send(token, channel_id, message):
     if None in {token, channel_id, message}:
         raise InputError(description='Insufficient parameters')
 
-    token_info = decode_token(token)
-    u_id = int(token_info['u_id'])
-    user = User.query.get(u_id)
+    user = authenticate(token).user
+    u_id = user.u_id
 
     channel_id = int(channel_id)
-    channel = Channel.query.get(channel_id)
+    perms = permissions.resolve(u_id, channel_id)
 
-    if channel is None:
+    if not perms.exists:
         raise InputError(description='Channel does not exist.')
 
     if len(message) > 1000:
@@ -53,22 +49,41 @@ def message_send(token, channel_id, message):
         raise InputError(
             description='Message needs to be at least 1 characters')
 
-    if user not in channel.all_members and user.permission_id != PERMISSIONS[
-            'bot']:
+    if not perms.is_member and not perms.is_bot:
         raise AccessError(
             description=
             'User does not have Access to send messages in the current channel'
         )
 
     msg = Message(message, u_id, channel_id)
-    channel.messages.append(msg)
-    user.messages.append(msg)
     db.session.add(msg)
     db.session.commit()
 
     return msg.details(user)
 
 
+def post_message(u_id, channel_id, message):
+    '''
+    Function that will send a message on behalf of the program itself, such
+    as a bot's reply. No token is read and no permissions are checked, so
+    the caller must only pass a channel that exists and a message that fits.
+
+    Parameters:
+        u_id (int): The u_id of the sender, usually one of RESERVED_UID.
+        channel_id (int): The channel identification number.
+        message (str): The message to be sent in the channel.
+
+    Return:
+        Dictionary (dict): The details of the message, see message_send.
+    '''
+
+    msg = Message(message, u_id, channel_id)
+    db.session.add(msg)
+    db.session.commit()
+
+    return Message.details_batch([msg])[0]
+
+
 def message_remove(token, message_id):
     '''
     Function that will take in a message ID and remove this
@@ -85,25 +100,22 @@ def message_remove(token, message_id):
     if None in {token, message_id}:
         raise InputError(description='Insufficient parameters')
 
-    token_info = decode_token(token)
-    user = User.query.get(int(token_info['u_id']))
+    user = authenticate(token).user
     message = Message.query.get(int(message_id))
 
     if message is None:
         raise InputError(description='Message does not exist')
 
-    channel = message.channel
+    perms = permissions.resolve(user.u_id, message.channel_id)
 
-    if not (message.u_id == user.u_id or user.permission_id
-            == PERMISSIONS['owner'] or channel.is_owner(user)
-            or user.permission_id == PERMISSIONS['bot']):
+    if not (message.u_id == user.u_id or perms.is_admin or perms.is_bot):
         raise AccessError(
             description='User does not have access to remove this message')
 
     db.session.delete(message)
     db.session.commit()
 
-    return {'channel_id': channel.channel_id, 'message_id': message.message_id}
+    return {'channel_id': message.channel_id, 'message_id': message.message_id}
 
 
 def message_edit(token, message_id, message):
@@ -123,9 +135,8 @@ def message_edit(token, message_id, message):
     if None in {token, message_id, message}:
         raise InputError(description='Insufficient parameters')
 
-    token_info = decode_token(token)
-    u_id = int(token_info['u_id'])
-    user = User.query.get(u_id)
+    user = authenticate(token).user
+    u_id = user.u_id
 
     message_id = int(message_id)
     message_obj = Message.query.get(message_id)
@@ -133,13 +144,13 @@ def message_edit(token, message_id, message):
     if message_obj is None:
         raise InputError(description='Message does not exist')
 
-    channel = message_obj.channel
+    channel_id = message_obj.channel_id
 
     if len(message) > 1000:
         raise InputError(description='Message is over 1,000 characters')
 
-    if not (message_obj.u_id == u_id or user.permission_id
-            == PERMISSIONS['owner'] or channel.is_owner(user)):
+    if not (message_obj.u_id == u_id
+            or permissions.resolve(u_id, channel_id).is_admin):
         raise AccessError(
             description='User does not have access to edit this message')
 
@@ -151,13 +162,13 @@ def message_edit(token, message_id, message):
     db.session.commit()
 
     return {
-        'channel_id': channel.channel_id,
-        'message_id': message_obj.message_id,
+        'channel_id': channel_id,
+        'message_id': message_id,
         'message': message
     }
 
 
-def message_sendlater(token, channel_id, message, time_sent, callback=None):
+def message_sendlater(token, channel_id, message, time_sent):
     '''
     Function that will send a message in a desired channel at a specified
     time in the future.
@@ -175,12 +186,11 @@ def message_sendlater(token, channel_id, message, time_sent, callback=None):
     if None in {token, channel_id, message, time_sent}:
         raise InputError(description='Insufficient parameters')
 
-    token_info = decode_token(token)
-    u_id = int(token_info['u_id'])
-    user = User.query.get(u_id)
+    user = authenticate(token).user
+    u_id = user.u_id
 
     channel_id = int(channel_id)
-    channel = Channel.query.get(channel_id)
+    perms = permissions.resolve(u_id, channel_id)
 
     time_sent = int(time_sent)
     time_now = helpers.utc_now()
@@ -188,7 +198,7 @@ def message_sendlater(token, channel_id, message, time_sent, callback=None):
     if time_now > time_sent:
         raise InputError(description='Time to send is in the past')
 
-    if channel is None:
+    if not perms.exists:
         raise InputError(description='Channel does not exist.')
 
     if len(message) > 1000:
@@ -199,8 +209,7 @@ def message_sendlater(token, channel_id, message, time_sent, callback=None):
         raise InputError(
             description='Message needs to be at least 1 characters')
 
-    # hangman_bot_u_id = DATA_STORE.preset_profiles['hangman_bot'].u_id
-    if not channel.is_member(user):  # and u_id != hangman_bot_u_id:
+    if not perms.is_member:
         raise AccessError(
             description=
             'User does not have Access to send messages in the current channel'
@@ -209,17 +218,11 @@ def message_sendlater(token, channel_id, message, time_sent, callback=None):
     msg = Message(message, u_id, channel_id)
     msg.is_hidden = True
 
-    channel.messages.append(msg)
-    user.messages.append(msg)
-
     db.session.add(msg)
-    db.session.commit()
+    db.session.flush()
 
-    duration = time_sent - time_now
-    timer = threading.Timer(duration,
-                            show_message,
-                            args=[msg.message_id, user, callback])
-    timer.start()
+    SCHEDULER.schedule(msg, time_sent)
+    db.session.commit()
 
     return {'message_id': msg.message_id}
 
@@ -241,8 +244,7 @@ def message_react(token, message_id, react_id):
     if None in {token, message_id, react_id}:
         raise InputError(description='Insufficient parameters')
 
-    token_info = decode_token(token)
-    user = User.query.get(token_info['u_id'])
+    user = authenticate(token).user
 
     message_id = int(message_id)
     message = Message.query.get(message_id)
@@ -250,9 +252,9 @@ def message_react(token, message_id, react_id):
     if message is None:
         raise InputError(description='Message does not exist')
 
-    channel = message.channel
+    channel_id = message.channel_id
 
-    if not channel.is_member(user):
+    if not permissions.resolve(user.u_id, channel_id).is_member:
         raise InputError(description='User is not in the channel')
 
     if react_id not in REACTIONS.values():
@@ -273,7 +275,7 @@ def message_react(token, message_id, react_id):
     db.session.commit()
 
     return {
-        'channel_id': channel.channel_id,
+        'channel_id': channel_id,
         'message_id': message_id,
         'react_id': react_id,
         'u_ids': react.u_ids()
@@ -296,17 +298,16 @@ def message_unreact(token, message_id, react_id):
     if None in {token, message_id, react_id}:
         raise InputError(description='Insufficient parameters')
 
-    token_info = decode_token(token)
-    user = User.query.get(token_info['u_id'])
+    user = authenticate(token).user
     message = Message.query.get(int(message_id))
 
     if not message:  #or message not in user.viewable_messages:
         raise InputError(description='Message does not exist')
 
     react = message.get_react(int(react_id))
-    channel = message.channel
+    channel_id = message.channel_id
 
-    if not channel.is_member(user):
+    if not permissions.resolve(user.u_id, channel_id).is_member:
         raise InputError(description='User is not in the channel')
 
     if react_id not in REACTIONS.values():
@@ -327,7 +328,7 @@ def message_unreact(token, message_id, react_id):
     db.session.commit()
 
     return {
-        'channel_id': channel.channel_id,
+        'channel_id': channel_id,
         'message_id': message_id,
         'react_id': react_id,
         'u_ids': react.u_ids()
@@ -350,31 +351,30 @@ def message_pin(token, message_id):
     if None in {token, message_id}:
         raise InputError(description='Insufficient parameters')
 
-    token_info = decode_token(token)
-    user = User.query.get(int(token_info['u_id']))
+    user = authenticate(token).user
     message = Message.query.get(int(message_id))
 
     if message is None:
         raise InputError(description='Message does not exist')
 
-    channel = message.channel
+    channel_id = message.channel_id
+    perms = permissions.resolve(user.u_id, channel_id)
 
-    if not (user.permission_id == PERMISSIONS['owner']
-            or channel.is_owner(user)):
+    if not perms.is_admin:
         raise InputError(
             description='User is not an admin or owner of the channel')
 
     if message.is_pinned:
         raise InputError(description='Message is already pinned')
 
-    if not channel.is_member(user):
+    if not perms.is_member:
         raise AccessError(description='User is not a member of the channel')
 
     message.is_pinned = True
     db.session.commit()
 
     return {
-        'channel_id': channel.channel_id,
+        'channel_id': channel_id,
         'message_id': message_id,
         'is_pinned': True
     }
@@ -395,45 +395,34 @@ def message_unpin(token, message_id):
     if None in {token, message_id}:
         raise InputError(description='Insufficient parameters')
 
-    token_info = decode_token(token)
-    user = User.query.get(int(token_info['u_id']))
+    user = authenticate(token).user
     message = Message.query.get(int(message_id))
 
     if message is None:
         raise InputError(description='Message does not exist')
 
-    channel = message.channel
+    channel_id = message.channel_id
+    perms = permissions.resolve(user.u_id, channel_id)
 
-    if not (user.permission_id == PERMISSIONS['owner']
-            or channel.is_owner(user)):
+    if not perms.is_admin:
         raise InputError(
             description='User is not an admin or owner of the channel')
 
     if not message.is_pinned:
         raise InputError(description='Message is not pinned')
 
-    if user not in channel.all_members:
+    if not perms.is_member:
         raise AccessError(description='User is not a member of the channel')
 
     message.is_pinned = False
     db.session.commit()
 
     return {
-        'channel_id': channel.channel_id,
+        'channel_id': channel_id,
         'message_id': message_id,
         'is_pinned': False
     }
 
 
-def show_message(message_id, user, callback=None):
-    message = Message.query.get(message_id)
-    message.is_hidden = False
-    message.time_created = helpers.utc_now()
-    db.session.commit()
-
-    if callback:
-        callback(message.details(user), message.channel_id)
-
-
 if __name__ == "__main__":
     pass
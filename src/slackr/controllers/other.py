@@ -3,28 +3,67 @@ Functions to provide miscellaneous services to the program. Will allow
 users to get a list of all users and search for messages.
 '''
 
-from slackr.token_validation import decode_token
-from slackr.models.user import User
-from slackr.utils.constants import RESERVED_UID
+from slackr import message_search
+from slackr.error import InputError
+from slackr.token_validation import authenticate
+from slackr.models.message import Message
+from slackr.user_directory import USER_DIRECTORY
+from slackr.utils.constants import (MESSAGE_PAGE_MAX, MESSAGE_PAGE_SIZE,
+                                    USERS_PAGE_MAX)
 
 
-def users_all(token):
-    ''' Returns a list of all users and their associated details
+def users_all(token, cursor=None, limit=None):
+    ''' Returns a list of all users and their associated details, in order of
+        u_id. Without a limit every user is returned.
 
 	Parameters:
 		token (str): JWT
+		cursor (int): u_id of the last user of the previous page
+		limit (int): Number of users in the page
 
 	Returns (dict):
 		users (list): List of users
+		cursor (int): Cursor of the next page, -1 if none. Only returned
+		              with a limit
 
 	'''
-    decode_token(token)
-    return {
-        'users': [
-            user.profile for user in User.query.all()
-            if user.u_id not in RESERVED_UID.values()
-        ]
-    }
+    authenticate(token)
+
+    if limit is None:
+        users, _ = USER_DIRECTORY.page(_cursor(cursor))
+        return {'users': users}
+
+    limit = int(limit)
+    if not 1 <= limit <= USERS_PAGE_MAX:
+        raise InputError(
+            description=f'Limit is not between 1 and {USERS_PAGE_MAX}')
+
+    users, cursor = USER_DIRECTORY.page(_cursor(cursor), limit)
+    return {'users': users, 'cursor': cursor}
+
+
+def users_all_serialized(token):
+    ''' Returns every user as the serialized body of /users/all, see
+        users_all
+
+	Parameters:
+		token (str): JWT
+
+	Returns (str):
+		JSON of the list of users
+
+	'''
+    authenticate(token)
+    return USER_DIRECTORY.serialized()
+
+
+def _cursor(cursor):
+    if cursor is None:
+        return None
+    try:
+        return int(cursor)
+    except ValueError:
+        raise InputError(description='Invalid cursor')
 
 
 def search(token, query_str):
@@ -39,14 +78,49 @@ def search(token, query_str):
 		messages (list): List of messages containing the query string
 
 	'''
-    token_payload = decode_token(token)
-    user = User.query.get(token_payload['u_id'])
-    messages = []
-    for channel in user.channels:
-        for message in channel.messages:
-            if query_str.lower() in message.message.lower():
-                messages.append(message.details(user))
-    return {'messages': messages}
+    user = authenticate(token).user
+    messages = message_search.substring_search(user, query_str)
+    return {'messages': Message.details_batch(messages, user)}
+
+
+def search_messages(token, query_str, start=0, limit=None):
+    ''' Return a page of the messages in all of the authorised channels that
+        contain every word of the query, ranked by relevance
+
+	Parameters:
+		token (str): JWT
+		query_str (str): Query string
+		start (int): Number of matches to skip
+		limit (int): Number of matches in the page
+
+	Returns (dict):
+		messages (list): List of matching messages, best match first
+		start (int): Starting index of the page
+		end (int): Starting index of the next page, -1 if none
+
+	'''
+    if None in {token, query_str}:
+        raise InputError(description='Insufficient parameters')
+
+    user = authenticate(token).user
+
+    start = int(start)
+    limit = MESSAGE_PAGE_SIZE if limit is None else int(limit)
+
+    if start < 0:
+        raise InputError(description='Invalid start value')
+
+    if not 1 <= limit <= MESSAGE_PAGE_MAX:
+        raise InputError(
+            description=f'Limit is not between 1 and {MESSAGE_PAGE_MAX}')
+
+    page, has_more = message_search.search(user, query_str, start, limit)
+
+    return {
+        'messages': Message.details_batch(page, user),
+        'start': start,
+        'end': start + limit if has_more else -1
+    }
 
 
 if __name__ == '__main__':
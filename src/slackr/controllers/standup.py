@@ -1,18 +1,20 @@
 '''
 Functions to allow users participate in a standup in the program. Will allow
 users to start a timed standup where messages sent before the end time will
-be joined into one standup summary message.
+be joined into standup summary messages.
 '''
 import threading
+import traceback
 
-from slackr import helpers
-from slackr.controllers.message import message_send
+from slackr import db, helpers, permissions
 from slackr.error import AccessError, InputError
 from slackr.models.channel import Channel
-from slackr.models.user import User
-from slackr.token_validation import decode_token
-from slackr import db
 from slackr.models.message import Message
+from slackr.models.standup import Standup
+from slackr.models.standup_entry import StandupEntry
+from slackr.models.user import User
+from slackr.token_validation import authenticate
+from slackr.utils.constants import MESSAGE_MAX_LENGTH, STANDUP_FETCH_SIZE
 
 
 def standup_start(token, channel_id, length, callback=None):
@@ -31,68 +33,142 @@ def standup_start(token, channel_id, length, callback=None):
     if None in {token, channel_id, length}:
         raise InputError(description='Insufficient parameters')
 
-    token_info = decode_token(token)
-    u_id = token_info['u_id']
-    user = User.query.get(u_id)
+    user = authenticate(token).user
 
     channel_id = int(channel_id)
-    channel = Channel.query.get(channel_id)
+    channel = Channel.find(channel_id)
 
     if channel is None:
         raise InputError(description='Channel does not exist.')
 
-    if channel.standup.is_active is True:
+    standup = Standup.for_channel(channel_id)
+
+    if standup.is_active is True:
         raise InputError(
             description='An active standup is currently running on this channel'
         )
 
     time_finish = helpers.utc_now() + length
 
-    # channel.standup.start(user, time_finish)
+    # Entries that arrived as the last standup ended belong to no standup
+    StandupEntry.query.filter_by(standup_id=standup.id).delete(
+        synchronize_session=False)
 
-    channel.standup.starting_user = user
-    channel.standup.is_active = True
-    channel.standup.time_finish = time_finish
+    standup.starting_user = user
+    standup.is_active = True
+    standup.time_finish = time_finish
 
     db.session.commit()
 
     timer = threading.Timer(length,
-                            stop_standup,
-                            args=[token, channel.channel_id, callback])
+                            _finish_standup,
+                            args=[channel.channel_id, callback, time_finish])
     timer.start()
 
-    return {'standup_id': channel.standup.id, 'time_finish': time_finish}
+    return {'standup_id': standup.id, 'time_finish': time_finish}
 
 
-def stop_standup(token, channel_id, callback=None):
-    ''' Stops a standup in a specified channel and sends a message containing
-        all standup messages
+def stop_standup(channel_id, callback=None, time_finish=None):
+    ''' Stops a standup in a specified channel and sends messages containing
+        all standup entries
 
 	Parameters:
-		token (str): JWT
 		channel_id (int): ID of the specified channel
+		callback (function): Called with the channel ID and the details of
+		                     each summary message
+		time_finish (int): Only stop the standup if it finishes at this time
     '''
 
-    token_info = decode_token(token)
-    u_id = token_info['u_id']
-    user = User.query.get(u_id)
+    # Locking the standup makes standup_send wait until it has been stopped,
+    # so no entry can be added once the summary has been read
+    standup = Standup.find(channel_id, for_update=True)
+
+    if standup is None or not standup.is_active or \
+            time_finish not in {None, standup.time_finish}:
+        db.session.commit()
+        return
+
+    u_id = standup.starting_u_id
+    standup.is_active = False
+    standup.starting_user = None
+    standup.time_finish = None
+    db.session.flush()
+
+    # The user who started the standup may have since been removed
+    if u_id is None:
+        u_id = db.session.query(StandupEntry.u_id).filter(
+            StandupEntry.standup_id == standup.id).order_by(
+                StandupEntry.id).limit(1).scalar()
+
+    entries = db.session.query(StandupEntry.id, User.handle_str,
+                               StandupEntry.message).join(
+                                   User, User.u_id == StandupEntry.u_id).filter(
+                                       StandupEntry.standup_id == standup.id
+                                   ).order_by(StandupEntry.id).yield_per(
+                                       STANDUP_FETCH_SIZE)
+
+    last_id = None
+    messages = []
+    for last_id, summary in summary_chunks(entries):
+        message = Message(summary, u_id, channel_id)
+        db.session.add(message)
+        messages.append(message)
+
+    # Only the summarised entries are deleted. Where the lock is not
+    # supported, an entry that slips in is cleared by the next standup_start
+    if last_id is not None:
+        StandupEntry.query.filter(StandupEntry.standup_id == standup.id,
+                                  StandupEntry.id <= last_id).delete(
+                                      synchronize_session=False)
 
-    channel = Channel.query.get(channel_id)
+    db.session.commit()
 
-    channel.standup.is_active = False
-    channel.standup.starting_user = None
-    channel.standup.time_finish = None
+    if callback:
+        for details in Message.details_batch(messages):
+            callback(channel_id, details)
 
-    message = channel.standup.message
-    channel.standup.message = ''
 
-    db.session.commit()
+def _finish_standup(channel_id, callback, time_finish):
+    # Runs on the timer's thread, which has its own session
+    try:
+        stop_standup(channel_id, callback, time_finish)
+    except Exception:  # pylint: disable=broad-except
+        traceback.print_exc()
+        db.session.rollback()
+    finally:
+        db.session.remove()
+
 
-    if message:
-        prev_msg = message_send(token, channel_id, message)
-        if callback:
-            standup_message = Message.query.get(prev_msg['message_id'])
-            callback(channel_id, standup_message.details(user))
+def summary_chunks(entries, limit=MESSAGE_MAX_LENGTH):
+    ''' Join standup entries into summaries that each fit in one message
+
+	Parameters:
+		entries (iterable): (entry ID, handle, message) tuples in order
+		limit (int): Maximum number of characters in a summary
+
+	Yields (tuple):
+		last_id (int): ID of the last entry included in the summary
+		summary (str): Lines of "handle: message"
+    '''
+
+    chunk = ''
+    chunk_id = None
+    for entry_id, handle, message in entries:
+        line = f'{handle}: {message}\n'
+        if chunk and len(chunk) + len(line) > limit:
+            yield chunk_id, chunk.rstrip('\n')
+            chunk = ''
+
+        # A single entry longer than a message is split across messages
+        while len(line) > limit:
+            yield entry_id, line[:limit]
+            line = line[limit:]
+
+        chunk += line
+        chunk_id = entry_id
+
+    if chunk.rstrip('\n'):
+        yield chunk_id, chunk.rstrip('\n')
 
 
 def standup_active(token, channel_id):
@@ -112,19 +188,21 @@ def standup_active(token, channel_id):
     if None in {token, channel_id}:
         raise InputError(description='Insufficient parameters')
 
-    decode_token(token)
+    authenticate(token)
 
     channel_id = int(channel_id)
-    channel = Channel.query.get(channel_id)
+    channel = Channel.find(channel_id)
 
     # input error if channel does not exist.
     if channel is None:
         raise InputError(description='Channel does not exist.')
 
-    return {
-        'is_active': channel.standup.is_active,
-        'time_finish': channel.standup.time_finish
-    }
+    # Channels that never had a standup have no standup row
+    standup = Standup.find(channel_id)
+    if standup is None:
+        return {'is_active': False, 'time_finish': None}
+
+    return {'is_active': standup.is_active, 'time_finish': standup.time_finish}
 
 
 def standup_send(token, channel_id, message):
@@ -143,35 +221,35 @@ def standup_send(token, channel_id, message):
     if None in {token, channel_id, message}:
         raise InputError(description='Insufficient parameters')
 
-    token_info = decode_token(token)
-    u_id = token_info['u_id']
-    user = User.query.get(u_id)
+    user = authenticate(token).user
 
     channel_id = int(channel_id)
-    channel = Channel.query.get(channel_id)
+    channel = Channel.find(channel_id)
 
     if channel is None:
         raise InputError(description="Channel ID is not a valid channel")
 
-    if len(message) > 1000:
+    if len(message) > MESSAGE_MAX_LENGTH:
         raise InputError(
             description='Message cannot be more than 1000 characters')
 
     if not message:
         raise InputError(description='Message cannot be zero characters')
 
-    if channel.standup.is_active is False:
+    standup = Standup.find(channel_id, for_update=True)
+
+    if standup is None or standup.is_active is False:
         raise InputError(
             description=
             'An active standup is not currently running in this channel')
 
-    if user not in channel.all_members:
+    if not permissions.resolve(user.u_id, channel_id).is_member:
         raise AccessError(
             description=
             'The authorised user is not a member of the channel that the message is within'
         )
 
-    channel.standup.message += f"{user.handle_str}: {message}\n"
+    db.session.add(StandupEntry(standup.id, user.u_id, message))
     db.session.commit()
 
     return {}
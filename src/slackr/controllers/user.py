@@ -5,15 +5,13 @@ as well as change their own personal information.
 
 import random
 
-import requests
-from PIL import Image
-
-from slackr import db, helpers
+from slackr import db, helpers, profile_photos, versions
 from slackr.email_validation import invalid_email
 from slackr.error import InputError
 from slackr.models.image_id import ImageID
 from slackr.models.user import User
-from slackr.token_validation import decode_token
+from slackr.roster_cache import ROSTER_CACHE
+from slackr.token_validation import authenticate
 from slackr.utils.constants import URL
 
 
@@ -36,9 +34,9 @@ def user_profile(token, u_id):
         raise InputError(description='Insufficient parameters')
 
     # By calling the decode function, multiple error checks are performed.
-    decode_token(token)
+    authenticate(token)
 
-    target_user = User.query.get(u_id)
+    target_user = User.find(u_id)
 
     if target_user is None:
         raise InputError(description='User ID is not a valid user')
@@ -63,9 +61,7 @@ def user_profile_setname(token, name_first, name_last):
     if None in {token, name_first, name_last}:
         raise InputError(description='Insufficient parameters')
 
-    token_info = decode_token(token)
-    u_id = token_info['u_id']
-    user = User.query.get(u_id)
+    user = authenticate(token).user
 
     if not 1 <= len(name_first) <= 50:
         raise InputError(
@@ -77,6 +73,8 @@ def user_profile_setname(token, name_first, name_last):
 
     user.name_first = name_first
     user.name_last = name_last
+    versions.bump('users')
+    ROSTER_CACHE.profile_changed(versions.bump('profiles'), user)
     db.session.commit()
 
     return {}
@@ -98,9 +96,7 @@ def user_profile_setemail(token, email):
     if None in {token, email}:
         raise InputError(description='Insufficient parameters')
 
-    token_info = decode_token(token)
-    u_id = token_info['u_id']
-    user = User.query.get(u_id)
+    user = authenticate(token).user
 
     if email != user.email:
         if invalid_email(email):
@@ -112,6 +108,7 @@ def user_profile_setemail(token, email):
                 'Email address is already being used by another user')
 
         user.email = email
+        versions.bump('users')
         db.session.commit()
 
     return {}
@@ -133,9 +130,7 @@ def user_profile_sethandle(token, handle_str):
     if None in {token, handle_str}:
         raise InputError(description='Insufficient parameters')
 
-    token_info = decode_token(token)
-    u_id = token_info['u_id']
-    user = User.query.get(u_id)
+    user = authenticate(token).user
 
     if handle_str != user.handle_str:
         if ' ' in handle_str:
@@ -150,6 +145,7 @@ def user_profile_sethandle(token, handle_str):
                 description='Handle is already being used by another user')
 
         user.handle_str = handle_str
+        versions.bump('users')
         db.session.commit()
 
     return {}
@@ -180,35 +176,39 @@ def user_profile_uploadphoto_area(x_start, y_start, x_end, y_end):
     return (x_start, y_start, x_end, y_end)
 
 
-def change_profile_image(img, user):
+def change_profile_image(img_id, user):
     ''' Function to change the profile image url of a given user.
 
     Parameters:
-        img (obj): An image object
+        img_id (int): ID of the rendered image, see new_image_id
         user (obj): A user object
     '''
     curr_id = helpers.get_filename(user.profile_img_url).replace('.jpg', '')
     image_id = ImageID.query.filter_by(image_id=curr_id).first()
 
-    # Generate a random 15 digit integer.
-    img_id = random.randint(10**14, 10**15 - 1)
-    while img_id in [image.image_id for image in ImageID.query.all()]:
-        img_id = random.randint(10**14, 10**15 - 1)
-
-    img.save(f'src/profile_images/{img_id}.jpg')
-
     url = f'{URL}/imgurl/{img_id}.jpg'
     user.profile_img_url = url
     if not image_id:
         image_id = ImageID()
-    image_id.image_id = img_id
+        db.session.add(image_id)
+    image_id.image_id = str(img_id)
+    versions.bump('users')
+    ROSTER_CACHE.profile_changed(versions.bump('profiles'), user)
     db.session.commit()
 
 
+def new_image_id():
+    ''' Generate a random 15 digit integer that no image uses. '''
+    img_id = random.randint(10**14, 10**15 - 1)
+    while ImageID.query.filter_by(image_id=str(img_id)).first():
+        img_id = random.randint(10**14, 10**15 - 1)
+    return img_id
+
+
 def user_profile_uploadphoto(token, img_url, area):
     '''
-    Function that will take a desired url and will resize this image to specific constraints
-    and upload this file to a path in the directory.
+    Function that will take a desired url and will crop this image to the
+    given area, rendering it at several sizes, see slackr.profile_photos.
 
     Parameters:
         token (str): The token of the authorized user to be decoded to get the u_id.
@@ -222,47 +222,21 @@ def user_profile_uploadphoto(token, img_url, area):
     if None in [token, img_url, area]:
         raise InputError(description='Insufficient parameters')
 
-    token_info = decode_token(token)
-    user_id = token_info['u_id']
-    user = User.query.get(user_id)
-
-    req = requests.get(f'{img_url}')
-    if req.status_code != 200:
-        raise InputError(description='Image does not exist')
-
-    url = requests.get(img_url, stream=True)
-    img = Image.open(url.raw)
-
-    width, height = img.size
+    user = authenticate(token).user
 
     if len(area) != 4:
         raise InputError(
             description='Must provide 4 integers for the cropping')
 
-    if area[0] > width or area[2] > width:
-        raise InputError(
-            description='Crop constraints are outside of the image')
-
-    if area[1] > height or area[3] > height:
-        raise InputError(
-            description='Crop constraints are outside of the image')
-
-    if area[0] > area[2]:
-        raise InputError(description='x_end cannot be greater than x_start')
-
-    if area[1] > area[3]:
-        raise InputError(description='y_end cannot be greater than y_start')
-
-    if any(x < 0 for x in area):
-        raise InputError(
-            description='Cannot crop out of the bounds of the image')
-
     if not img_url.endswith('.jpg'):
         raise InputError(description='Image must be a .jpg file')
 
-    cropped_img = img.crop(area)
+    data = profile_photos.fetch(img_url)
+
+    img_id = new_image_id()
+    profile_photos.render(data, area, img_id)
 
-    change_profile_image(cropped_img, user)
+    change_profile_image(img_id, user)
 
     return {}
 
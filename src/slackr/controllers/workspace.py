@@ -5,12 +5,26 @@ Function to reset the state of the Slackr application.
 import os
 import glob
 from slackr import db
+from slackr.hangman_engine import HANGMAN_ENGINE
+from slackr.history_cache import HISTORY_CACHE
+from slackr.roster_cache import ROSTER_CACHE
+from slackr.token_revocation import REVOCATIONS
+from slackr.token_validation import TOKEN_CACHE
+from slackr.trigram_index import TRIGRAM_INDEX
+from slackr.user_directory import USER_DIRECTORY
 
 
 def workspace_reset():
     '''Reset the workspace state'''
     db.drop_all()
     db.create_all()
+    REVOCATIONS.reset()
+    TOKEN_CACHE.clear()
+    TRIGRAM_INDEX.clear()
+    HISTORY_CACHE.clear()
+    HANGMAN_ENGINE.clear()
+    ROSTER_CACHE.clear()
+    USER_DIRECTORY.clear()
 
     for file in glob.glob('src/profile_images/*.jpg'):
         if os.path.exists(file):
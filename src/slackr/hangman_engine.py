@@ -0,0 +1,256 @@
+'''
+Games of hangman kept in memory, so a guess does not read or commit the
+hangman row. Guesses in a channel are applied one at a time under the
+game's lock, and the state each leaves behind is written to the hangman
+table by a background thread, at most once per HANGMAN_WRITE_INTERVAL for
+each game. Starting a game is written straight away.
+
+A game lives in the worker that loaded it, and is dropped from memory once
+it is over and written. A worker without a game in progress reads the row
+again before rejecting a guess or starting a new game, so a game started by
+another worker is picked up, but guesses to one game should reach one
+worker.
+'''
+
+import threading
+import time
+import traceback
+
+from slackr import db
+from slackr.error import InputError
+from slackr.models.hangman import Hangman
+from slackr.utils.constants import HANGMAN_STAGE_MAX, HANGMAN_WRITE_INTERVAL
+
+
+class _Game:
+    def __init__(self, state):
+        self.state = state
+        self.lock = threading.Lock()
+
+
+class HangmanEngine:
+    ''' In-memory games of hangman by channel, with write-behind persistence
+    of their state.
+    '''
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        # Held while state is written or reloaded, so a write that is under
+        # way is never overtaken
+        self._write_lock = threading.Lock()
+        self._games = {}
+        self._dirty = {}
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def start(self, channel_id):
+        ''' Start a game in a channel
+
+        Parameters:
+            channel_id (int): ID of the channel
+
+        Returns:
+            (str): The board of the new game, see Hangman.get_dashed
+
+        '''
+        game = self._locked(channel_id)
+        try:
+            if not game.state.is_active:
+                self._reload(channel_id, game)
+            if game.state.is_active:
+                raise InputError(description='Game already in progress.')
+
+            dashed = game.state.start()
+
+            # Written straight away, so the row exists for the updates of
+            # later guesses and other workers see the game
+            with self._write_lock:
+                with self._lock:
+                    self._dirty.pop(channel_id, None)
+                row = Hangman.for_channel(channel_id)
+                for name, value in game.state.snapshot().items():
+                    setattr(row, name, value)
+                db.session.commit()
+        finally:
+            game.lock.release()
+
+        return dashed
+
+    def guess(self, channel_id, letter):
+        ''' Guess a letter in the game of a channel
+
+        Parameters:
+            channel_id (int): ID of the channel
+            letter (str): The guess, usually a single letter
+
+        Returns (dict):
+            is_correct (bool): Whether the letter is in the word
+            stage (int): Number of incorrect guesses, see STAGES
+            dashed (str): The board after the guess
+            word (str): The word
+            incorrect (str): The incorrect letters guessed so far
+            is_won (bool): Whether the guess completed the word
+            is_lost (bool): Whether the guess was the last one allowed
+
+        '''
+        game = self._locked(channel_id)
+        try:
+            if not game.state.is_active:
+                self._reload(channel_id, game)
+            if not game.state.is_active:
+                self._drop(channel_id, game)
+                raise InputError(description='Game not active')
+
+            state = game.state
+            is_correct = state.guess(letter)
+            result = {
+                'is_correct': is_correct,
+                'stage': state.stage,
+                'dashed': state.get_dashed(),
+                'word': state.word,
+                'incorrect': state.incorrect
+            }
+            result['is_won'] = result['dashed'] == state.word
+            result['is_lost'] = state.stage >= HANGMAN_STAGE_MAX
+            if result['is_won'] or result['is_lost']:
+                state.stop()
+
+            self._mark_dirty(channel_id, state.snapshot())
+        finally:
+            game.lock.release()
+
+        return result
+
+    def flush(self):
+        ''' Write the latest state of every changed game
+
+        Returns:
+            (int): The number of games written
+
+        '''
+        with self._write_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, {}
+            if not dirty:
+                return 0
+
+            try:
+                for channel_id, snapshot in dirty.items():
+                    db.session.execute(Hangman.__table__.update().where(
+                        Hangman.channel_id == channel_id).values(**snapshot))
+                db.session.commit()
+            except Exception:
+                # Retried on the next flush, unless the game has moved on
+                with self._lock:
+                    for channel_id, snapshot in dirty.items():
+                        self._dirty.setdefault(channel_id, snapshot)
+                raise
+
+        for channel_id, snapshot in dirty.items():
+            if not snapshot['is_active']:
+                self._drop_finished(channel_id)
+
+        return len(dirty)
+
+    def clear(self):
+        ''' Forget every game without writing it, e.g. after the workspace is
+        reset '''
+        with self._lock:
+            self._games.clear()
+            self._dirty.clear()
+
+    def start_writer(self):
+        ''' Start the thread that writes changed games '''
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _game(self, channel_id):
+        with self._lock:
+            game = self._games.get(channel_id)
+        if game is not None:
+            return game
+
+        row = Hangman.find(channel_id)
+        state = Hangman(channel_id=channel_id)
+        if row is None:
+            state.stop()
+        else:
+            for name, value in row.snapshot().items():
+                setattr(state, name, value)
+
+        with self._lock:
+            return self._games.setdefault(channel_id, _Game(state))
+
+    def _locked(self, channel_id):
+        # Returns the game with its lock held. A game dropped while waiting
+        # for its lock is no longer the channel's, so the lookup is retried
+        while True:
+            game = self._game(channel_id)
+            game.lock.acquire()
+            with self._lock:
+                if self._games.get(channel_id) is game:
+                    return game
+            game.lock.release()
+
+    def _drop(self, channel_id, game):
+        # Called with the game's lock held
+        with self._lock:
+            if self._games.get(channel_id) is game:
+                del self._games[channel_id]
+
+    def _drop_finished(self, channel_id):
+        with self._lock:
+            game = self._games.get(channel_id)
+        # A game in use is dropped by its own guess, or is being started
+        if game is None or not game.lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                is_dirty = channel_id in self._dirty
+            if not game.state.is_active and not is_dirty:
+                self._drop(channel_id, game)
+        finally:
+            game.lock.release()
+
+    def _reload(self, channel_id, game):
+        # Called with the game's lock held. A change that is not written yet
+        # is newer than the row
+        with self._write_lock:
+            with self._lock:
+                if channel_id in self._dirty:
+                    return
+
+            row = Hangman.query.filter_by(
+                channel_id=channel_id).populate_existing().first()
+            if row is not None:
+                for name, value in row.snapshot().items():
+                    setattr(game.state, name, value)
+
+    def _mark_dirty(self, channel_id, snapshot):
+        with self._lock:
+            self._dirty[channel_id] = snapshot
+        with self._condition:
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._dirty:
+                    self._condition.wait()
+
+            # Guesses made in the meantime are written together
+            time.sleep(self.interval)
+
+            try:
+                self.flush()
+            except Exception:  # pylint: disable=broad-except
+                traceback.print_exc()
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+
+HANGMAN_ENGINE = HangmanEngine(HANGMAN_WRITE_INTERVAL)
@@ -0,0 +1,402 @@
+'''
+Per-channel ring buffer of the newest serialized messages, so reads of the
+latest pages of a busy channel skip the ORM and serialization. Writes made
+through the session are tracked at flush, and the messages they touched are
+reloaded by id on the next read of their channel.
+
+Each buffer is tagged with the channel's change_seq, see change_feed.
+Commits made by this worker move the tag on, and a buffer whose tag is
+behind the channel missed a change made by another worker, so it is loaded
+again on its next read.
+'''
+
+import bisect
+import threading
+from collections import OrderedDict
+
+from sqlalchemy.orm import Query
+
+from slackr import db, helpers
+from slackr.message_scheduler import SCHEDULER
+from slackr.models.message import Message
+from slackr.models.react import React
+from slackr.utils.constants import (HISTORY_CACHE_CHANNELS,
+                                    HISTORY_CACHE_SIZE, HISTORY_CACHE_TTL)
+
+
+def _sort_key(details):
+    return (details['time_created'], details['message_id'])
+
+
+def _for_viewer(details, u_id):
+    return {
+        **details, 'reacts': [{
+            'react_id': react['react_id'],
+            'u_ids': list(react['u_ids']),
+            'is_this_user_reacted': u_id in react['u_ids']
+        } for react in details['reacts']]
+    }
+
+
+class _Buffer:
+    def __init__(self, messages, complete, seq):
+        self.messages = messages
+        self.keys = [_sort_key(details) for details in messages]
+        self.complete = complete
+        self.seq = seq
+        self.stale = set()
+        self.used_at = helpers.utc_now()
+
+    def upsert(self, details):
+        self.remove(details['message_id'])
+
+        key = _sort_key(details)
+        # Messages older than the buffer are only kept when it holds the
+        # whole channel
+        if not self.complete and self.keys and key < self.keys[0]:
+            return
+
+        i = bisect.bisect(self.keys, key)
+        self.keys.insert(i, key)
+        self.messages.insert(i, details)
+
+    def remove(self, message_id):
+        for i, details in enumerate(self.messages):
+            if details['message_id'] == message_id:
+                del self.messages[i]
+                del self.keys[i]
+                return True
+        return False
+
+    def trim(self, size):
+        if len(self.messages) > size:
+            del self.messages[:-size]
+            del self.keys[:-size]
+            self.complete = False
+
+
+class HistoryCache:
+    ''' Bounded LRU cache of the newest visible messages of each channel.
+
+    At most `channels` channels are buffered, each with at most `size`
+    messages, and channels that have not been read for `ttl` seconds are
+    dropped. Messages are stored without a viewer, and is_this_user_reacted
+    is filled in from the cached u_ids when they are read.
+    '''
+    def __init__(self, channels, size, ttl):
+        self.channels = channels
+        self.size = size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._buffers = OrderedDict()
+        self._loading = {}
+
+    def latest(self, channel, limit, user):
+        ''' Get the newest visible messages of a channel
+
+        Parameters:
+            channel (obj): The channel
+            limit (int): Maximum number of messages
+            user (obj): The user viewing the messages
+
+        Returns:
+            messages (list): Details of the messages in chronological order
+            has_more (bool): Whether there are older messages
+
+        '''
+        buffer = self._buffer(channel, limit)
+        if buffer is None:
+            messages, has_more = Message.history(channel.channel_id,
+                                                 limit=limit)
+            return Message.details_batch(messages, user), has_more
+
+        with self._lock:
+            messages = buffer.messages[-limit:]
+            has_more = len(buffer.messages) > limit or not buffer.complete
+
+        return [_for_viewer(details, user.u_id)
+                for details in messages], has_more
+
+    def page(self, channel, start, limit, user, total):
+        ''' Get the visible messages of a channel by offset, oldest first.
+        Pages within the newest `size` messages are served from the buffer.
+
+        Parameters:
+            channel (obj): The channel
+            start (int): Number of messages to skip
+            limit (int): Maximum number of messages
+            user (obj): The user viewing the messages
+            total (int): Number of visible messages in the channel
+
+        Returns:
+            messages (list): Details of the messages in chronological order
+            has_more (bool): Whether there are more messages past the page
+
+        '''
+        buffer = None
+        if start >= total - self.size:
+            buffer = self._buffer(channel, limit)
+
+        if buffer is not None:
+            with self._lock:
+                # Offset of the oldest buffered message. A count that does
+                # not agree with the buffer was taken across a change
+                first = total - len(buffer.messages)
+                if first <= start and (first == 0 if buffer.complete else
+                                       first >= 0):
+                    messages = buffer.messages[start - first:start - first +
+                                               limit]
+                    return [
+                        _for_viewer(details, user.u_id)
+                        for details in messages
+                    ], total > start + limit
+
+        messages, has_more = Message.page(channel.channel_id, start, limit)
+        return Message.details_batch(messages, user), has_more
+
+    def mark_stale(self, channel_id, message_ids):
+        ''' Reload messages of a channel on the next read
+
+        Parameters:
+            channel_id (int): ID of the channel
+            message_ids (iterable): IDs of the changed messages
+
+        '''
+        with self._lock:
+            buffer = self._buffers.get(channel_id)
+            if buffer is not None:
+                buffer.stale.update(message_ids)
+
+            for pending in self._loading.get(channel_id, ()):
+                pending.update(message_ids)
+
+    def advance(self, channel_id, seq):
+        ''' Move the buffer of a channel on to a change_seq committed by this
+        worker, dropping it if it missed an earlier change
+
+        Parameters:
+            channel_id (int): ID of the channel
+            seq (int): change_seq after the commit
+
+        '''
+        with self._lock:
+            buffer = self._buffers.get(channel_id)
+            if buffer is None:
+                return
+            if buffer.seq == seq - 1:
+                buffer.seq = seq
+            elif buffer.seq < seq:
+                del self._buffers[channel_id]
+
+    def invalidate(self, channel_id):
+        ''' Drop the buffer of a channel '''
+        with self._lock:
+            self._buffers.pop(channel_id, None)
+            for pending in self._loading.get(channel_id, ()):
+                pending.add(None)
+
+    def clear(self):
+        ''' Drop every buffer '''
+        with self._lock:
+            self._buffers.clear()
+            for loads in self._loading.values():
+                for pending in loads:
+                    pending.add(None)
+
+    def stats(self):
+        ''' Get the cache's counters
+
+        Returns (dict):
+            hits (int): Reads answered from a buffer
+            misses (int): Reads that loaded a buffer
+            evictions (int): Buffers dropped to stay within the limits
+            channels (int): Number of buffered channels
+            messages (int): Number of buffered messages
+
+        '''
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'channels': len(self._buffers),
+                'messages': sum(
+                    len(buffer.messages) for buffer in self._buffers.values())
+            }
+
+    def _buffer(self, channel, limit):
+        if limit > self.size or self.channels <= 0:
+            return None
+
+        channel_id = channel.channel_id
+        now = helpers.utc_now()
+        with self._lock:
+            self._evict_idle(now)
+            buffer = self._buffers.get(channel_id)
+            if buffer is not None and buffer.seq < channel.change_seq:
+                del self._buffers[channel_id]
+                buffer = None
+            if buffer is not None:
+                buffer.used_at = now
+                self._buffers.move_to_end(channel_id)
+                stale, buffer.stale = buffer.stale, set()
+
+        if buffer is not None:
+            try:
+                usable = not stale or self._refresh(buffer, stale)
+            except Exception:
+                # Try again on the next read
+                with self._lock:
+                    buffer.stale.update(stale)
+                raise
+
+            if usable:
+                with self._lock:
+                    self.hits += 1
+                return buffer
+
+            with self._lock:
+                if self._buffers.get(channel_id) is buffer:
+                    del self._buffers[channel_id]
+
+        return self._load(channel)
+
+    def _load(self, channel):
+        # Changes committed while the buffer loads are applied before it is
+        # kept, and None marks an invalidation. The seq was read before the
+        # messages, so a change committed meanwhile only costs another load
+        channel_id = channel.channel_id
+        pending = set()
+        with self._lock:
+            self._loading.setdefault(channel_id, []).append(pending)
+
+        try:
+            messages, has_more = Message.history(channel_id, limit=self.size)
+            buffer = _Buffer([
+                self._shared(details)
+                for details in Message.details_batch(messages)
+            ],
+                             complete=not has_more,
+                             seq=channel.change_seq)
+        finally:
+            with self._lock:
+                loads = self._loading[channel_id]
+                loads.remove(pending)
+                if not loads:
+                    del self._loading[channel_id]
+
+        if None in pending or (pending
+                               and not self._refresh(buffer, pending)):
+            return None
+
+        with self._lock:
+            self.misses += 1
+            self._buffers[channel_id] = buffer
+            while len(self._buffers) > self.channels:
+                self._buffers.popitem(last=False)
+                self.evictions += 1
+
+        return buffer
+
+    def _refresh(self, buffer, message_ids):
+        # Returns whether the buffer is still usable
+        messages = Message.query.filter(
+            Message.message_id.in_(message_ids)).all()
+        visible = {
+            message.message_id: self._shared(details)
+            for message, details in zip(messages,
+                                        Message.details_batch(messages))
+            if not message.is_hidden
+        }
+
+        with self._lock:
+            for message_id in message_ids:
+                if message_id in visible:
+                    buffer.upsert(visible[message_id])
+                else:
+                    buffer.remove(message_id)
+            buffer.trim(self.size)
+
+            # Older messages are not loaded to fill the gap left by removed
+            # ones, so the buffer is reloaded instead
+            return buffer.complete or len(buffer.messages) == self.size
+
+    def _evict_idle(self, now):
+        while self._buffers:
+            channel_id, buffer = next(iter(self._buffers.items()))
+            if now - buffer.used_at < self.ttl:
+                break
+            del self._buffers[channel_id]
+            self.evictions += 1
+
+    @staticmethod
+    def _shared(details):
+        return {
+            **details, 'reacts': [{
+                'react_id': react['react_id'],
+                'u_ids': tuple(react['u_ids'])
+            } for react in details['reacts']]
+        }
+
+
+HISTORY_CACHE = HistoryCache(HISTORY_CACHE_CHANNELS, HISTORY_CACHE_SIZE,
+                             HISTORY_CACHE_TTL)
+
+
+def _pending(session):
+    return session.info.setdefault('history_cache', {})
+
+
+def _record_flush(session, flush_context):
+    for target in session.new | session.dirty | session.deleted:
+        if isinstance(target, Message):
+            channel_id = target.channel_id
+        elif isinstance(target, React) and target.message is not None:
+            channel_id = target.message.channel_id
+        else:
+            continue
+
+        message_id = target.message_id
+        _pending(session).setdefault(channel_id, set()).add(message_id)
+
+
+def _record_bulk_delete(query, delete_context):
+    if query.column_descriptions[0]['entity'] is not Message:
+        return
+
+    invalid = query.session.info.setdefault('history_cache_invalid', set())
+    invalid.update(
+        channel_id
+        for channel_id, in query.with_entities(Message.channel_id).distinct())
+
+
+def _record_reveal(details, channel_id):
+    HISTORY_CACHE.mark_stale(channel_id, [details['message_id']])
+
+
+def _apply_pending(session):
+    for channel_id in session.info.pop('history_cache_invalid', ()):
+        HISTORY_CACHE.invalidate(channel_id)
+
+    for channel_id, message_ids in session.info.pop('history_cache',
+                                                    {}).items():
+        HISTORY_CACHE.mark_stale(channel_id, message_ids)
+
+    for channel_id, seq in session.info.pop('change_seqs', {}).items():
+        HISTORY_CACHE.advance(channel_id, seq)
+
+
+def _discard_pending(session, previous_transaction):
+    session.info.pop('history_cache', None)
+    session.info.pop('history_cache_invalid', None)
+    session.info.pop('change_seqs', None)
+
+
+SCHEDULER.add_listener(_record_reveal)
+db.event.listen(db.session, 'after_flush', _record_flush)
+db.event.listen(Query, 'before_compile_delete', _record_bulk_delete)
+db.event.listen(db.session, 'after_commit', _apply_pending)
+db.event.listen(db.session, 'after_soft_rollback', _discard_pending)
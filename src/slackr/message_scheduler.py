@@ -0,0 +1,185 @@
+'''
+Scheduler that reveals messages sent with message_sendlater. Pending sends
+are persisted in the scheduled_message table and mirrored in an in-memory
+min-heap of send times, so a single thread per worker can sleep until the
+next send is due and pending sends survive a restart.
+'''
+
+import heapq
+import threading
+import time
+import traceback
+
+from slackr import db, helpers
+from slackr.models.message import Message
+from slackr.models.scheduled_message import ScheduledMessage
+from slackr.utils.constants import (SCHEDULER_BATCH_SIZE,
+                                    SCHEDULER_RELOAD_INTERVAL)
+
+
+class MessageScheduler:
+    ''' Reveals scheduled messages once their send time has passed.
+
+    Due messages are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so when
+    several workers share a database each message is revealed exactly once.
+    Every worker also reloads the table periodically, which picks up sends
+    scheduled by a worker that has since gone away.
+    '''
+    def __init__(self, batch_size=SCHEDULER_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._condition = threading.Condition()
+        self._heap = []
+        self._listeners = []
+        self._thread = None
+
+    def add_listener(self, listener):
+        ''' Register a function to be called for every revealed message
+
+        Parameters:
+            listener (function): Called with the message's details and
+                                 channel_id
+
+        '''
+        self._listeners.append(listener)
+
+    def schedule(self, message, time_sent):
+        ''' Schedule a hidden message to be revealed. The caller commits,
+        and the send is only waited on once the commit has succeeded.
+
+        Parameters:
+            message (obj): A hidden message object
+            time_sent (int): Unix timestamp of when to reveal the message
+
+        '''
+        db.session.add(ScheduledMessage(message.message_id, time_sent))
+        db.session.info.setdefault('scheduled_sends', []).append(
+            (self, time_sent))
+
+    def start(self):
+        ''' Start the scheduler thread, which loads pending sends '''
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def fire_due(self):
+        ''' Reveal every message that is due, a batch per transaction
+
+        Returns:
+            (int): The number of messages revealed by this worker
+
+        '''
+        fired = 0
+        while True:
+            now = helpers.utc_now()
+            jobs = ScheduledMessage.query.filter(
+                ScheduledMessage.time_sent <= now).order_by(
+                    ScheduledMessage.time_sent).with_for_update(
+                        skip_locked=True).limit(self.batch_size).all()
+
+            if not jobs:
+                return fired
+
+            message_ids = [job.message_id for job in jobs]
+
+            Message.query.filter(Message.message_id.in_(message_ids)).update(
+                {
+                    'is_hidden': False,
+                    'time_created': now
+                },
+                synchronize_session=False)
+            ScheduledMessage.query.filter(
+                ScheduledMessage.id.in_([job.id for job in jobs])).delete(
+                    synchronize_session=False)
+            db.session.commit()
+
+            messages = Message.query.filter(
+                Message.message_id.in_(message_ids)).order_by(
+                    Message.message_id).all()
+
+            for message, details in zip(messages,
+                                        Message.details_batch(messages)):
+                for listener in self._listeners:
+                    try:
+                        listener(details, message.channel_id)
+                    except Exception:  # pylint: disable=broad-except
+                        traceback.print_exc()
+
+            fired += len(jobs)
+
+            if len(jobs) < self.batch_size:
+                return fired
+
+    def _push(self, time_sent):
+        with self._condition:
+            heapq.heappush(self._heap, time_sent)
+            self._condition.notify()
+
+    def _reload(self):
+        # The table does not exist yet when starting against a fresh database
+        if not db.engine.dialect.has_table(db.engine,
+                                           ScheduledMessage.__tablename__):
+            return
+
+        times = [
+            time_sent for time_sent, in db.session.query(
+                ScheduledMessage.time_sent).distinct()
+        ]
+        with self._condition:
+            self._heap = times
+            heapq.heapify(self._heap)
+
+    def _pop_due(self):
+        with self._condition:
+            is_due = False
+            while self._heap and self._heap[0] <= time.time():
+                heapq.heappop(self._heap)
+                is_due = True
+            return is_due
+
+    def _wait_until(self, deadline):
+        with self._condition:
+            if self._heap:
+                deadline = min(deadline, self._heap[0])
+            timeout = deadline - time.time()
+            if timeout > 0:
+                self._condition.wait(timeout)
+
+    def _run(self):
+        reload_at = 0
+        while True:
+            if time.time() >= reload_at:
+                reload_at = time.time() + SCHEDULER_RELOAD_INTERVAL
+                self._run_safely(self._reload)
+
+            if self._pop_due():
+                self._run_safely(self.fire_due)
+
+            self._wait_until(reload_at)
+
+    @staticmethod
+    def _run_safely(func):
+        try:
+            func()
+        except Exception:  # pylint: disable=broad-except
+            traceback.print_exc()
+            db.session.rollback()
+        finally:
+            db.session.remove()
+
+
+SCHEDULER = MessageScheduler()
+
+
+def _push_committed(session):
+    for scheduler, time_sent in session.info.pop('scheduled_sends', []):
+        scheduler._push(time_sent)  # pylint: disable=protected-access
+
+
+def _discard_pending(session, previous_transaction):
+    session.info.pop('scheduled_sends', None)
+
+
+db.event.listen(db.session, 'after_commit', _push_committed)
+db.event.listen(db.session, 'after_soft_rollback', _discard_pending)
@@ -0,0 +1,247 @@
+'''
+Full-text and substring search over messages. PostgreSQL searches a GIN
+index on the tsvector of each message and SQLite searches an FTS5 table kept
+in sync with the message table by triggers, so the index is updated by the
+same statement that sends, edits or removes a message.
+
+Substring search narrows candidates with a pg_trgm index where the extension
+is available and the in-process trigram index elsewhere, then checks each
+candidate exactly.
+'''
+
+import re
+
+from slackr import db
+from slackr.models import user_channel_identifier
+from slackr.models.message import Message
+from slackr.trigram_index import TRIGRAM_INDEX
+
+TEXT_SEARCH_CONFIG = 'english'
+
+FTS_TABLE = db.table('message_fts', db.column('rowid'))
+
+SQLITE_DDL = (
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS message_fts USING fts5(
+        message, content='message', content_rowid='message_id',
+        tokenize='porter unicode61')''',
+    '''CREATE TRIGGER IF NOT EXISTS message_fts_insert AFTER INSERT ON message
+    BEGIN
+        INSERT INTO message_fts (rowid, message)
+        VALUES (new.message_id, new.message);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS message_fts_delete AFTER DELETE ON message
+    BEGIN
+        INSERT INTO message_fts (message_fts, rowid, message)
+        VALUES ('delete', old.message_id, old.message);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS message_fts_update
+    AFTER UPDATE OF message ON message
+    BEGIN
+        INSERT INTO message_fts (message_fts, rowid, message)
+        VALUES ('delete', old.message_id, old.message);
+        INSERT INTO message_fts (rowid, message)
+        VALUES (new.message_id, new.message);
+    END''',
+)
+
+POSTGRES_DDL = (
+    f'''CREATE INDEX IF NOT EXISTS ix_message_fts ON message
+    USING GIN (to_tsvector('{TEXT_SEARCH_CONFIG}'::regconfig, message))''', )
+
+PG_TRGM_DDL = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    '''CREATE INDEX IF NOT EXISTS ix_message_trgm ON message
+    USING GIN (lower(message) gin_trgm_ops)''',
+)
+
+# IN lists are split into chunks to stay under SQLite's parameter limit
+CANDIDATE_CHUNK_SIZE = 500
+
+_trgm_indexed = None
+
+
+def search_terms(query_str):
+    ''' Split a query string into lowercase search terms
+
+    Parameters:
+        query_str (str): Query string
+
+    Returns:
+        (list): Words in the query string
+
+    '''
+    return re.findall(r'\w+', query_str.lower())
+
+
+def _tsvector():
+    config = db.literal_column(f"'{TEXT_SEARCH_CONFIG}'::regconfig")
+    return db.func.to_tsvector(config, Message.message)
+
+
+def _tsquery(terms):
+    config = db.literal_column(f"'{TEXT_SEARCH_CONFIG}'::regconfig")
+    return db.func.to_tsquery(config, ' & '.join(f'{term}:*'
+                                                 for term in terms))
+
+
+def _fts5_query(terms):
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def install(bind=None):
+    ''' Create the search index and, on SQLite, the triggers that keep it up
+    to date. Safe to run against a database that already has them, and
+    indexes any messages written before the index existed.
+
+    Parameters:
+        bind (obj): Connection or engine, defaults to the app's engine
+
+    '''
+    bind = bind if bind is not None else db.engine
+    dialect = bind.dialect.name
+
+    is_new = dialect == 'sqlite' and not bind.dialect.has_table(
+        bind, 'message_fts')
+
+    for statement in _ddl(dialect):
+        bind.execute(db.text(statement))
+
+    if dialect == 'postgresql' and bind.execute(
+            db.text("SELECT 1 FROM pg_available_extensions "
+                    "WHERE name = 'pg_trgm'")).first():
+        for statement in PG_TRGM_DDL:
+            bind.execute(db.text(statement))
+
+    # An external content FTS5 table starts out empty
+    if is_new:
+        bind.execute(
+            db.text("INSERT INTO message_fts (message_fts) VALUES ('rebuild')"))
+
+
+def _ddl(dialect):
+    if dialect == 'sqlite':
+        return SQLITE_DDL
+    if dialect == 'postgresql':
+        return POSTGRES_DDL
+    return ()
+
+
+def _has_trgm_index():
+    global _trgm_indexed  # pylint: disable=global-statement
+    if _trgm_indexed is None:
+        _trgm_indexed = db.engine.dialect.name == 'postgresql' and \
+            db.session.execute(db.text(
+                "SELECT 1 FROM pg_indexes WHERE indexname = 'ix_message_trgm'"
+            )).first() is not None
+    return _trgm_indexed
+
+
+def _install_on_create(target, connection, **kwargs):
+    install(connection)
+
+
+def _uninstall_on_drop(target, connection, **kwargs):
+    # The FTS5 table is not part of the metadata, so it has to be dropped with
+    # the message table to stop it indexing rowids that get reused
+    if connection.dialect.name == 'sqlite':
+        connection.execute(db.text('DROP TABLE IF EXISTS message_fts'))
+
+
+db.event.listen(Message.__table__, 'after_create', _install_on_create)
+db.event.listen(Message.__table__, 'before_drop', _uninstall_on_drop)
+
+
+def _visible_messages(user):
+    channel_ids = db.session.query(user_channel_identifier.c.channel_id).filter(
+        user_channel_identifier.c.u_id == user.u_id)
+
+    return Message.query.filter(Message.channel_id.in_(channel_ids),
+                                Message.is_hidden.is_(False))
+
+
+def substring_search(user, query_str):
+    ''' Find the visible messages in the user's channels that contain the
+    query string, ignoring case
+
+    Parameters:
+        user (obj): A user object
+        query_str (str): Query string
+
+    Returns:
+        (list): Message objects ordered by channel, then by when they were
+                sent
+
+    '''
+    needle = query_str.lower()
+    order = (Message.channel_id, Message.message_id)
+
+    if _has_trgm_index():
+        escaped = needle.replace('\\', '\\\\').replace('%', '\\%').replace(
+            '_', '\\_')
+        candidates = _visible_messages(user).filter(
+            db.func.lower(Message.message).like(f'%{escaped}%',
+                                                escape='\\')).order_by(
+                                                    *order).all()
+    else:
+        ids = TRIGRAM_INDEX.candidates(needle)
+        if ids is None:
+            candidates = _visible_messages(user).order_by(*order).all()
+        else:
+            ids = sorted(ids)
+            candidates = []
+            for i in range(0, len(ids), CANDIDATE_CHUNK_SIZE):
+                candidates += _visible_messages(user).filter(
+                    Message.message_id.in_(
+                        ids[i:i + CANDIDATE_CHUNK_SIZE])).all()
+            candidates.sort(key=lambda message: (message.channel_id,
+                                                 message.message_id))
+
+    # The index only narrows the search, so every candidate is checked
+    return [
+        message for message in candidates
+        if needle in message.message.lower()
+    ]
+
+
+def search(user, query_str, start=0, limit=50):
+    ''' Find the visible messages in the user's channels that contain every
+    word of the query, best matches first
+
+    Parameters:
+        user (obj): A user object
+        query_str (str): Query string
+        start (int): Number of matches to skip
+        limit (int): Maximum number of matches to return
+
+    Returns:
+        messages (list): Message objects ordered by relevance
+        has_more (bool): Whether there are more matches past the page
+
+    '''
+    query = _visible_messages(user)
+
+    terms = search_terms(query_str)
+    dialect = db.engine.dialect.name
+
+    if terms and dialect == 'postgresql':
+        vector, tsquery = _tsvector(), _tsquery(terms)
+        query = query.filter(vector.op('@@')(tsquery)).order_by(
+            db.func.ts_rank(vector, tsquery).desc())
+    elif terms and dialect == 'sqlite':
+        fts = db.literal_column('message_fts')
+        query = query.join(FTS_TABLE,
+                           FTS_TABLE.c.rowid == Message.message_id).filter(
+                               fts.op('MATCH')(_fts5_query(terms))).order_by(
+                                   db.func.bm25(fts))
+    else:
+        # Unindexed fallback for other databases
+        for term in terms:
+            query = query.filter(
+                db.func.lower(Message.message).contains(term,
+                                                        autoescape=True))
+
+    query = query.order_by(Message.time_created.desc(),
+                           Message.message_id.desc())
+
+    messages = query.offset(start).limit(limit + 1).all()
+    return messages[:limit], len(messages) > limit
@@ -1,5 +1,6 @@
 from functools import wraps
-from flask import Response, request, g
+from json import dumps
+from flask import Response, make_response, request, g
 from slackr import token_validation
 
 
@@ -11,8 +12,43 @@ def auth_middleware(func):
         else:
             payload = request.values
 
-        token_payload = token_validation.decode_token(payload.get('token'))
-        g.token_payload = token_payload
+        auth = token_validation.authenticate(payload.get('token'))
+        g.token_payload = auth.payload
         return func(*args, **kwargs)
 
     return decorated_function
+
+
+def socket_auth_middleware(func):
+    @wraps(func)
+    def decorated_function(payload, *args, **kwargs):
+        token_validation.authenticate(payload.get('token'))
+        return func(payload, *args, **kwargs)
+
+    return decorated_function
+
+
+def conditional(tag, build):
+    ''' Answer with 304 Not Modified when the client already has the
+    response with the given ETag, and build it otherwise. The tag is taken
+    before the response is built, so a change made in between only costs the
+    client one more full response.
+
+    Parameters:
+        tag (str): ETag of the current response, or None to always build it
+        build (func): Returns the response as a dictionary, or as a string
+                      when it is already serialized
+
+    '''
+    if tag is not None and request.if_none_match.contains(tag):
+        response = Response(status=304)
+    else:
+        body = build()
+        response = make_response(body if isinstance(body, str) else
+                                 dumps(body))
+
+    if tag is not None:
+        response.set_etag(tag)
+        response.headers['Cache-Control'] = 'no-cache'
+
+    return response
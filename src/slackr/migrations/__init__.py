@@ -0,0 +1,177 @@
+'''
+Versioned schema migrations. Each migration is a module in this package
+named m<version>_<description>.py with an upgrade(connection) function.
+Applied versions are recorded in the schema_version table, and every
+migration checks the live schema before changing it, so it is a no-op on a
+database that db.create_all() has already built from the current models.
+
+Usage:
+    python3 -m slackr.migrations [--explain]
+'''
+
+import importlib
+import pkgutil
+import re
+from collections import namedtuple
+
+from slackr import db, helpers
+
+Migration = namedtuple('Migration', ['version', 'name', 'upgrade'])
+
+METADATA = db.MetaData()
+
+SCHEMA_VERSION = db.Table('schema_version', METADATA,
+                          db.Column('version', db.Integer, primary_key=True),
+                          db.Column('name', db.String(100), nullable=False),
+                          db.Column('applied_at', db.Integer, nullable=False))
+
+
+def migrations():
+    ''' Every migration in this package
+
+    Returns:
+        (list): Migrations in version order
+
+    '''
+    found = []
+    for module in pkgutil.iter_modules(__path__):
+        match = re.fullmatch(r'm(\d+)_(\w+)', module.name)
+        if match is None:
+            continue
+        upgrade = importlib.import_module(f'{__name__}.{module.name}').upgrade
+        found.append(Migration(int(match.group(1)), match.group(2), upgrade))
+    return sorted(found)
+
+
+def applied_versions(bind=None):
+    ''' Versions that have been applied to the database
+
+    Parameters:
+        bind (obj): Connection or engine, defaults to the app's engine
+
+    Returns:
+        (set): Applied versions
+
+    '''
+    bind = bind if bind is not None else db.engine
+    SCHEMA_VERSION.create(bind, checkfirst=True)
+    return {
+        version
+        for version, in bind.execute(db.select([SCHEMA_VERSION.c.version]))
+    }
+
+
+def migrate(bind=None):
+    ''' Apply every pending migration, each in its own transaction
+
+    Parameters:
+        bind (obj): Engine, defaults to the app's engine
+
+    Returns:
+        (list): Migrations that were applied
+
+    '''
+    bind = bind if bind is not None else db.engine
+    applied = applied_versions(bind)
+
+    pending = [
+        migration for migration in migrations()
+        if migration.version not in applied
+    ]
+
+    for migration in pending:
+        with bind.begin() as connection:
+            migration.upgrade(connection)
+            connection.execute(SCHEMA_VERSION.insert().values(
+                version=migration.version,
+                name=migration.name,
+                applied_at=helpers.utc_now()))
+
+    return pending
+
+
+def has_index(connection, table, name):
+    ''' Whether a table has an index with the given name '''
+    return any(index['name'] == name
+               for index in db.inspect(connection).get_indexes(table))
+
+
+def create_index(connection, table, name, *columns, unique=False):
+    ''' Create an index unless it already exists
+
+    Parameters:
+        connection (obj): Connection
+        table (str): Name of the table
+        name (str): Name of the index
+        columns (str): Names of the indexed columns
+        unique (bool): Whether the index is unique
+
+    '''
+    if has_index(connection, table, name):
+        return
+
+    target = db.Table(table, db.MetaData(),
+                      *(db.Column(column) for column in columns))
+    db.Index(name, *(target.c[column] for column in columns),
+             unique=unique).create(connection)
+
+
+def has_column(connection, table, name):
+    ''' Whether a table has a column with the given name '''
+    return any(column['name'] == name
+               for column in db.inspect(connection).get_columns(table))
+
+
+def add_column(connection, table, column):
+    ''' Add a column to a table unless it already has it. A column that is
+    not nullable needs a server default to fill in the existing rows.
+
+    Parameters:
+        connection (obj): Connection
+        table (str): Name of the table
+        column (obj): Column to add, not attached to a table
+
+    '''
+    if has_column(connection, table, column.name):
+        return
+
+    preparer = connection.dialect.identifier_preparer
+    column_type = column.type.compile(dialect=connection.dialect)
+    definition = f'{preparer.quote(column.name)} {column_type}'
+    if column.server_default is not None:
+        definition += f' DEFAULT {column.server_default.arg}'
+    if not column.nullable:
+        definition += ' NOT NULL'
+
+    connection.execute(
+        db.text(f'ALTER TABLE {preparer.quote(table)} ADD COLUMN {definition}'))
+
+
+def has_primary_key(connection, table):
+    ''' Whether a table has a primary key '''
+    constraint = db.inspect(connection).get_pk_constraint(table)
+    return bool(constraint and constraint.get('constrained_columns'))
+
+
+def rebuild_table(connection, table):
+    ''' Replace a table with a new definition of it, copying over the
+    distinct rows whose key columns are set. Used for changes SQLite cannot
+    make with ALTER TABLE, such as adding a primary key.
+
+    Parameters:
+        connection (obj): Connection
+        table (obj): Table with the new definition, bound to its own
+                     MetaData
+
+    '''
+    legacy = f'{table.name}_legacy'
+    columns = ', '.join(column.name for column in table.columns)
+    keys = ' AND '.join(f'{column.name} IS NOT NULL'
+                        for column in table.primary_key.columns)
+
+    connection.execute(db.text(f'ALTER TABLE {table.name} RENAME TO {legacy}'))
+    table.create(connection)
+    connection.execute(
+        db.text(f'INSERT INTO {table.name} ({columns}) '
+                f'SELECT DISTINCT {columns} FROM {legacy} WHERE {keys}'))
+    connection.execute(db.text(f'DROP TABLE {legacy}'))
@@ -0,0 +1,30 @@
+'''
+Apply pending migrations, optionally reporting the query plans of the main
+endpoints before and after.
+'''
+
+import sys
+
+from slackr.migrations import migrate
+from slackr.migrations.plans import query_plans, report
+
+
+def main(argv):
+    explain = '--explain' in argv
+
+    if explain:
+        before = query_plans()
+
+    applied = migrate()
+    for migration in applied:
+        print(f'Applied {migration.version:04d} {migration.name}')
+
+    if not applied:
+        print('Schema is up to date')
+
+    if explain:
+        print(report(before, query_plans()))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
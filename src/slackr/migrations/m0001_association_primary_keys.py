@@ -0,0 +1,75 @@
+'''
+Composite primary keys on the association tables, which also stops
+duplicate memberships, ownerships and reactions, plus an index on the
+second column of each key for lookups from the other side.
+'''
+
+from slackr import db
+from slackr.migrations import create_index, has_primary_key, rebuild_table
+
+METADATA = db.MetaData()
+
+# Stand-ins for the referenced tables so the foreign keys can be emitted
+db.Table('user', METADATA, db.Column('u_id', db.Integer, primary_key=True))
+db.Table('channel', METADATA,
+         db.Column('channel_id', db.Integer, primary_key=True))
+db.Table('message', METADATA,
+         db.Column('message_id', db.Integer, primary_key=True))
+db.Table('react', METADATA, db.Column('id', db.Integer, primary_key=True))
+
+TABLES = (
+    db.Table(
+        'user_channel_identifier', METADATA,
+        db.Column('u_id',
+                  db.Integer,
+                  db.ForeignKey('user.u_id'),
+                  primary_key=True),
+        db.Column('channel_id',
+                  db.Integer,
+                  db.ForeignKey('channel.channel_id'),
+                  primary_key=True),
+        db.Index('ix_user_channel_identifier_channel_id', 'channel_id')),
+    db.Table(
+        'owner_channel_identifier', METADATA,
+        db.Column('u_id',
+                  db.Integer,
+                  db.ForeignKey('user.u_id'),
+                  primary_key=True),
+        db.Column('channel_id',
+                  db.Integer,
+                  db.ForeignKey('channel.channel_id'),
+                  primary_key=True),
+        db.Index('ix_owner_channel_identifier_channel_id', 'channel_id')),
+    db.Table(
+        'message_react_identifier', METADATA,
+        db.Column('message_id',
+                  db.Integer,
+                  db.ForeignKey('message.message_id'),
+                  primary_key=True),
+        db.Column('id',
+                  db.Integer,
+                  db.ForeignKey('react.id'),
+                  primary_key=True),
+        db.Index('ix_message_react_identifier_id', 'id')),
+    db.Table(
+        'user_react_identifier', METADATA,
+        db.Column('id',
+                  db.Integer,
+                  db.ForeignKey('react.id'),
+                  primary_key=True),
+        db.Column('u_id',
+                  db.Integer,
+                  db.ForeignKey('user.u_id'),
+                  primary_key=True),
+        db.Index('ix_user_react_identifier_u_id', 'u_id')),
+)
+
+
+def upgrade(connection):
+    for table in TABLES:
+        if not has_primary_key(connection, table.name):
+            rebuild_table(connection, table)
+
+        for index in table.indexes:
+            create_index(connection, table.name, index.name,
+                         *(column.name for column in index.columns))
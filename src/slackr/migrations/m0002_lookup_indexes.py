@@ -0,0 +1,19 @@
+'''
+Indexes for the columns messages, reacts and users are looked up by.
+'''
+
+from slackr.migrations import create_index
+
+INDEXES = (
+    ('message', 'ix_message_channel_history', 'channel_id', 'is_hidden',
+     'time_created', 'message_id'),
+    ('message', 'ix_message_u_id', 'u_id'),
+    ('message', 'ix_message_time_created', 'time_created'),
+    ('react', 'ix_react_message_id', 'message_id'),
+    ('user', 'ix_user_handle_str', 'handle_str'),
+)
+
+
+def upgrade(connection):
+    for table, name, *columns in INDEXES:
+        create_index(connection, table, name, *columns)
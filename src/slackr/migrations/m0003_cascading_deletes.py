@@ -0,0 +1,62 @@
+'''
+ON DELETE actions on the foreign keys to users, channels, messages, reacts
+and standups, so the database removes whatever still refers to a deleted
+row. Only PostgreSQL can alter an existing foreign key. SQLite does not
+enforce foreign keys unless asked to, and channels and users are deleted
+with explicit statements for every dependent table anyway, so it is left
+as it is.
+'''
+
+from slackr import db
+
+# (table, columns, referred table, referred columns, ON DELETE action)
+FOREIGN_KEYS = (
+    ('user_channel_identifier', ['u_id'], 'user', ['u_id'], 'CASCADE'),
+    ('user_channel_identifier', ['channel_id'], 'channel', ['channel_id'],
+     'CASCADE'),
+    ('owner_channel_identifier', ['u_id'], 'user', ['u_id'], 'CASCADE'),
+    ('owner_channel_identifier', ['channel_id'], 'channel', ['channel_id'],
+     'CASCADE'),
+    ('message_react_identifier', ['message_id'], 'message', ['message_id'],
+     'CASCADE'),
+    ('message_react_identifier', ['id'], 'react', ['id'], 'CASCADE'),
+    ('user_react_identifier', ['id'], 'react', ['id'], 'CASCADE'),
+    ('user_react_identifier', ['u_id'], 'user', ['u_id'], 'CASCADE'),
+    ('message', ['u_id'], 'user', ['u_id'], 'CASCADE'),
+    ('message', ['channel_id'], 'channel', ['channel_id'], 'CASCADE'),
+    ('react', ['message_id'], 'message', ['message_id'], 'CASCADE'),
+    ('standup', ['starting_u_id'], 'user', ['u_id'], 'SET NULL'),
+    ('standup', ['channel_id'], 'channel', ['channel_id'], 'CASCADE'),
+    ('standup_entry', ['u_id'], 'user', ['u_id'], 'CASCADE'),
+    ('hangman', ['channel_id'], 'channel', ['channel_id'], 'CASCADE'),
+)
+
+
+def upgrade(connection):
+    if connection.dialect.name != 'postgresql':
+        return
+
+    inspector = db.inspect(connection)
+    preparer = connection.dialect.identifier_preparer
+
+    for table, columns, referred_table, referred_columns, action in \
+            FOREIGN_KEYS:
+        for foreign_key in inspector.get_foreign_keys(table):
+            if foreign_key['constrained_columns'] != columns:
+                continue
+
+            ondelete = foreign_key.get('options', {}).get('ondelete')
+            if ondelete is not None and ondelete.upper() == action:
+                continue
+
+            name = foreign_key['name']
+            connection.execute(
+                db.text(f'ALTER TABLE {preparer.quote(table)} '
+                        f'DROP CONSTRAINT {preparer.quote(name)}'))
+            connection.execute(
+                db.text(
+                    f'ALTER TABLE {preparer.quote(table)} '
+                    f'ADD CONSTRAINT {preparer.quote(name)} '
+                    f'FOREIGN KEY ({", ".join(columns)}) '
+                    f'REFERENCES {preparer.quote(referred_table)} '
+                    f'({", ".join(referred_columns)}) ON DELETE {action}'))
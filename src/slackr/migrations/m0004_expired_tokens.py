@@ -0,0 +1,65 @@
+'''
+Carry logged out tokens over from the expired_token table, which stored
+whole tokens, into revoked_token, then drop it. Tokens issued before the
+jti and exp claims are revoked under a SHA-256 of the token, the same id
+token_validation.token_id gives them, and never expire.
+'''
+
+import hashlib
+
+from slackr import db, helpers
+
+BATCH_SIZE = 500
+
+METADATA = db.MetaData()
+
+REVOKED_TOKEN = db.Table(
+    'revoked_token', METADATA,
+    db.Column('token_id', db.String(64), primary_key=True),
+    db.Column('revoked_at', db.Integer, nullable=False, index=True),
+    db.Column('expires_at', db.Integer, index=True))
+
+EXPIRED_TOKEN = db.Table('expired_token', METADATA,
+                         db.Column('token_id', db.Integer, primary_key=True),
+                         db.Column('token', db.String(500)))
+
+
+def upgrade(connection):
+    if not connection.dialect.has_table(connection, 'expired_token'):
+        return
+
+    REVOKED_TOKEN.create(connection, checkfirst=True)
+
+    now = helpers.utc_now()
+    last_id = None
+
+    while True:
+        query = db.select([EXPIRED_TOKEN.c.token_id,
+                           EXPIRED_TOKEN.c.token]).order_by(
+                               EXPIRED_TOKEN.c.token_id).limit(BATCH_SIZE)
+        if last_id is not None:
+            query = query.where(EXPIRED_TOKEN.c.token_id > last_id)
+
+        rows = connection.execute(query).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        token_ids = {
+            hashlib.sha256(token.encode()).hexdigest()
+            for _, token in rows if token is not None
+        }
+        token_ids -= {
+            token_id for token_id, in connection.execute(
+                db.select([REVOKED_TOKEN.c.token_id]).where(
+                    REVOKED_TOKEN.c.token_id.in_(token_ids)))
+        }
+
+        if token_ids:
+            connection.execute(REVOKED_TOKEN.insert(), [{
+                'token_id': token_id,
+                'revoked_at': now,
+                'expires_at': None
+            } for token_id in sorted(token_ids)])
+
+    EXPIRED_TOKEN.drop(connection)
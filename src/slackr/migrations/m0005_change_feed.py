@@ -0,0 +1,16 @@
+'''
+Count the changes to each channel's messages for the delta sync feed. The
+message_change table itself is new and is built by db.create_all().
+'''
+
+from slackr import db
+from slackr.migrations import add_column
+
+
+def upgrade(connection):
+    add_column(
+        connection, 'channel',
+        db.Column('change_seq',
+                  db.Integer,
+                  nullable=False,
+                  server_default='0'))
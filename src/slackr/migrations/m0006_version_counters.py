@@ -0,0 +1,22 @@
+'''
+Version counters for conditional GETs of channel details and channel lists.
+The counter table itself is new and is built by db.create_all().
+'''
+
+from slackr import db
+from slackr.migrations import add_column
+
+
+def upgrade(connection):
+    add_column(
+        connection, 'channel',
+        db.Column('details_version',
+                  db.Integer,
+                  nullable=False,
+                  server_default='0'))
+    add_column(
+        connection, 'user',
+        db.Column('channels_version',
+                  db.Integer,
+                  nullable=False,
+                  server_default='0'))
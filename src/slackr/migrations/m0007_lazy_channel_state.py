@@ -0,0 +1,31 @@
+'''
+Standup and hangman rows are created the first time a channel uses them, so
+the idle rows every channel was created with are dropped, and each table is
+looked up by a unique index on its channel.
+'''
+
+from slackr import db
+from slackr.migrations import create_index
+
+TABLES = ('standup', 'hangman')
+
+
+def upgrade(connection):
+    if connection.dialect.has_table(connection, 'standup_entry'):
+        # Entries left over from a finished standup are deleted when the
+        # next one starts anyway
+        connection.execute(
+            db.text('DELETE FROM standup_entry WHERE standup_id IN '
+                    '(SELECT id FROM standup WHERE is_active IS NOT TRUE)'))
+
+    for table in TABLES:
+        if not connection.dialect.has_table(connection, table):
+            continue
+
+        connection.execute(
+            db.text(f'DELETE FROM {table} WHERE is_active IS NOT TRUE'))
+        create_index(connection,
+                     table,
+                     f'ix_{table}_channel_id',
+                     'channel_id',
+                     unique=True)
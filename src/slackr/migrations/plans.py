@@ -0,0 +1,90 @@
+'''
+Query plans of the lookups made by the main endpoints, used to show the
+effect of a migration on them.
+'''
+
+from slackr import db
+
+MESSAGE = db.table('message', db.column('message_id'), db.column('u_id'),
+                   db.column('channel_id'), db.column('is_hidden'),
+                   db.column('time_created'))
+REACT = db.table('react', db.column('id'), db.column('message_id'))
+USER = db.table('user', db.column('u_id'), db.column('handle_str'))
+MEMBERS = db.table('user_channel_identifier', db.column('u_id'),
+                   db.column('channel_id'))
+OWNERS = db.table('owner_channel_identifier', db.column('u_id'),
+                  db.column('channel_id'))
+REACTORS = db.table('user_react_identifier', db.column('id'),
+                    db.column('u_id'))
+
+HOT_QUERIES = (
+    ('channel/messages page',
+     db.select([MESSAGE.c.message_id]).where(
+         db.and_(MESSAGE.c.channel_id == 1,
+                 MESSAGE.c.is_hidden == db.false())).order_by(
+                     MESSAGE.c.time_created, MESSAGE.c.message_id).limit(51)),
+    ('permission check: member',
+     db.select([MEMBERS.c.u_id]).where(
+         db.and_(MEMBERS.c.u_id == 1, MEMBERS.c.channel_id == 1))),
+    ('permission check: owner',
+     db.select([OWNERS.c.u_id]).where(
+         db.and_(OWNERS.c.u_id == 1, OWNERS.c.channel_id == 1))),
+    ('channel/details members',
+     db.select([MEMBERS.c.u_id]).where(MEMBERS.c.channel_id == 1)),
+    ('channels/list', db.select([MEMBERS.c.channel_id
+                                 ]).where(MEMBERS.c.u_id == 1)),
+    ('message reacts',
+     db.select([REACT.c.id]).where(REACT.c.message_id.in_([1, 2, 3]))),
+    ('react users', db.select([REACTORS.c.u_id]).where(REACTORS.c.id == 1)),
+    ('user reacts', db.select([REACTORS.c.id]).where(REACTORS.c.u_id == 1)),
+    ('user messages',
+     db.select([MESSAGE.c.message_id]).where(MESSAGE.c.u_id == 1)),
+    ('user/profile/sethandle',
+     db.select([USER.c.u_id]).where(USER.c.handle_str == 'handle')),
+)
+
+
+def query_plans(bind=None):
+    ''' The query plan of every hot query
+
+    Parameters:
+        bind (obj): Connection or engine, defaults to the app's engine
+
+    Returns:
+        (dict): Lines of each query's plan, keyed on its name
+
+    '''
+    bind = bind if bind is not None else db.engine
+    explain = 'EXPLAIN QUERY PLAN' if bind.dialect.name == 'sqlite' \
+        else 'EXPLAIN'
+
+    plans = {}
+    for name, query in HOT_QUERIES:
+        sql = str(
+            query.compile(dialect=bind.dialect,
+                          compile_kwargs={'literal_binds': True}))
+        rows = bind.execute(db.text(f'{explain} {sql}'))
+        plans[name] = [str(row[-1]) for row in rows]
+    return plans
+
+
+def report(before, after):
+    ''' Format the plans of the hot queries before and after a change
+
+    Parameters:
+        before (dict): Plans returned by query_plans
+        after (dict): Plans returned by query_plans
+
+    Returns:
+        (str): The report
+
+    '''
+    lines = []
+    for name, _ in HOT_QUERIES:
+        lines.append(name)
+        if before[name] == after[name]:
+            lines += [f'    = {line}' for line in after[name]]
+        else:
+            lines += [f'    - {line}' for line in before[name]]
+            lines += [f'    + {line}' for line in after[name]]
+    return '\n'.join(lines)
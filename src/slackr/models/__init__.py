@@ -2,20 +2,48 @@ from slackr import db
 
 user_channel_identifier = db.Table(
     'user_channel_identifier',
-    db.Column('u_id', db.Integer, db.ForeignKey('user.u_id')),
-    db.Column('channel_id', db.Integer, db.ForeignKey('channel.channel_id')))
+    db.Column('u_id',
+              db.Integer,
+              db.ForeignKey('user.u_id', ondelete='CASCADE'),
+              primary_key=True),
+    db.Column('channel_id',
+              db.Integer,
+              db.ForeignKey('channel.channel_id', ondelete='CASCADE'),
+              primary_key=True),
+    db.Index('ix_user_channel_identifier_channel_id', 'channel_id'))
 
 owner_channel_identifier = db.Table(
     'owner_channel_identifier',
-    db.Column('u_id', db.Integer, db.ForeignKey('user.u_id')),
-    db.Column('channel_id', db.Integer, db.ForeignKey('channel.channel_id')))
+    db.Column('u_id',
+              db.Integer,
+              db.ForeignKey('user.u_id', ondelete='CASCADE'),
+              primary_key=True),
+    db.Column('channel_id',
+              db.Integer,
+              db.ForeignKey('channel.channel_id', ondelete='CASCADE'),
+              primary_key=True),
+    db.Index('ix_owner_channel_identifier_channel_id', 'channel_id'))
 
 message_react_identifier = db.Table(
     'message_react_identifier',
-    db.Column('message_id', db.Integer, db.ForeignKey('message.message_id')),
-    db.Column('id', db.Integer, db.ForeignKey('react.id')))
+    db.Column('message_id',
+              db.Integer,
+              db.ForeignKey('message.message_id', ondelete='CASCADE'),
+              primary_key=True),
+    db.Column('id',
+              db.Integer,
+              db.ForeignKey('react.id', ondelete='CASCADE'),
+              primary_key=True),
+    db.Index('ix_message_react_identifier_id', 'id'))
 
 user_react_identifier = db.Table(
     'user_react_identifier',
-    db.Column('u_id', db.Integer, db.ForeignKey('user.u_id')),
-    db.Column('id', db.Integer, db.ForeignKey('react.id')))
+    db.Column('id',
+              db.Integer,
+              db.ForeignKey('react.id', ondelete='CASCADE'),
+              primary_key=True),
+    db.Column('u_id',
+              db.Integer,
+              db.ForeignKey('user.u_id', ondelete='CASCADE'),
+              primary_key=True),
+    db.Index('ix_user_react_identifier_u_id', 'u_id'))
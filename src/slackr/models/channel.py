@@ -1,6 +1,10 @@
 from slackr import db
 from slackr.models import owner_channel_identifier, user_channel_identifier
+from slackr.models.channel_purge import ChannelPurge
+from slackr.models.message import Message
+from slackr.models.message_change import MessageChange
 from slackr.models.standup import Standup
+from slackr.models.standup_entry import StandupEntry
 from slackr.models.hangman import Hangman
 
 
@@ -8,71 +12,51 @@ class Channel(db.Model):
     channel_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50))
     is_public = db.Column(db.Boolean)
+    # Sequence number of the latest change to the channel's messages
+    change_seq = db.Column(db.Integer,
+                           nullable=False,
+                           default=0,
+                           server_default='0')
+    # Bumped when the channel's members or owners change
+    details_version = db.Column(db.Integer,
+                                nullable=False,
+                                default=0,
+                                server_default='0')
     owner_members = db.relationship("User",
                                     backref=db.backref('owned_channels',
                                                        lazy=True),
                                     secondary=owner_channel_identifier)
     all_members = db.relationship("User",
-                                  backref=db.backref('channels', lazy=True),
-                                  secondary=user_channel_identifier)
-    messages = db.relationship('Message', backref='channel', lazy=True)
-    standup = db.relationship('Standup', backref='channel', uselist=False)
-    hangman = db.relationship('Hangman', backref='channel', uselist=False)
+                                  backref=db.backref('channels',
+                                                     lazy='dynamic'),
+                                  secondary=user_channel_identifier,
+                                  lazy='dynamic')
+    messages = db.relationship('Message', backref='channel', lazy='dynamic')
 
-    # hangman = None
+    # Standup and Hangman rows are created on first use, see ChannelState
 
     def __init__(self, user, name, is_public):
         self.name = name
         self.is_public = is_public
         self.all_members.append(user)
         self.owner_members.append(user)
-        self.standup = Standup()
-        self.hangman = Hangman()
 
-    @property
-    def details(self):
-        ''' Get a dictionary containing information within the channel.
-
-        Return (dict):
-            name (str): The name of the channel.
-            owner_members (list):
-                u_id (int): The user's ID.
-            all_members (list):
-                u_id (int): The user's ID.
-
-        '''
-        return {
-            'name':
-            self.name,
-            'owner_members': [user.details for user in self.owner_members],
-            'all_members':
-            sorted([user.details for user in self.all_members],
-                   key=lambda user: user['name_first'] + user['name_last'])
-        }
-
-    def is_member(self, user):
-        ''' Determines if a given user is a member of the channel.
+    @classmethod
+    def find(cls, channel_id):
+        ''' Get a channel by its ID. Channels that are queued to be purged
+        no longer exist as far as users are concerned.
 
         Parameters:
-            user (obj): A user object.
+            channel_id (int): ID of the channel
 
-        Return:
-            Bool: Whether the user is a member of the channel (True) or not (False).
+        Returns:
+            (obj): The channel, or None if there is no such channel
 
         '''
-        return user in self.all_members
-
-    def is_owner(self, user):
-        ''' Determines whether a user is an owner member.
-
-        Parameters:
-            user (obj): A user object.
-
-        Return:
-            Bool: Whether the user is an owner (True) or not (False).
-
-        '''
-        return user in self.owner_members
+        return cls.query.filter(
+            cls.channel_id == channel_id,
+            ~db.exists().where(
+                ChannelPurge.channel_id == cls.channel_id)).first()
 
     @property
     def id_name(self):
@@ -85,10 +69,38 @@ class Channel(db.Model):
         '''
         return {'channel_id': self.channel_id, 'name': self.name}
 
+    def detach(self):
+        ''' Remove every member and owner and make the channel private, so
+        that nobody can see or join it while its messages are purged. The
+        caller commits.
+
+        '''
+        self.is_public = False
+        for table in (user_channel_identifier, owner_channel_identifier):
+            db.session.execute(
+                table.delete().where(table.c.channel_id == self.channel_id))
+
     def delete_all(self):
-        for message in self.messages:
-            message.delete_all()
-            db.session.delete(message)
-        db.session.delete(self.standup)
-        db.session.delete(self.hangman)
-        db.session.commit()
+        ''' Delete the channel and everything in it using a fixed number of
+        set-based statements. The caller commits.
+
+        '''
+        channel_id = self.channel_id
+        standup_ids = db.select([Standup.id
+                                 ]).where(Standup.channel_id == channel_id)
+
+        Message.bulk_delete(Message.channel_id == channel_id)
+        self.detach()
+
+        db.session.execute(StandupEntry.__table__.delete().where(
+            StandupEntry.standup_id.in_(standup_ids)))
+        db.session.execute(
+            Standup.__table__.delete().where(Standup.channel_id == channel_id))
+        db.session.execute(
+            Hangman.__table__.delete().where(Hangman.channel_id == channel_id))
+        db.session.execute(MessageChange.__table__.delete().where(
+            MessageChange.channel_id == channel_id))
+        db.session.execute(
+            Channel.__table__.delete().where(Channel.channel_id == channel_id))
+
+        db.session.expunge(self)
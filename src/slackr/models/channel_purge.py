@@ -0,0 +1,11 @@
+from slackr import db, helpers
+
+
+class ChannelPurge(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    channel_id = db.Column(db.Integer, nullable=False, unique=True)
+    time_created = db.Column(db.Integer, nullable=False)
+
+    def __init__(self, channel_id):
+        self.channel_id = channel_id
+        self.time_created = helpers.utc_now()
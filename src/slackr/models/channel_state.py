@@ -0,0 +1,56 @@
+from sqlalchemy.exc import IntegrityError
+
+from slackr import db
+
+
+class ChannelState:
+    ''' State of a per-channel feature, such as a standup or a game of
+    hangman. A channel has at most one row, created the first time the
+    feature is used in it.
+    '''
+    @classmethod
+    def find(cls, channel_id, for_update=False):
+        ''' Get the state of a channel
+
+        Parameters:
+            channel_id (int): ID of the channel
+            for_update (bool): Whether to lock the row until the caller
+                               commits
+
+        Returns:
+            (obj): The state, or None if the feature was never used in the
+                   channel
+
+        '''
+        query = cls.query.filter_by(channel_id=channel_id)
+        if for_update:
+            query = query.with_for_update().populate_existing()
+        return query.first()
+
+    @classmethod
+    def for_channel(cls, channel_id):
+        ''' Get the state of a channel, creating it if the feature was never
+        used in the channel. A concurrent creation rolls the session back,
+        so nothing else should be changed before. The caller commits.
+
+        Parameters:
+            channel_id (int): ID of the channel
+
+        Returns:
+            (obj): The state
+
+        '''
+        state = cls.find(channel_id)
+        if state is not None:
+            return state
+
+        state = cls(channel_id=channel_id)
+        db.session.add(state)
+        try:
+            db.session.flush()
+        except IntegrityError:
+            # Created by a concurrent request
+            db.session.rollback()
+            return cls.find(channel_id)
+
+        return state
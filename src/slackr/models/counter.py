@@ -0,0 +1,10 @@
+from slackr import db
+
+
+class Counter(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __init__(self, name, value=0):
+        self.name = name
+        self.value = value
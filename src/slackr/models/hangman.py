@@ -1,34 +1,43 @@
-import random
 import string
 
-import wikiquote
-
 from slackr import db
+from slackr.models.channel_state import ChannelState
+from slackr.word_bank import WORD_BANK
 
 
-class Hangman(db.Model):
+class Hangman(ChannelState, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     is_active = db.Column(db.Boolean, default=False)
     word = db.Column(db.String(100))
     guesses = db.Column(db.String(23), default='')
     incorrect = db.Column(db.String(23), default='')
     stage = db.Column(db.Integer, default=0)
-    # prev_msg_id = db.Column(db.Integer)
-    channel_id = db.Column(db.Integer, db.ForeignKey('channel.channel_id'))
+    channel_id = db.Column(db.Integer,
+                           db.ForeignKey('channel.channel_id',
+                                         ondelete='CASCADE'),
+                           index=True,
+                           unique=True)
+
+    # Columns that hold the state of a game
+    STATE = ('is_active', 'word', 'guesses', 'incorrect', 'stage')
 
-    def start(self):
-        if self.is_active:
-            return
+    def start(self, word=None):
+        '''
+        Starts a game with the given word, or one from the word bank. The
+        caller persists the state.
+        '''
         self.is_active = True
-        self.word = get_word()
-        db.session.commit()
+        self.word = get_word() if word is None else word
+        self.guesses = ''
+        self.incorrect = ''
+        self.stage = 0
         return self.get_dashed()
 
-    # def set_prev_msg_id(self, prev_msg_id):
-    #     self.prev_msg_id = prev_msg_id
-    #     db.session.commit()
-
     def guess(self, letter):
+        '''
+        Records a guess and returns whether it was correct. The caller
+        persists the state.
+        '''
         letter = letter.lower()
         if letter not in self.guesses:
             self.guesses += letter
@@ -41,45 +50,40 @@ class Hangman(db.Model):
                 self.incorrect += letter
             is_correct = False
 
-        db.session.commit()
-
         return is_correct
 
     def stop(self):
+        '''
+        Ends the game. The caller persists the state.
+        '''
         self.is_active = False
         self.word = None
         self.guesses = ''
         self.incorrect = ''
         self.stage = 0
-        # self.prev_msg_id = 0
-        db.session.commit()
+
+    def snapshot(self):
+        '''
+        Returns the state of the game as a dictionary of column values.
+        '''
+        return {name: getattr(self, name) for name in self.STATE}
 
     def get_dashed(self):
         '''
         Returns a string where all unguessed letters are '_'.
         '''
-        for char in self.word:
-            if char not in string.ascii_letters:
-                return False
+        if not check_ascii(self.word):
+            return False
 
-        # getting list of all lowercase letters.
-        dashed = self.word
-        for char in dashed:
-            if char.lower() not in self.guesses and char.isalpha():
-                dashed = dashed.replace(char, '_ ')
-            elif char == ' ':
-                dashed = dashed.replace(char, '   ')
-        return dashed
+        return ''.join('_ ' if char.lower() not in self.guesses else char
+                       for char in self.word)
 
 
 def get_word():
     '''
-    Function to get a random word from wikiquote
+    Function to get a random word from the word bank
     '''
-    word = random.choice(wikiquote.random_titles(lang='en'))
-    while not word.isalpha() and not check_ascii(word):
-        word = random.choice(wikiquote.random_titles(lang='en'))
-    return word.strip()
+    return WORD_BANK.sample()
 
 
 def check_ascii(word):
@@ -1,18 +1,31 @@
 from slackr import db, helpers
+from slackr.models import message_react_identifier, user_react_identifier
+from slackr.models.react import React
+from slackr.models.scheduled_message import ScheduledMessage
+
+# IN lists are split into chunks to stay under SQLite's parameter limit
+DETAILS_CHUNK_SIZE = 500
 
 
 class Message(db.Model):
+    __table_args__ = (db.Index('ix_message_channel_history', 'channel_id',
+                               'is_hidden', 'time_created', 'message_id'), )
+
     message_id = db.Column(db.Integer, primary_key=True)
-    u_id = db.Column(db.Integer, db.ForeignKey('user.u_id'), nullable=False)
+    u_id = db.Column(db.Integer,
+                     db.ForeignKey('user.u_id', ondelete='CASCADE'),
+                     nullable=False,
+                     index=True)
     channel_id = db.Column(db.Integer,
-                           db.ForeignKey('channel.channel_id'),
+                           db.ForeignKey('channel.channel_id',
+                                         ondelete='CASCADE'),
                            nullable=False)
     message = db.Column(db.String(1000))
-    time_created = db.Column(
-        db.Integer,
-        nullable=False,
-    )
-    reacts = db.relationship("React", backref="message", lazy=True)
+    time_created = db.Column(db.Integer, nullable=False, index=True)
+    reacts = db.relationship("React",
+                             backref="message",
+                             lazy=True,
+                             cascade='all, delete-orphan')
     is_pinned = db.Column(db.Boolean, default=False)
     is_hidden = db.Column(db.Boolean, default=False)
 
@@ -25,6 +38,109 @@ class Message(db.Model):
     def __repr__(self):
         return f'{self.time_created}: {self.message}'
 
+    @classmethod
+    def history(cls, channel_id, before=None, after=None, limit=50):
+        ''' Fetch a page of visible messages from a channel using the
+        composite history index.
+
+        Parameters:
+            channel_id (int): The channel identification number.
+            before (obj): A message object. Only older messages are returned.
+            after (obj): A message object. Only newer messages are returned.
+            limit (int): The maximum number of messages to return.
+
+        Returns:
+            messages (list): Message objects in chronological order.
+            has_more (bool): Whether there are more messages past the page.
+
+        '''
+        query = cls.query.filter(cls.channel_id == channel_id,
+                                 cls.is_hidden.is_(False))
+
+        if after is not None:
+            query = query.filter(
+                db.or_(
+                    cls.time_created > after.time_created,
+                    db.and_(cls.time_created == after.time_created,
+                            cls.message_id > after.message_id)))
+            query = query.order_by(cls.time_created, cls.message_id)
+        else:
+            if before is not None:
+                query = query.filter(
+                    db.or_(
+                        cls.time_created < before.time_created,
+                        db.and_(cls.time_created == before.time_created,
+                                cls.message_id < before.message_id)))
+            query = query.order_by(cls.time_created.desc(),
+                                   cls.message_id.desc())
+
+        messages = query.limit(limit + 1).all()
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+
+        if after is None:
+            messages.reverse()
+
+        return messages, has_more
+
+    @classmethod
+    def page(cls, channel_id, start, limit=50):
+        ''' Fetch visible messages of a channel by offset, oldest first.
+
+        Parameters:
+            channel_id (int): The channel identification number.
+            start (int): Number of messages to skip.
+            limit (int): The maximum number of messages to return.
+
+        Returns:
+            messages (list): Message objects in chronological order.
+            has_more (bool): Whether there are more messages past the page.
+
+        '''
+        messages = cls.query.filter(cls.channel_id == channel_id,
+                                    cls.is_hidden.is_(False)).order_by(
+                                        cls.time_created,
+                                        cls.message_id).offset(start).limit(
+                                            limit + 1).all()
+        return messages[:limit], len(messages) > limit
+
+    @classmethod
+    def first_pages(cls, channel_ids, limit=50):
+        ''' Fetch the oldest visible messages of many channels in one
+        statement, each channel stopping at its page through the history
+        index.
+
+        Parameters:
+            channel_ids (list): The channel identification numbers.
+            limit (int): The maximum number of messages per channel.
+
+        Returns:
+            (dict): channel_id -> (messages, has_more), see page.
+
+        '''
+        pages = {channel_id: ([], False) for channel_id in channel_ids}
+        if not pages:
+            return pages
+
+        firsts = db.union_all(*(db.select([cls.message_id]).where(
+            db.and_(cls.channel_id == channel_id,
+                    cls.is_hidden.is_(False))).order_by(
+                        cls.time_created, cls.message_id).limit(
+                            limit + 1).alias().select()
+                                for channel_id in channel_ids))
+
+        messages = cls.query.filter(cls.message_id.in_(firsts)).order_by(
+            cls.channel_id, cls.time_created, cls.message_id).all()
+
+        for message in messages:
+            page, _ = pages[message.channel_id]
+            if len(page) == limit:
+                pages[message.channel_id] = (page, True)
+            else:
+                page.append(message)
+
+        return pages
+
     def details(self, user):
         ''' Get a dictionary of the message's information.
 
@@ -44,14 +160,56 @@ class Message(db.Model):
             is_pinned (bool):  Whether the message has been pinned.
 
         '''
-        return {
-            'message_id': self.message_id,
-            'u_id': self.u_id,
-            'message': self.message,
-            'time_created': self.time_created,
-            'reacts': [react.details(user) for react in self.reacts],
-            'is_pinned': self.is_pinned
-        }
+        return Message.details_batch([self], user)[0]
+
+    @classmethod
+    def details_batch(cls, messages, user=None):
+        ''' Get the details of many messages, loading the reacts of all of
+        them together instead of once per message and once per react.
+
+        Parameters:
+            messages (list): Message objects.
+            user (obj): The user viewing the messages, or None when the
+                        details are not for a particular user.
+
+        Returns:
+            (list): The details of each message, in the same order as
+                    messages. See details.
+
+        '''
+        message_ids = [message.message_id for message in messages]
+        viewer = user.u_id if user is not None else None
+
+        # message_id -> react_id -> u_ids, in the order the reacts were made
+        reacts = {}
+        for i in range(0, len(message_ids), DETAILS_CHUNK_SIZE):
+            rows = db.session.query(
+                React.message_id, React.react_id,
+                user_react_identifier.c.u_id).outerjoin(
+                    user_react_identifier,
+                    user_react_identifier.c.id == React.id).filter(
+                        React.message_id.in_(
+                            message_ids[i:i + DETAILS_CHUNK_SIZE])).order_by(
+                                React.id)
+
+            for message_id, react_id, u_id in rows:
+                u_ids = reacts.setdefault(message_id,
+                                          {}).setdefault(react_id, [])
+                if u_id is not None:
+                    u_ids.append(u_id)
+
+        return [{
+            'message_id': message.message_id,
+            'u_id': message.u_id,
+            'message': message.message,
+            'time_created': message.time_created,
+            'reacts': [{
+                'react_id': react_id,
+                'u_ids': u_ids,
+                'is_this_user_reacted': viewer in u_ids
+            } for react_id, u_ids in reacts.get(message.message_id, {}).items()],
+            'is_pinned': message.is_pinned
+        } for message in messages]
 
     def get_react(self, react_id):
         ''' Return a react object attached to a message.
@@ -68,8 +226,30 @@ class Message(db.Model):
                 return react
         return None
 
-    def delete_all(self):
-        for react in self.reacts:
-            db.session.delete(react)
+    @classmethod
+    def bulk_delete(cls, *criterion):
+        ''' Delete the messages matching the criteria together with their
+        reacts and pending sends, using a fixed number of set-based
+        statements. The caller commits.
+
+        Parameters:
+            criterion: SQL expressions on the message table.
+
+        Returns:
+            (int): The number of messages deleted.
+
+        '''
+        message_ids = db.select([cls.message_id]).where(db.and_(*criterion))
+        react_ids = db.select([React.id]).where(
+            React.message_id.in_(message_ids))
+
+        db.session.execute(user_react_identifier.delete().where(
+            user_react_identifier.c.id.in_(react_ids)))
+        db.session.execute(message_react_identifier.delete().where(
+            message_react_identifier.c.message_id.in_(message_ids)))
+        db.session.execute(React.__table__.delete().where(
+            React.message_id.in_(message_ids)))
+        db.session.execute(ScheduledMessage.__table__.delete().where(
+            ScheduledMessage.message_id.in_(message_ids)))
 
-        db.session.commit()
\ No newline at end of file
+        return cls.query.filter(*criterion).delete(synchronize_session=False)
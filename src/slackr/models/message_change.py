@@ -0,0 +1,17 @@
+from slackr import db
+
+
+class MessageChange(db.Model):
+    __table_args__ = (db.Index('ix_message_change_channel_seq', 'channel_id',
+                               'seq'), )
+
+    message_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    channel_id = db.Column(db.Integer, nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    is_removed = db.Column(db.Boolean, nullable=False, default=False)
+
+    def __init__(self, message_id, channel_id, seq, is_removed=False):
+        self.message_id = message_id
+        self.channel_id = channel_id
+        self.seq = seq
+        self.is_removed = is_removed
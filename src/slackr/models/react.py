@@ -7,8 +7,10 @@ class React(db.Model):
     react_id = db.Column(db.Integer)
     users = db.relationship("User", secondary=user_react_identifier)
     message_id = db.Column(db.Integer,
-                           db.ForeignKey('message.message_id'),
-                           nullable=False)
+                           db.ForeignKey('message.message_id',
+                                         ondelete='CASCADE'),
+                           nullable=False,
+                           index=True)
 
     def __init__(self, react_id):
         self.react_id = react_id
@@ -29,10 +31,11 @@ class React(db.Model):
             is_this_user_reacted (bool): Whether the user has reacted or not.
 
         '''
+        u_ids = self.u_ids()
         return {
             'react_id': self.react_id,
-            'u_ids': [user.u_id for user in self.users],
-            'is_this_user_reacted': self in user.reacts
+            'u_ids': u_ids,
+            'is_this_user_reacted': user.u_id in u_ids
         }
 
     def u_ids(self):
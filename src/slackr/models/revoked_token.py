@@ -0,0 +1,12 @@
+from slackr import db, helpers
+
+
+class RevokedToken(db.Model):
+    token_id = db.Column(db.String(64), primary_key=True)
+    revoked_at = db.Column(db.Integer, nullable=False, index=True)
+    expires_at = db.Column(db.Integer, index=True)
+
+    def __init__(self, token_id, expires_at):
+        self.token_id = token_id
+        self.revoked_at = helpers.utc_now()
+        self.expires_at = expires_at
@@ -0,0 +1,15 @@
+from slackr import db
+
+
+class ScheduledMessage(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    message_id = db.Column(db.Integer,
+                           db.ForeignKey('message.message_id',
+                                         ondelete='CASCADE'),
+                           nullable=False,
+                           unique=True)
+    time_sent = db.Column(db.Integer, nullable=False, index=True)
+
+    def __init__(self, message_id, time_sent):
+        self.message_id = message_id
+        self.time_sent = time_sent
@@ -1,10 +1,21 @@
 from slackr import db
+from slackr.models.channel_state import ChannelState
+from slackr.models.standup_entry import StandupEntry
 
 
-class Standup(db.Model):
+class Standup(ChannelState, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     is_active = db.Column(db.Boolean, default=False)
-    starting_u_id = db.Column(db.Integer, db.ForeignKey('user.u_id'))
-    channel_id = db.Column(db.Integer, db.ForeignKey('channel.channel_id'))
+    starting_u_id = db.Column(db.Integer,
+                              db.ForeignKey('user.u_id', ondelete='SET NULL'))
+    channel_id = db.Column(db.Integer,
+                           db.ForeignKey('channel.channel_id',
+                                         ondelete='CASCADE'),
+                           index=True,
+                           unique=True)
     time_finish = db.Column(db.Integer)
-    message = db.Column(db.String(1000), default='')
+    entries = db.relationship('StandupEntry',
+                              backref='standup',
+                              lazy='dynamic',
+                              cascade='all, delete-orphan',
+                              order_by=StandupEntry.id)
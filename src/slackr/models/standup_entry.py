@@ -0,0 +1,22 @@
+from slackr import db, helpers
+
+
+class StandupEntry(db.Model):
+    __table_args__ = (db.Index('ix_standup_entry_standup', 'standup_id',
+                               'id'), )
+
+    id = db.Column(db.Integer, primary_key=True)
+    standup_id = db.Column(db.Integer,
+                           db.ForeignKey('standup.id', ondelete='CASCADE'),
+                           nullable=False)
+    u_id = db.Column(db.Integer,
+                     db.ForeignKey('user.u_id', ondelete='CASCADE'),
+                     nullable=False)
+    message = db.Column(db.String(1000), nullable=False)
+    time_created = db.Column(db.Integer, nullable=False)
+
+    def __init__(self, standup_id, u_id, message):
+        self.standup_id = standup_id
+        self.u_id = u_id
+        self.message = message
+        self.time_created = helpers.utc_now()
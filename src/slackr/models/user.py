@@ -1,6 +1,12 @@
 from slackr import db, helpers
 from slackr.utils.constants import PERMISSIONS
-from slackr.models import user_react_identifier
+from slackr.models import (message_react_identifier, owner_channel_identifier,
+                           user_channel_identifier, user_react_identifier)
+from slackr.models.message import Message
+from slackr.models.react import React
+from slackr.models.standup import Standup
+from slackr.models.standup_entry import StandupEntry
+from slackr.models.user_purge import UserPurge
 
 
 class User(db.Model):
@@ -9,12 +15,19 @@ class User(db.Model):
     password = db.Column(db.String(250))
     name_first = db.Column(db.String(50))
     name_last = db.Column(db.String(50))
-    handle_str = db.Column(db.String(20))
+    handle_str = db.Column(db.String(20), index=True)
     permission_id = db.Column(db.Integer)
-    messages = db.relationship('Message', backref='sender', lazy=True)
-    reacts = db.relationship("React", secondary=user_react_identifier)
+    messages = db.relationship('Message', backref='sender', lazy='dynamic')
+    reacts = db.relationship("React",
+                             secondary=user_react_identifier,
+                             lazy='dynamic')
     profile_img_url = db.Column(db.String(2000))
     standups = db.relationship('Standup', backref='starting_user')
+    # Bumped when the user joins or leaves a channel
+    channels_version = db.Column(db.Integer,
+                                 nullable=False,
+                                 default=0,
+                                 server_default='0')
 
     def __init__(self, email, password, name_first, name_last, handle):
         self.email = email
@@ -68,14 +81,72 @@ class User(db.Model):
             'profile_img_url': self.profile_img_url
         }
 
-    def delete_all(self):
-        for message in self.messages:
-            db.session.delete(message)
+    @classmethod
+    def active(cls):
+        ''' Query the users that have not been removed. Users that are queued
+        to be purged no longer exist as far as other users are concerned.
+
+        Returns (obj):
+            A query over the user table
+
+        '''
+        return cls.query.filter(
+            ~db.exists().where(UserPurge.u_id == cls.u_id))
+
+    @classmethod
+    def find(cls, u_id):
+        ''' Get a user that has not been removed by their ID
+
+        Parameters:
+            u_id (int): User ID
+
+        Returns:
+            (obj): The user, or None if there is no such user
+
+        '''
+        return cls.active().filter(cls.u_id == u_id).first()
 
-        for react in self.reacts:
-            db.session.delete(react)
+    def detach(self):
+        ''' Remove the user from every channel, react and standup, and free
+        their email and handle, so that only their messages are left to
+        delete. Reacts are kept while other users still have them. The caller
+        commits.
 
-        for standup in self.standups:
-            db.session.delete(standup)
+        '''
+        u_id = self.u_id
+        reactors = user_react_identifier.c
+
+        # Reacts the user made that nobody else has
+        lone = db.and_(
+            React.id.in_(
+                db.select([reactors.id]).where(reactors.u_id == u_id)),
+            ~db.exists().where(
+                db.and_(reactors.id == React.id, reactors.u_id != u_id)))
+        db.session.execute(message_react_identifier.delete().where(
+            message_react_identifier.c.id.in_(
+                db.select([React.id]).where(lone))))
+        db.session.execute(React.__table__.delete().where(lone))
+
+        for table in (user_react_identifier, user_channel_identifier,
+                      owner_channel_identifier):
+            db.session.execute(table.delete().where(table.c.u_id == u_id))
+
+        db.session.execute(StandupEntry.__table__.delete().where(
+            StandupEntry.u_id == u_id))
+        db.session.execute(Standup.__table__.update().where(
+            Standup.starting_u_id == u_id).values(starting_u_id=None))
+
+        self.email = None
+        self.handle_str = None
+
+    def delete_all(self):
+        ''' Delete the user and everything they made using a fixed number of
+        set-based statements. The caller commits.
+
+        '''
+        Message.bulk_delete(Message.u_id == self.u_id)
+        self.detach()
+        db.session.execute(
+            User.__table__.delete().where(User.u_id == self.u_id))
 
-        db.session.commit()
+        db.session.expunge(self)
@@ -0,0 +1,11 @@
+from slackr import db, helpers
+
+
+class UserPurge(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    u_id = db.Column(db.Integer, nullable=False, unique=True)
+    time_created = db.Column(db.Integer, nullable=False)
+
+    def __init__(self, u_id):
+        self.u_id = u_id
+        self.time_created = helpers.utc_now()
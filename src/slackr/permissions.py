@@ -0,0 +1,82 @@
+'''
+Resolves what a user is allowed to do in a channel with a single query over
+the membership and ownership tables, memoised for the rest of the request.
+'''
+
+from collections import namedtuple
+
+from flask import g, has_app_context
+
+from slackr import db
+from slackr.models import owner_channel_identifier, user_channel_identifier
+from slackr.models.channel import Channel
+from slackr.models.channel_purge import ChannelPurge
+from slackr.models.user import User
+from slackr.utils.constants import PERMISSIONS
+
+
+class Permissions(
+        namedtuple('Permissions', [
+            'exists', 'is_member', 'is_owner', 'is_global_owner', 'is_bot'
+        ])):
+    ''' A user's standing in a channel.
+
+    exists is whether the channel exists, is_owner is ownership of the
+    channel, and is_global_owner and is_bot come from the user's permission.
+    '''
+    @property
+    def is_admin(self):
+        ''' Whether the user owns the channel or owns Slackr '''
+        return self.is_owner or self.is_global_owner
+
+
+def resolve(u_id, channel_id):
+    ''' Resolve a user's permissions in a channel
+
+    Parameters:
+        u_id (int): ID of the user
+        channel_id (int): ID of the channel
+
+    Returns (Permissions):
+        exists (bool): Whether the channel exists
+        is_member (bool): Whether the user is a member of the channel
+        is_owner (bool): Whether the user is an owner of the channel
+        is_global_owner (bool): Whether the user is an owner of Slackr
+        is_bot (bool): Whether the user is a bot
+
+    '''
+    u_id, channel_id = int(u_id), int(channel_id)
+
+    memo = g.setdefault('permissions', {}) if has_app_context() else {}
+    key = (u_id, channel_id)
+
+    if key in memo:
+        return memo[key]
+
+    members = user_channel_identifier.c
+    owners = owner_channel_identifier.c
+
+    exists, is_member, is_owner, permission_id = db.session.query(
+        db.exists().where(
+            db.and_(
+                Channel.channel_id == channel_id,
+                ~db.exists().where(ChannelPurge.channel_id == channel_id))),
+        db.exists().where(
+            db.and_(members.u_id == u_id, members.channel_id == channel_id)),
+        db.exists().where(
+            db.and_(owners.u_id == u_id, owners.channel_id == channel_id)),
+        db.session.query(User.permission_id).filter(
+            User.u_id == u_id).as_scalar()).one()
+
+    permissions = Permissions(bool(exists), bool(is_member), bool(is_owner),
+                              permission_id == PERMISSIONS['owner'],
+                              permission_id == PERMISSIONS['bot'])
+    memo[key] = permissions
+    return permissions
+
+
+def forget():
+    ''' Drop the permissions memoised by the request, e.g. after a change to
+    membership, ownership or a user's permission '''
+    if has_app_context():
+        g.pop('permissions', None)
@@ -0,0 +1,155 @@
+'''
+Profile photos uploaded from a URL. The image is downloaded in one streamed
+request that stops at PHOTO_MAX_BYTES, and its size is checked from the
+header before any pixels are decoded. JPEGs are decoded in draft mode, at
+the smallest scale that still covers the largest rendered size, then
+cropped and rendered once at every size in PHOTO_SIZES:
+
+    {img_id}.jpg            The crop, at most PHOTO_SIZES[0] on a side
+    {img_id}_{size}.webp    The crop, at most `size` on a side
+
+The profile image at {img_id}.jpg is therefore scaled down to fit
+PHOTO_SIZES[0], rather than kept at the resolution of the crop.
+
+Decoding, rendering and writing the files run on eventlet's pool of native
+threads, so the hub keeps serving sockets meanwhile.
+'''
+
+import io
+import math
+import os
+
+import requests
+from eventlet import tpool
+from PIL import Image
+
+from slackr.error import InputError
+from slackr.utils.constants import (PHOTO_FETCH_TIMEOUT, PHOTO_MAX_BYTES,
+                                    PHOTO_MAX_PIXELS, PHOTO_SIZES,
+                                    PROFILE_IMAGE_DIR)
+
+CHUNK_SIZE = 64 * 1024
+
+
+def fetch(url):
+    ''' Download an image, refusing anything over PHOTO_MAX_BYTES
+
+    Parameters:
+        url (str): URL of the image
+
+    Returns:
+        (bytes): The body of the response
+
+    '''
+    try:
+        with requests.get(url, stream=True,
+                          timeout=PHOTO_FETCH_TIMEOUT) as response:
+            if response.status_code != 200:
+                raise InputError(description='Image does not exist')
+
+            # A missing or malformed length is left to the cap on the body
+            try:
+                length = int(response.headers.get('Content-Length'))
+            except (TypeError, ValueError):
+                length = None
+            if length is not None and length > PHOTO_MAX_BYTES:
+                raise InputError(description='Image is too large')
+
+            body = bytearray()
+            for chunk in response.iter_content(CHUNK_SIZE):
+                body += chunk
+                if len(body) > PHOTO_MAX_BYTES:
+                    raise InputError(description='Image is too large')
+    except requests.RequestException:
+        raise InputError(description='Image does not exist')
+
+    return bytes(body)
+
+
+def crop(data, area):
+    ''' Decode and crop a JPEG, reading no more pixels than the largest of
+    PHOTO_SIZES needs
+
+    Parameters:
+        data (bytes): The encoded image
+        area (tuple): x_start, y_start, x_end and y_end of the crop, in
+                      pixels of the full image
+
+    Returns:
+        (obj): The cropped image
+
+    '''
+    try:
+        img = Image.open(io.BytesIO(data))
+    except Image.DecompressionBombError:
+        raise InputError(description='Image is too large')
+    except OSError:
+        raise InputError(description='Image must be a .jpg file')
+
+    if img.format != 'JPEG':
+        raise InputError(description='Image must be a .jpg file')
+
+    width, height = img.size
+    if width * height > PHOTO_MAX_PIXELS:
+        raise InputError(description='Image is too large')
+
+    _check_area(area, width, height)
+
+    # The long side of the crop only has to reach the largest size
+    x_start, y_start, x_end, y_end = area
+    scale = min(1, PHOTO_SIZES[0] / max(x_end - x_start, y_end - y_start, 1))
+    img.draft('RGB', (math.ceil(width * scale), math.ceil(height * scale)))
+
+    scale_x, scale_y = img.size[0] / width, img.size[1] / height
+    return img.convert('RGB').crop(
+        (round(x_start * scale_x), round(y_start * scale_y),
+         round(x_end * scale_x), round(y_end * scale_y)))
+
+
+def render(data, area, img_id):
+    ''' Crop an image and write it at every size, see the module docstring.
+    Runs on a native thread.
+
+    Parameters:
+        data (bytes): The encoded image
+        area (tuple): The crop, see crop
+        img_id (int): Name of the rendered files
+
+    '''
+    tpool.execute(_render, data, area, img_id)
+
+
+def _render(data, area, img_id):
+    img = crop(data, area)
+
+    for size in PHOTO_SIZES:
+        # Each size is scaled down from the one before
+        img.thumbnail((size, size), Image.LANCZOS)
+        if size == PHOTO_SIZES[0]:
+            img.save(os.path.join(PROFILE_IMAGE_DIR, f'{img_id}.jpg'),
+                     quality=90)
+        img.save(os.path.join(PROFILE_IMAGE_DIR, f'{img_id}_{size}.webp'),
+                 quality=80)
+
+
+def _check_area(area, width, height):
+    if area[0] > width or area[2] > width:
+        raise InputError(
+            description='Crop constraints are outside of the image')
+
+    if area[1] > height or area[3] > height:
+        raise InputError(
+            description='Crop constraints are outside of the image')
+
+    if area[0] > area[2]:
+        raise InputError(description='x_end cannot be greater than x_start')
+
+    if area[1] > area[3]:
+        raise InputError(description='y_end cannot be greater than y_start')
+
+    if any(x < 0 for x in area):
+        raise InputError(
+            description='Cannot crop out of the bounds of the image')
+
+    if area[0] == area[2] or area[1] == area[3]:
+        raise InputError(description='Crop area cannot be empty')
@@ -0,0 +1,248 @@
+'''
+Name-ordered rosters of the members and owners of channels, so reading the
+details of a large channel skips loading and sorting every member. Each
+roster is tagged with the channel's details_version and the 'profiles'
+counter. Changes committed by this worker are applied to the cached rosters
+in place, and a roster whose versions were moved on by another worker is
+loaded again on its next read.
+'''
+
+import bisect
+import threading
+from collections import OrderedDict
+
+from slackr import db, versions
+from slackr.models import owner_channel_identifier, user_channel_identifier
+from slackr.models.user import User
+from slackr.utils.constants import ROSTER_CACHE_CHANNELS
+
+DETAILS_COLUMNS = (User.u_id, User.name_first, User.name_last,
+                   User.profile_img_url)
+
+
+def _sort_key(details):
+    return (details['name_first'] + details['name_last'], details['u_id'])
+
+
+def _discard(keys, key):
+    i = bisect.bisect_left(keys, key)
+    if i < len(keys) and keys[i] == key:
+        del keys[i]
+
+
+class _Roster:
+    def __init__(self, details_version, profiles_version, members,
+                 owner_ids):
+        self.details_version = details_version
+        self.profiles_version = profiles_version
+        self.members = {}
+        self.keys = []
+        self.owner_ids = set()
+        self.owner_keys = []
+        for details in members:
+            self.add(details)
+        for u_id in owner_ids:
+            self.add_owner(u_id)
+
+    def add(self, details):
+        if details['u_id'] not in self.members:
+            self.members[details['u_id']] = details
+            bisect.insort(self.keys, _sort_key(details))
+
+    def remove(self, u_id):
+        self.remove_owner(u_id)
+        details = self.members.pop(u_id, None)
+        if details is not None:
+            _discard(self.keys, _sort_key(details))
+
+    def add_owner(self, u_id):
+        # Owners are always members
+        if u_id in self.members and u_id not in self.owner_ids:
+            self.owner_ids.add(u_id)
+            bisect.insort(self.owner_keys, _sort_key(self.members[u_id]))
+
+    def remove_owner(self, u_id):
+        if u_id in self.owner_ids:
+            self.owner_ids.remove(u_id)
+            _discard(self.owner_keys, _sort_key(self.members[u_id]))
+
+    def update(self, details):
+        if details['u_id'] in self.members:
+            is_owner = details['u_id'] in self.owner_ids
+            self.remove(details['u_id'])
+            self.add(details)
+            if is_owner:
+                self.add_owner(details['u_id'])
+
+    def details(self, keys):
+        return [self.members[u_id] for _, u_id in keys]
+
+
+class RosterCache:
+    ''' Bounded LRU cache of the rosters of at most `channels` channels.
+    Members and owners are ordered by name_first + name_last, then u_id.
+    '''
+    def __init__(self, channels):
+        self.channels = channels
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._rosters = OrderedDict()
+
+    def roster(self, channel, start=0, limit=None):
+        ''' Get the owners and a page of the members of a channel
+
+        Parameters:
+            channel (obj): The channel
+            start (int): Number of members to skip
+            limit (int): Maximum number of members, None for all of them
+
+        Returns (dict):
+            owner_members (list): Details of every owner
+            all_members (list): Details of the members in the page
+            owner_count (int): Number of owners
+            member_count (int): Number of members
+
+        '''
+        roster = self._roster(channel)
+        with self._lock:
+            end = None if limit is None else start + limit
+            return {
+                'owner_members': roster.details(roster.owner_keys),
+                'all_members': roster.details(roster.keys[start:end]),
+                'owner_count': len(roster.owner_keys),
+                'member_count': len(roster.keys)
+            }
+
+    def member_added(self, channel_id, version, user):
+        ''' Add a member to a channel's roster once the session commits
+
+        Parameters:
+            channel_id (int): ID of the channel
+            version (int): details_version after the change
+            user (obj): The new member
+
+        '''
+        _record(('add', channel_id, version, user.details))
+
+    def member_removed(self, channel_id, version, user):
+        ''' Remove a member from a channel's roster once the session commits,
+        see member_added '''
+        _record(('remove', channel_id, version, user.u_id))
+
+    def owner_added(self, channel_id, version, user):
+        ''' Make a member an owner in a channel's roster once the session
+        commits, see member_added '''
+        _record(('add_owner', channel_id, version, user.u_id))
+
+    def owner_removed(self, channel_id, version, user):
+        ''' Make an owner a plain member in a channel's roster once the
+        session commits, see member_added '''
+        _record(('remove_owner', channel_id, version, user.u_id))
+
+    def profile_changed(self, version, user):
+        ''' Update a user in every roster once the session commits
+
+        Parameters:
+            version (int): 'profiles' counter after the change
+            user (obj): The changed user
+
+        '''
+        _record(('update', None, version, user.details))
+
+    def user_removed(self, version, user):
+        ''' Remove a user from every roster once the session commits, see
+        profile_changed '''
+        _record(('remove', None, version, user.u_id))
+
+    def clear(self):
+        ''' Drop every roster '''
+        with self._lock:
+            self._rosters.clear()
+
+    def apply(self, changes):
+        ''' Apply committed changes to the cached rosters. A roster that did
+        not have the version just before a change misses a change made by
+        another worker, and is dropped.
+
+        Parameters:
+            changes (list): Changes recorded by the session
+
+        '''
+        with self._lock:
+            for method, channel_id, version, argument in changes:
+                if channel_id is None:
+                    self._apply_profiles(method, version, argument)
+                    continue
+
+                roster = self._rosters.get(channel_id)
+                if roster is None:
+                    continue
+                if roster.details_version != version - 1:
+                    del self._rosters[channel_id]
+                    continue
+                getattr(roster, method)(argument)
+                roster.details_version = version
+
+    def _apply_profiles(self, method, version, argument):
+        for channel_id, roster in list(self._rosters.items()):
+            if roster.profiles_version != version - 1:
+                del self._rosters[channel_id]
+                continue
+            getattr(roster, method)(argument)
+            roster.profiles_version = version
+
+    def _roster(self, channel):
+        # The versions are read first, so a change committed during the load
+        # only costs another load
+        profiles_version = versions.counter('profiles')
+        with self._lock:
+            roster = self._rosters.get(channel.channel_id)
+            if roster is not None and (
+                    roster.details_version, roster.profiles_version) == (
+                        channel.details_version, profiles_version):
+                self.hits += 1
+                self._rosters.move_to_end(channel.channel_id)
+                return roster
+            self.misses += 1
+
+        members = user_channel_identifier.c
+        owners = owner_channel_identifier.c
+        roster = _Roster(channel.details_version, profiles_version, [
+            dict(zip((column.key for column in DETAILS_COLUMNS), row))
+            for row in db.session.query(*DETAILS_COLUMNS).join(
+                user_channel_identifier, members.u_id == User.u_id).filter(
+                    members.channel_id == channel.channel_id)
+        ], [
+            u_id for u_id, in db.session.query(owners.u_id).filter(
+                owners.channel_id == channel.channel_id)
+        ])
+
+        if self.channels > 0:
+            with self._lock:
+                self._rosters[channel.channel_id] = roster
+                while len(self._rosters) > self.channels:
+                    self._rosters.popitem(last=False)
+
+        return roster
+
+
+ROSTER_CACHE = RosterCache(ROSTER_CACHE_CHANNELS)
+
+
+def _record(change):
+    db.session.info.setdefault('roster_cache', []).append(change)
+
+
+def _apply_pending(session):
+    changes = session.info.pop('roster_cache', None)
+    if changes:
+        ROSTER_CACHE.apply(changes)
+
+
+def _discard_pending(session, previous_transaction):
+    session.info.pop('roster_cache', None)
+
+
+db.event.listen(db.session, 'after_commit', _apply_pending)
+db.event.listen(db.session, 'after_soft_rollback', _discard_pending)
@@ -0,0 +1,27 @@
+from itertools import chain
+from json import dumps
+
+from flask import Blueprint, Response, request, stream_with_context
+
+from slackr.controllers import bootstrap
+from slackr.middleware import auth_middleware
+
+BOOTSTRAP_ROUTE = Blueprint('bootstrap', __name__)
+
+
+@BOOTSTRAP_ROUTE.route("/bootstrap", methods=['GET'])
+@auth_middleware
+def route_bootstrap():
+    '''Flask route for /bootstrap, streamed as one JSON section per line
+    when stream is true'''
+    token = request.values.get('token')
+
+    if request.values.get('stream') != 'true':
+        return dumps(bootstrap.bootstrap(token))
+
+    sections = bootstrap.bootstrap_sections(token)
+    # Errors in the first section are raised before the response starts
+    first = next(sections)
+    return Response(stream_with_context(
+        f'{dumps(section)}\n' for section in chain([first], sections)),
+                    mimetype='application/x-ndjson')
@@ -2,8 +2,9 @@ from json import dumps
 
 from flask import Blueprint, request
 
+from slackr import versions
 from slackr.controllers import channel
-from slackr.middleware import auth_middleware
+from slackr.middleware import auth_middleware, conditional
 
 CHANNEL_ROUTE = Blueprint('channel', __name__)
 
@@ -25,7 +26,11 @@ def route_channel_details():
     '''Flask route for /channel/details'''
     token = request.values.get('token')
     channel_id = request.values.get('channel_id')
-    return dumps(channel.channel_details(token, channel_id))
+    start = request.values.get('start')
+    limit = request.values.get('limit')
+    return conditional(
+        versions.channel_details_tag(token, channel_id, start, limit),
+        lambda: channel.channel_details(token, channel_id, start, limit))
 
 
 @CHANNEL_ROUTE.route("/channel/messages", methods=['GET'])
@@ -35,7 +40,32 @@ def route_channel_messages():
     token = request.values.get('token')
     channel_id = request.values.get('channel_id')
     start = request.values.get('start')
-    return dumps(channel.channel_messages(token, channel_id, start))
+    return conditional(
+        versions.channel_messages_tag(token, channel_id),
+        lambda: channel.channel_messages(token, channel_id, start))
+
+
+@CHANNEL_ROUTE.route("/channel/history", methods=['GET'])
+@auth_middleware
+def route_channel_history():
+    '''Flask route for /channel/history'''
+    token = request.values.get('token')
+    channel_id = request.values.get('channel_id')
+    before = request.values.get('before')
+    after = request.values.get('after')
+    limit = request.values.get('limit')
+    return dumps(
+        channel.channel_history(token, channel_id, before, after, limit))
+
+
+@CHANNEL_ROUTE.route("/channel/changes", methods=['GET'])
+@auth_middleware
+def route_channel_changes():
+    '''Flask route for /channel/changes'''
+    token = request.values.get('token')
+    channel_id = request.values.get('channel_id')
+    since = request.values.get('since')
+    return dumps(channel.channel_changes(token, channel_id, since))
 
 
 @CHANNEL_ROUTE.route("/channel/leave", methods=['POST'])
@@ -2,8 +2,9 @@ from json import dumps
 
 from flask import Blueprint, request
 
+from slackr import versions
 from slackr.controllers import channels
-from slackr.middleware import auth_middleware
+from slackr.middleware import auth_middleware, conditional
 
 CHANNELS_ROUTE = Blueprint('channels', __name__)
 
@@ -13,7 +14,8 @@ CHANNELS_ROUTE = Blueprint('channels', __name__)
 def route_channels_list():
     '''Flask route for /channels/list'''
     token = request.values.get('token')
-    return dumps(channels.channels_list(token))
+    return conditional(versions.channels_list_tag(token),
+                       lambda: channels.channels_list(token))
 
 
 @CHANNELS_ROUTE.route("/channels/listall", methods=['GET'])
@@ -21,7 +23,8 @@ def route_channels_list():
 def route_channels_listall():
     '''Flask route for /channels/listall'''
     token = request.values.get('token')
-    return dumps(channels.channels_listall(token))
+    return conditional(versions.channels_listall_tag(token),
+                       lambda: channels.channels_listall(token))
 
 
 @CHANNELS_ROUTE.route("/channels/create", methods=['POST'])
@@ -1,4 +1,8 @@
-from flask import Blueprint, send_file, request
+import os
+
+from flask import Blueprint, send_from_directory
+
+from slackr.utils.constants import PROFILE_IMAGE_DIR
 
 IMG_URL_ROUTE = Blueprint('img_url', __name__)
 
@@ -6,10 +10,11 @@ IMG_URL_ROUTE = Blueprint('img_url', __name__)
 @IMG_URL_ROUTE.route('/imgurl/<imgsrc>', methods=['GET'])
 def route_img_display(imgsrc):
     '''Flask route for /imgurl'''
-    return send_file(f'../profile_images/{imgsrc}')
+    return send_from_directory(PROFILE_IMAGE_DIR, imgsrc)
 
 
 @IMG_URL_ROUTE.route('/imgurl/defaults/<imgsrc>', methods=['GET'])
 def route_defaults_img_display(imgsrc):
     '''Flask route for /imgurl'''
-    return send_file(f'../profile_images/defaults/{imgsrc}')
+    return send_from_directory(os.path.join(PROFILE_IMAGE_DIR, 'defaults'),
+                               imgsrc)
@@ -4,6 +4,7 @@ from flask import Blueprint, request
 
 from slackr import socketio
 from slackr.controllers import message as msg
+from slackr.message_scheduler import SCHEDULER
 from slackr.middleware import auth_middleware
 
 MESSAGE_ROUTE = Blueprint('message', __name__)
@@ -50,9 +51,7 @@ def route_message_sendlater():
     channel_id = payload.get('channel_id')
     message = payload.get('message')
     time_sent = payload.get('time_sent')
-    return dumps(
-        msg.message_sendlater(token, channel_id, message, time_sent,
-                              send_later_callback))
+    return dumps(msg.message_sendlater(token, channel_id, message, time_sent))
 
 
 @MESSAGE_ROUTE.route("/message/react", methods=['POST'])
@@ -99,3 +98,6 @@ def route_message_unpin():
 
 def send_later_callback(message_details, channel_id):
     socketio.emit('message_received', message_details, room=str(channel_id))
+
+
+SCHEDULER.add_listener(send_later_callback)
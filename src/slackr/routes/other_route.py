@@ -2,8 +2,9 @@ from json import dumps
 
 from flask import Blueprint, request
 
+from slackr import versions
 from slackr.controllers import other
-from slackr.middleware import auth_middleware
+from slackr.middleware import auth_middleware, conditional
 
 OTHER_ROUTE = Blueprint('other', __name__)
 
@@ -13,7 +14,14 @@ OTHER_ROUTE = Blueprint('other', __name__)
 def route_users_all():
     '''Flask route for /users/all'''
     token = request.values.get('token')
-    return dumps(other.users_all(token))
+    cursor = request.values.get('cursor')
+    limit = request.values.get('limit')
+    if cursor is None and limit is None:
+        return conditional(versions.users_all_tag(token),
+                           lambda: other.users_all_serialized(token))
+
+    return conditional(versions.users_all_tag(token, cursor, limit),
+                       lambda: other.users_all(token, cursor, limit))
 
 
 @OTHER_ROUTE.route("/search", methods=['GET'])
@@ -23,3 +31,14 @@ def route_search():
     token = request.values.get('token')
     query_str = request.values.get('query_str')
     return dumps(other.search(token, query_str))
+
+
+@OTHER_ROUTE.route("/search/messages", methods=['GET'])
+@auth_middleware
+def route_search_messages():
+    '''Flask route for /search/messages'''
+    token = request.values.get('token')
+    query_str = request.values.get('query_str')
+    start = request.values.get('start', 0)
+    limit = request.values.get('limit')
+    return dumps(other.search_messages(token, query_str, start, limit))
@@ -1,10 +1,12 @@
 from flask_socketio import emit
 from slackr import socketio
+from slackr.middleware import socket_auth_middleware
 
 from slackr.controllers import admin
 
 
 @socketio.on('admin_userpermission_change')
+@socket_auth_middleware
 def socket_admin_userpermission_change(payload):
     '''Flask route for /admin/userpermission/change'''
     token = payload.get('token')
@@ -15,6 +17,7 @@ def socket_admin_userpermission_change(payload):
 
 
 @socketio.on('admin_user_remove')
+@socket_auth_middleware
 def socket_admin_user_remove(payload):
     '''Flask route for /admin/userpermission/change'''
     token = payload.get('token')
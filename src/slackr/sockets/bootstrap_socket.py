@@ -0,0 +1,14 @@
+from flask_socketio import emit
+from slackr import socketio
+from slackr.middleware import socket_auth_middleware
+
+from slackr.controllers import bootstrap
+
+
+@socketio.on('bootstrap')
+@socket_auth_middleware
+def socket_bootstrap(payload):
+    token = payload.get('token')
+    for section in bootstrap.bootstrap_sections(token):
+        emit('bootstrap_section', section)
+    emit('bootstrap_done', {})
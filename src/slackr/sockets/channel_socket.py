@@ -1,10 +1,12 @@
 from flask_socketio import emit
 from slackr import socketio
+from slackr.middleware import socket_auth_middleware
 
 from slackr.controllers import channels, channel
 
 
 @socketio.on('channel_create')
+@socket_auth_middleware
 def socket_channels_create(payload):
     token = payload.get('token')
     name = payload.get('name')
@@ -15,6 +17,7 @@ def socket_channels_create(payload):
 
 
 @socketio.on('channel_join')
+@socket_auth_middleware
 def socket_channel_join(payload):
     token = payload.get('token')
     channel_id = payload.get('channel_id')
@@ -23,7 +26,18 @@ def socket_channel_join(payload):
     emit('channel_new_member', response['user'], room=str(channel_id))
 
 
+@socketio.on('channel_changes')
+@socket_auth_middleware
+def socket_channel_changes(payload):
+    token = payload.get('token')
+    channel_id = payload.get('channel_id')
+    since = payload.get('since')
+    response = channel.channel_changes(token, channel_id, since)
+    emit('channel_changes', {'channel_id': int(channel_id), **response})
+
+
 @socketio.on('channel_leave')
+@socket_auth_middleware
 def socket_channel_leave(payload):
     token = payload.get('token')
     channel_id = payload.get('channel_id')
@@ -33,6 +47,7 @@ def socket_channel_leave(payload):
 
 
 @socketio.on('channel_invite')
+@socket_auth_middleware
 def socket_channel_invite(payload):
     token = payload.get('token')
     channel_id = payload.get('channel_id')
@@ -43,6 +58,7 @@ def socket_channel_invite(payload):
 
 
 @socketio.on('channel_addowner')
+@socket_auth_middleware
 def socket_channel_addowner(payload):
     token = payload.get('token')
     channel_id = payload.get('channel_id')
@@ -55,6 +71,7 @@ def socket_channel_addowner(payload):
 
 
 @socketio.on('channel_removeowner')
+@socket_auth_middleware
 def socket_channel_removeowner(payload):
     token = payload.get('token')
     channel_id = payload.get('channel_id')
@@ -67,6 +84,7 @@ def socket_channel_removeowner(payload):
 
 
 @socketio.on('channel_delete')
+@socket_auth_middleware
 def socket_channels_remove(payload):
     token = payload.get('token')
     channel_id = payload.get('channel_id')
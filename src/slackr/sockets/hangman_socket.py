@@ -1,21 +1,25 @@
-from flask_socketio import emit
 from slackr import socketio
+from slackr.middleware import socket_auth_middleware
 
 from slackr.controllers import hangman
 
 
+def bot_reply_callback(channel_id, message_details):
+    socketio.emit('message_received', message_details, room=str(channel_id))
+
+
 @socketio.on('hangman_start')
+@socket_auth_middleware
 def socket_hangman_start(payload):
     token = payload.get('token')
     channel_id = payload.get('channel_id')
-    response = hangman.start_hangman(token, channel_id)
-    emit('message_received', response, room=str(channel_id))
+    hangman.start_hangman(token, channel_id, bot_reply_callback)
 
 
 @socketio.on('hangman_guess')
+@socket_auth_middleware
 def socket_hangman_guess(payload):
     token = payload.get('token')
     channel_id = payload.get('channel_id')
     guess = payload.get('guess')
-    response = hangman.guess_hangman(token, channel_id, guess)
-    emit('message_received', response, room=str(channel_id))
+    hangman.guess_hangman(token, channel_id, guess, bot_reply_callback)
@@ -1,9 +1,11 @@
 from flask_socketio import emit
 from slackr import socketio
+from slackr.middleware import socket_auth_middleware
 from slackr.controllers import message as msg
 
 
 @socketio.on('message_send')
+@socket_auth_middleware
 def handle_message_send(payload):
     token = payload.get('token')
     channel_id = payload.get('channel_id')
@@ -14,6 +16,7 @@ def handle_message_send(payload):
 
 
 @socketio.on('message_remove')
+@socket_auth_middleware
 def handle_message_remove(payload):
     '''Flask route for /message/remove'''
     token = payload.get('token')
@@ -25,6 +28,7 @@ def handle_message_remove(payload):
 
 
 @socketio.on('message_edit')
+@socket_auth_middleware
 def handle_message_edit(payload):
     token = payload.get('token')
     message_id = payload.get('message_id')
@@ -61,6 +65,7 @@ def handle_message_edit(payload):
 # @MESSAGE_ROUTE.route("/message/pin", methods=['POST'])
 # @auth_middleware
 @socketio.on('message_pin')
+@socket_auth_middleware
 def socket_message_pin(payload):
     token = payload.get('token')
     message_id = payload.get('message_id')
@@ -72,6 +77,7 @@ def socket_message_pin(payload):
 # @MESSAGE_ROUTE.route("/message/unpin", methods=['POST'])
 # @auth_middleware
 @socketio.on('message_unpin')
+@socket_auth_middleware
 def socket_message_unpin(payload):
     token = payload.get('token')
     message_id = payload.get('message_id')
@@ -1,5 +1,6 @@
 from flask_socketio import emit
 from slackr import socketio
+from slackr.middleware import socket_auth_middleware
 
 from slackr.controllers import standup
 
@@ -9,6 +10,7 @@ def standup_end_callback(channel_id, message_details):
 
 
 @socketio.on('standup_start')
+@socket_auth_middleware
 def socket_standup_start(payload):
     token = payload.get('token')
     channel_id = payload.get('channel_id')
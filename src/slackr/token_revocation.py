@@ -0,0 +1,125 @@
+'''
+Store of revoked (logged out) tokens. Revocations are persisted in the
+revoked_token table and mirrored in an in-process set, so checking a token
+that has not been revoked never touches the database.
+'''
+
+import threading
+import time
+
+from slackr import db, helpers
+from slackr.models.revoked_token import RevokedToken
+from slackr.utils.constants import (REVOCATION_PURGE_INTERVAL,
+                                    REVOCATION_SYNC_INTERVAL)
+
+
+class RevocationStore:
+    ''' Revoked token ids, keyed on the jti claim of a token.
+
+    Other workers learn about new revocations by polling the revoked_token
+    table at most once every REVOCATION_SYNC_INTERVAL seconds, and
+    revocations are purged once the token they refer to has expired.
+    '''
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revoked = {}
+        self._synced_at = None
+        self._purger = None
+
+    def is_revoked(self, token_id):
+        ''' Whether a token id has been revoked
+
+        Parameters:
+            token_id (str): ID of the token
+
+        Returns:
+            (bool): Whether the token has been revoked
+
+        '''
+        self._sync()
+        return token_id in self._revoked
+
+    def revoke(self, token_id, expires_at):
+        ''' Revoke a token until it expires
+
+        Parameters:
+            token_id (str): ID of the token
+            expires_at (int): Unix timestamp of when the token expires, None
+                              if it never expires
+
+        '''
+        db.session.merge(RevokedToken(token_id, expires_at))
+        db.session.commit()
+
+        with self._lock:
+            self._revoked[token_id] = expires_at
+
+    def purge(self):
+        ''' Delete revocations of tokens that have since expired '''
+        now = helpers.utc_now()
+
+        RevokedToken.query.filter(RevokedToken.expires_at < now).delete(
+            synchronize_session=False)
+        db.session.commit()
+
+        with self._lock:
+            self._revoked = {
+                token_id: expires_at
+                for token_id, expires_at in self._revoked.items()
+                if expires_at is None or expires_at >= now
+            }
+
+    def reset(self):
+        ''' Forget all revocations, e.g. after the workspace is reset '''
+        with self._lock:
+            self._revoked = {}
+            self._synced_at = None
+
+    def _sync(self):
+        now = helpers.utc_now()
+
+        with self._lock:
+            synced_at = self._synced_at
+            if synced_at is not None and \
+                now - synced_at < REVOCATION_SYNC_INTERVAL:
+                return
+            self._synced_at = now
+
+        query = RevokedToken.query.with_entities(RevokedToken.token_id,
+                                                 RevokedToken.expires_at)
+        if synced_at is not None:
+            # Overlap the previous sync to allow for clock skew between workers
+            query = query.filter(RevokedToken.revoked_at >= synced_at -
+                                 REVOCATION_SYNC_INTERVAL)
+
+        try:
+            rows = query.all()
+        except Exception:
+            with self._lock:
+                self._synced_at = synced_at
+            raise
+
+        with self._lock:
+            self._revoked.update(rows)
+
+    def start(self):
+        ''' Start the thread that purges expired revocations '''
+        with self._lock:
+            if self._purger is not None:
+                return
+            self._purger = threading.Thread(target=self._purge_forever,
+                                            daemon=True)
+        self._purger.start()
+
+    def _purge_forever(self):
+        while True:
+            time.sleep(REVOCATION_PURGE_INTERVAL)
+            try:
+                self.purge()
+            except Exception:  # pylint: disable=broad-except
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+
+REVOCATIONS = RevocationStore()
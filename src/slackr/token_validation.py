@@ -2,14 +2,21 @@
 Functions to encode, decode, and validate JWT tokens.
 '''
 
-from datetime import datetime
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
 
 import jwt
+from flask import g, has_app_context
 
+from slackr import helpers
 from slackr.error import AccessError
-from slackr.models.expired_token import ExpiredToken
 from slackr.models.user import User
-from slackr.utils.constants import SECRET
+from slackr.token_revocation import REVOCATIONS
+from slackr.utils.constants import (SECRET, TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL,
+                                    TOKEN_LIFETIME)
 
 
 def encode_token(u_id):
@@ -22,41 +29,222 @@ def encode_token(u_id):
 		token (str): JWT
 
 	'''
+    now = datetime.utcnow()
     payload = {
         'u_id': u_id,
-        'iat': datetime.utcnow(),
+        'iat': now,
+        'exp': now + timedelta(seconds=TOKEN_LIFETIME),
+        'jti': uuid.uuid4().hex,
     }
     token = jwt.encode(payload, SECRET, algorithm='HS256').decode('utf-8')
     return token
 
 
-def decode_token(token):
-    ''' Decode a given jwt token
+# The verified state of a token for the lifetime of a request
+AuthContext = namedtuple('AuthContext', ['token', 'payload', 'user'])
+
+
+class TokenCache:
+    ''' Bounded LRU cache of verified token payloads.
+
+    Entries live for at most TOKEN_CACHE_TTL seconds and never outlive the
+    token's own expiry. Revocation is still checked on every hit.
+    '''
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._tokens_by_user = {}
+
+    def get(self, token):
+        ''' Get the verified payload of a token, None if not cached '''
+        now = helpers.utc_now()
+
+        with self._lock:
+            entry = self._entries.get(token)
+
+            if entry is not None:
+                payload, cached_at = entry
+                if now - cached_at < self.ttl and \
+                    payload.get('exp', now + 1) > now:
+                    self._entries.move_to_end(token)
+                    self.hits += 1
+                    return payload
+                self._discard(token)
+
+            self.misses += 1
+            return None
+
+    def put(self, token, payload):
+        ''' Cache the verified payload of a token '''
+        with self._lock:
+            self._entries[token] = (payload, helpers.utc_now())
+            self._entries.move_to_end(token)
+            self._tokens_by_user.setdefault(payload['u_id'], set()).add(token)
+
+            while len(self._entries) > self.maxsize:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, token):
+        ''' Drop a single token from the cache '''
+        with self._lock:
+            self._discard(token)
+
+    def invalidate_user(self, u_id):
+        ''' Drop every cached token belonging to a user '''
+        with self._lock:
+            for token in self._tokens_by_user.pop(u_id, set()):
+                self._entries.pop(token, None)
+
+    def clear(self):
+        ''' Drop every cached token '''
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self):
+        ''' Get the cache's counters
+
+        Returns (dict):
+            hits (int): Lookups answered from the cache
+            misses (int): Lookups that required verifying the token
+            evictions (int): Entries dropped to stay within maxsize
+            size (int): Number of cached tokens
+            maxsize (int): Maximum number of cached tokens
+
+        '''
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'maxsize': self.maxsize
+            }
+
+    def _discard(self, token):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+
+        u_id = entry[0]['u_id']
+        tokens = self._tokens_by_user.get(u_id, set())
+        tokens.discard(token)
+        if not tokens:
+            self._tokens_by_user.pop(u_id, None)
+
+
+TOKEN_CACHE = TokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+
+
+def authenticate(token):
+    ''' Verify a token and load its user, at most once per request
 
 	Parameters:
-		u_id (int): ID of user
+		token (str): JWT
 
-	Returns (dict):
-		payload (dict): JWT
+	Returns (AuthContext):
+		token (str): JWT
+		payload (dict): Decoded JWT payload
+		user (obj): The user the token belongs to
 
 	'''
 
-    if ExpiredToken.query.filter_by(token=token).first() is not None:
-        raise AccessError(description='Token is invalid')
+    contexts = g.setdefault('auth', {}) if has_app_context() else {}
+
+    if token in contexts:
+        return contexts[token]
 
-    try:
-        payload = jwt.decode(token.encode('utf-8'), SECRET, algorithms='HS256')
-    except:
+    payload = TOKEN_CACHE.get(token)
+    is_cached = payload is not None
+
+    if not is_cached:
+        try:
+            payload = jwt.decode(token.encode('utf-8'),
+                                 SECRET,
+                                 algorithms='HS256')
+        except:
+            raise AccessError(description='Token is invalid')
+
+    if REVOCATIONS.is_revoked(token_id(token, payload)):
+        TOKEN_CACHE.invalidate(token)
         raise AccessError(description='Token is invalid')
 
     # if payload['iat'] < DATA_STORE.time_created:
     #     raise AccessError(description='Session has expired')
 
-    u_id = payload['u_id']
-    # hangman_bot_u_id = DATA_STORE.preset_profiles['hangman_bot'].u_id
+    user = User.find(payload['u_id'])
 
-    if User.query.filter_by(u_id=u_id).first() is None:
-        # if u_id not in DATA_STORE.u_ids and u_id != hangman_bot_u_id:
+    if user is None:
+        TOKEN_CACHE.invalidate_user(payload['u_id'])
         raise AccessError(description='u_id does not belong to a user')
 
-    return payload
+    if not is_cached:
+        TOKEN_CACHE.put(token, payload)
+
+    context = AuthContext(token, payload, user)
+    contexts[token] = context
+    return context
+
+
+def token_id(token, payload):
+    ''' Get the short ID a token is revoked under
+
+	Parameters:
+		token (str): JWT
+		payload (dict): Decoded JWT payload
+
+	Returns:
+		token_id (str): The jti claim, or a hash of tokens issued without one
+
+	'''
+    return payload.get('jti') or hashlib.sha256(token.encode()).hexdigest()
+
+
+def forget_token(token):
+    ''' Drop a token from the request's auth context and the token cache,
+        e.g. after logout
+
+	Parameters:
+		token (str): JWT
+
+	'''
+    TOKEN_CACHE.invalidate(token)
+    if has_app_context():
+        g.get('auth', {}).pop(token, None)
+
+
+def forget_user(u_id):
+    ''' Drop every token of a user from the request's auth context and the
+        token cache, e.g. after their removal or a permission change
+
+	Parameters:
+		u_id (int): ID of user
+
+	'''
+    TOKEN_CACHE.invalidate_user(u_id)
+    if has_app_context():
+        contexts = g.get('auth', {})
+        for token in [
+                token for token, context in contexts.items()
+                if context.payload['u_id'] == u_id
+        ]:
+            contexts.pop(token)
+
+
+def decode_token(token):
+    ''' Decode a given jwt token
+
+	Parameters:
+		token (str): JWT
+
+	Returns (dict):
+		payload (dict): JWT
+
+	'''
+    return authenticate(token).payload
@@ -0,0 +1,204 @@
+'''
+In-process trigram index over message text, used to narrow substring
+searches on databases without pg_trgm. Each trigram of a lowercased message
+maps to the set of message ids containing it, so the candidates for a query
+are the intersection of the sets for the query's trigrams.
+'''
+
+import threading
+
+from sqlalchemy.orm import Query
+
+from slackr import db
+from slackr.models.message import Message
+
+
+def trigrams(text):
+    ''' The set of three character substrings of a string
+
+    Parameters:
+        text (str): A lowercase string
+
+    Returns:
+        (set): Trigrams of the string
+
+    '''
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    ''' Posting lists of message ids keyed on trigram.
+
+    The index is loaded from the message table on first use. After that,
+    messages sent, edited and removed through the session are applied when
+    their session commits, including bulk deletes through Query.delete.
+    Writes made by other processes are not seen, so deployments with more
+    than one worker should use PostgreSQL with pg_trgm instead.
+    '''
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._postings = {}
+        self._texts = {}
+        self._loaded = False
+        self._loading = None
+
+    def candidates(self, needle):
+        ''' IDs of the messages that could contain a substring
+
+        Parameters:
+            needle (str): A lowercase substring
+
+        Returns:
+            (set): Message IDs, None if the substring is too short to narrow
+                   the search
+
+        '''
+        needle_trigrams = trigrams(needle)
+        if not needle_trigrams:
+            return None
+
+        self._load()
+
+        with self._lock:
+            postings = sorted(
+                (self._postings.get(trigram, set())
+                 for trigram in needle_trigrams),
+                key=len)
+
+            # Intersect the shortest posting lists first
+            ids = set(postings[0])
+            for posting in postings[1:]:
+                if not ids:
+                    break
+                ids &= posting
+
+        return ids
+
+    def add(self, message_id, text):
+        ''' Index or re-index a message
+
+        Parameters:
+            message_id (int): ID of the message
+            text (str): Text of the message
+
+        '''
+        with self._lock:
+            self._add(message_id, text)
+            if self._loading is not None:
+                self._loading.add(message_id)
+
+    def remove(self, message_id):
+        ''' Remove a message from the index
+
+        Parameters:
+            message_id (int): ID of the message
+
+        '''
+        with self._lock:
+            self._remove(message_id)
+            if self._loading is not None:
+                self._loading.add(message_id)
+
+    def clear(self):
+        ''' Forget every message, e.g. after the workspace is reset '''
+        with self._lock:
+            self._postings = {}
+            self._texts = {}
+            self._loaded = False
+            if self._loading is not None:
+                self._loading.add(None)
+
+    def _add(self, message_id, text):
+        self._remove(message_id)
+
+        text = text.lower()
+        self._texts[message_id] = text
+        for trigram in trigrams(text):
+            self._postings.setdefault(trigram, set()).add(message_id)
+
+    def _remove(self, message_id):
+        text = self._texts.pop(message_id, None)
+        if text is None:
+            return
+
+        for trigram in trigrams(text):
+            posting = self._postings.get(trigram)
+            if posting is not None:
+                posting.discard(message_id)
+                if not posting:
+                    del self._postings[trigram]
+
+    def _load(self):
+        with self._load_lock:
+            with self._lock:
+                if self._loaded:
+                    return
+                # Messages changed while the table is read are already up to
+                # date in the index, and None marks a clear
+                self._loading = changed = set()
+
+            try:
+                rows = db.session.query(Message.message_id,
+                                        Message.message).all()
+            finally:
+                with self._lock:
+                    self._loading = None
+
+            with self._lock:
+                if None in changed:
+                    return
+                for message_id, text in rows:
+                    if message_id not in changed:
+                        self._add(message_id, text)
+                self._loaded = True
+
+
+TRIGRAM_INDEX = TrigramIndex()
+
+
+def _pending(session):
+    return session.info.setdefault('trigram_index', {})
+
+
+def _record_insert(mapper, connection, target):
+    _pending(db.inspect(target).session)[target.message_id] = target.message
+
+
+def _record_update(mapper, connection, target):
+    state = db.inspect(target)
+    if state.attrs.message.history.has_changes():
+        _pending(state.session)[target.message_id] = target.message
+
+
+def _record_delete(mapper, connection, target):
+    _pending(db.inspect(target).session)[target.message_id] = None
+
+
+def _record_bulk_delete(query, delete_context):
+    if query.column_descriptions[0]['entity'] is not Message:
+        return
+
+    pending = _pending(query.session)
+    for message_id, in query.with_entities(Message.message_id):
+        pending[message_id] = None
+
+
+def _apply_pending(session):
+    for message_id, text in session.info.pop('trigram_index', {}).items():
+        if text is None:
+            TRIGRAM_INDEX.remove(message_id)
+        else:
+            TRIGRAM_INDEX.add(message_id, text)
+
+
+def _discard_pending(session, previous_transaction):
+    session.info.pop('trigram_index', None)
+
+
+db.event.listen(Message, 'after_insert', _record_insert)
+db.event.listen(Message, 'after_update', _record_update)
+db.event.listen(Message, 'after_delete', _record_delete)
+db.event.listen(Query, 'before_compile_delete', _record_bulk_delete)
+db.event.listen(db.session, 'after_commit', _apply_pending)
+db.event.listen(db.session, 'after_soft_rollback', _discard_pending)
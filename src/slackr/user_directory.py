@@ -0,0 +1,104 @@
+'''
+Cache of the user directory served by /users/all, loaded with a column-only
+query and kept serialized. It is keyed by the 'users' version counter, which
+registration, profile changes, permission changes and user removal bump, so
+every worker notices a change made by any other on its next read.
+'''
+
+import bisect
+import threading
+from json import dumps
+
+from slackr import db, versions
+from slackr.models.user import User
+from slackr.models.user_purge import UserPurge
+from slackr.utils.constants import RESERVED_UID
+
+PROFILE_COLUMNS = (User.u_id, User.email, User.name_first, User.name_last,
+                   User.handle_str, User.profile_img_url)
+
+
+class _Directory:
+    def __init__(self, version, profiles):
+        self.version = version
+        self.profiles = profiles
+        self.u_ids = [profile['u_id'] for profile in profiles]
+        self.serialized = None
+
+
+class UserDirectory:
+    ''' The profiles of every user that has not been removed, in u_id order.
+    Only the newest version is kept, and it is loaded again when the 'users'
+    counter moves on.
+    '''
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._directory = None
+
+    def page(self, cursor=None, limit=None):
+        ''' Get a page of the directory
+
+        Parameters:
+            cursor (int): u_id the page starts after, None for the first page
+            limit (int): Maximum number of profiles, None for all of them
+
+        Returns:
+            profiles (list): see user_profile
+            cursor (int): u_id the next page starts after, -1 if none
+
+        '''
+        directory = self._load()
+        profiles = directory.profiles
+        start = 0
+        if cursor is not None:
+            start = bisect.bisect(directory.u_ids, cursor)
+
+        if limit is None:
+            return profiles[start:], -1
+
+        page = profiles[start:start + limit]
+        has_more = len(profiles) > start + limit
+        return page, page[-1]['u_id'] if has_more else -1
+
+    def serialized(self):
+        ''' Get the whole directory as the JSON body of /users/all '''
+        directory = self._load()
+        with self._lock:
+            if directory.serialized is None:
+                directory.serialized = dumps({'users': directory.profiles})
+            return directory.serialized
+
+    def clear(self):
+        ''' Drop the cached directory '''
+        with self._lock:
+            self._directory = None
+
+    def _load(self):
+        # The version is read first, so a change committed during the load
+        # is picked up on the next read
+        version = versions.counter('users')
+        with self._lock:
+            directory = self._directory
+            if directory is not None and directory.version == version:
+                self.hits += 1
+                return directory
+            self.misses += 1
+
+        directory = _Directory(version, [
+            dict(zip((column.key for column in PROFILE_COLUMNS), row))
+            for row in db.session.query(*PROFILE_COLUMNS).filter(
+                User.u_id.notin_(list(RESERVED_UID.values())),
+                ~db.exists().where(UserPurge.u_id == User.u_id)).order_by(
+                    User.u_id)
+        ])
+
+        with self._lock:
+            current = self._directory
+            if current is None or current.version <= version:
+                self._directory = directory
+        return directory
+
+
+USER_DIRECTORY = UserDirectory()
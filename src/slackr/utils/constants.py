@@ -9,3 +9,58 @@ URL = os.environ['URL']
 DATABASE_URL = os.environ['DATABASE_URL']
 SECRET = os.environ['SECRET']
 SECRET_KEY = os.environ['SECRET_KEY']
+
+MESSAGE_MAX_LENGTH = 1000
+MESSAGE_PAGE_SIZE = 50
+MESSAGE_PAGE_MAX = 200
+
+BOOTSTRAP_CHUNK_SIZE = 20
+
+USERS_PAGE_MAX = 1000
+MEMBERS_PAGE_MAX = 1000
+
+STANDUP_FETCH_SIZE = 500
+
+TOKEN_LIFETIME = int(os.environ.get('TOKEN_LIFETIME', 60 * 60 * 24 * 7))
+REVOCATION_SYNC_INTERVAL = 1
+REVOCATION_PURGE_INTERVAL = 60 * 60
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 4096))
+TOKEN_CACHE_TTL = 5 * 60
+
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 20))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+
+SCHEDULER_BATCH_SIZE = 500
+SCHEDULER_RELOAD_INTERVAL = 60
+
+PURGE_CHUNK_SIZE = 500
+PURGE_RELOAD_INTERVAL = 60
+
+HISTORY_CACHE_SIZE = MESSAGE_PAGE_MAX
+HISTORY_CACHE_CHANNELS = int(os.environ.get('HISTORY_CACHE_CHANNELS', 256))
+HISTORY_CACHE_TTL = 10 * 60
+
+BOT_WORKERS = int(os.environ.get('BOT_WORKERS', 4))
+BOT_QUEUE_SIZE = 100
+
+HANGMAN_STAGE_MAX = 10
+HANGMAN_WRITE_INTERVAL = 1
+HANGMAN_WORD_MIN = 3
+HANGMAN_WORD_MAX = 100
+# Off by default, so games never depend on outbound access
+HANGMAN_WORDS_REFRESH_INTERVAL = int(
+    os.environ.get('HANGMAN_WORDS_REFRESH_INTERVAL', 0))
+
+ROSTER_CACHE_CHANNELS = int(os.environ.get('ROSTER_CACHE_CHANNELS', 256))
+
+PROFILE_IMAGE_DIR = os.environ.get(
+    'PROFILE_IMAGE_DIR',
+    os.path.abspath(
+        os.path.join(os.path.dirname(__file__), '..', '..', 'profile_images')))
+PHOTO_MAX_BYTES = int(os.environ.get('PHOTO_MAX_BYTES', 10 * 1024 * 1024))
+PHOTO_MAX_PIXELS = 50 * 1000 * 1000
+PHOTO_FETCH_TIMEOUT = 10
+# Largest first, as each size is scaled down from the one before. The
+# profile image itself is scaled down to fit the largest
+PHOTO_SIZES = (512, 256, 128, 64)
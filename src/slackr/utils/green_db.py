@@ -0,0 +1,57 @@
+'''
+Cooperative PostgreSQL access under eventlet. psycopg2 is a C driver, so
+without a wait callback a query blocks the whole hub (every socket and HTTP
+request in the worker) until the server responds.
+'''
+
+import psycopg2
+from psycopg2 import extensions
+from eventlet.hubs import trampoline
+
+from slackr.utils.constants import (DB_MAX_OVERFLOW, DB_POOL_SIZE,
+                                    DB_POOL_TIMEOUT)
+
+
+def eventlet_wait_callback(conn, timeout=-1):
+    ''' Wait for a psycopg2 connection by yielding to the eventlet hub
+
+    Parameters:
+        conn (obj): psycopg2 connection
+        timeout (int): Unused, required by psycopg2's wait callback signature
+
+    '''
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        if state == extensions.POLL_READ:
+            trampoline(conn.fileno(), read=True)
+        elif state == extensions.POLL_WRITE:
+            trampoline(conn.fileno(), write=True)
+        else:
+            raise psycopg2.OperationalError(f'Bad result from poll: {state}')
+
+
+def make_psycopg2_green():
+    ''' Make every psycopg2 connection cooperate with eventlet '''
+    extensions.set_wait_callback(eventlet_wait_callback)
+
+
+def make_psycopg2_blocking():
+    ''' Restore psycopg2's default blocking behaviour '''
+    extensions.set_wait_callback(None)
+
+
+def engine_options():
+    ''' SQLAlchemy engine options for a pool shared by many greenlets
+
+    Returns (dict):
+        Keyword arguments for create_engine
+
+    '''
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_pre_ping': True,
+    }
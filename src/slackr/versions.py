@@ -0,0 +1,158 @@
+'''
+Version counters for the responses clients poll, so a GET can be answered
+with 304 Not Modified by comparing an ETag built from a few counters instead
+of reading the message and member tables again.
+
+    channel.change_seq        the channel's messages, see change_feed
+    channel.details_version   the channel's members and owners
+    user.channels_version     the channels the user is a member of
+    counter 'channels'        the list of public channels
+    counter 'users'           the user directory
+    counter 'profiles'        the names and profile images of the members
+                              shown in channel details, see roster_cache
+
+Every tag also holds whatever decides whether the request is allowed, so a
+user who has left a channel cannot keep revalidating its messages.
+'''
+
+from slackr import db
+from slackr.models.channel import Channel
+from slackr.models.channel_purge import ChannelPurge
+from slackr.models.counter import Counter
+from slackr.models.user import User
+from slackr.token_validation import authenticate
+
+
+def bump(name):
+    ''' Count a change to something tracked by a workspace-wide counter. The
+    caller commits.
+
+    Parameters:
+        name (str): 'channels', 'users' or 'profiles'
+
+    Returns:
+        (int): The value of the counter after the change
+
+    '''
+    bumped = db.session.execute(Counter.__table__.update().where(
+        Counter.name == name).values(value=Counter.value + 1))
+
+    # Counters are created on their first change
+    if not bumped.rowcount:
+        db.session.add(Counter(name, 1))
+        db.session.flush()
+        return 1
+
+    return counter(name)
+
+
+def bump_channel(channel_id):
+    ''' Count a change to a channel's members or owners. The caller commits.
+
+    Parameters:
+        channel_id (int): ID of the channel
+
+    Returns:
+        (int): The channel's details_version after the change
+
+    '''
+    db.session.execute(Channel.__table__.update().where(
+        Channel.channel_id == channel_id).values(
+            details_version=Channel.details_version + 1))
+
+    # The updated row stays locked until the caller commits
+    return db.session.query(Channel.details_version).filter(
+        Channel.channel_id == channel_id).scalar()
+
+
+def bump_channel_lists(u_ids):
+    ''' Count a change to the channels some users are members of. The caller
+    commits.
+
+    Parameters:
+        u_ids (iterable): User IDs, or a select of them
+
+    '''
+    db.session.execute(User.__table__.update().where(
+        User.u_id.in_(u_ids)).values(
+            channels_version=User.channels_version + 1))
+
+
+def channel_messages_tag(token, channel_id):
+    ''' ETag of /channel/messages, or None when the channel does not exist '''
+    user = authenticate(token).user
+    versions = _channel_versions(channel_id)
+    if versions is None:
+        return None
+
+    change_seq, _ = versions
+    return _tag('messages', user.u_id, user.channels_version,
+                int(channel_id), change_seq)
+
+
+def channel_details_tag(token, channel_id, start=None, limit=None):
+    ''' ETag of /channel/details or one of its pages, or None when the
+    channel does not exist or the page is not valid '''
+    user = authenticate(token).user
+    versions = _channel_versions(channel_id)
+    page = _page(start, limit)
+    if versions is None or page is None:
+        return None
+
+    _, details_version = versions
+    # The details hold the members' names and profile images
+    return _tag('details', user.u_id, user.channels_version,
+                int(channel_id), details_version, counter('profiles'), *page)
+
+
+def channels_list_tag(token):
+    ''' ETag of /channels/list '''
+    user = authenticate(token).user
+    return _tag('list', user.u_id, user.channels_version)
+
+
+def channels_listall_tag(token):
+    ''' ETag of /channels/listall '''
+    authenticate(token)
+    return _tag('listall', counter('channels'))
+
+
+def users_all_tag(token, cursor=None, limit=None):
+    ''' ETag of /users/all or one of its pages, or None when the page is not
+    valid '''
+    authenticate(token)
+    page = _page(cursor, limit)
+    if page is None:
+        return None
+
+    return _tag('users', counter('users'), *page)
+
+
+def _channel_versions(channel_id):
+    try:
+        channel_id = int(channel_id)
+    except (TypeError, ValueError):
+        return None
+
+    return db.session.query(
+        Channel.change_seq, Channel.details_version).filter(
+            Channel.channel_id == channel_id,
+            ~db.exists().where(
+                ChannelPurge.channel_id == Channel.channel_id)).first()
+
+
+def counter(name):
+    ''' Get the value of a workspace-wide counter, 0 before its first change '''
+    return db.session.query(
+        Counter.value).filter(Counter.name == name).scalar() or 0
+
+
+def _page(*parts):
+    try:
+        return [None if part is None else int(part) for part in parts]
+    except ValueError:
+        return None
+
+
+def _tag(*parts):
+    return '-'.join(str(part) for part in parts)
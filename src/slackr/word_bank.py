@@ -0,0 +1,158 @@
+'''
+Words for games of hangman. A corpus bundled with the app is loaded and
+indexed by length and difficulty once, when the module is imported, so
+picking a word never waits on the network. Words can optionally be added in
+the background from Wikiquote's random page titles.
+'''
+
+import os
+import random
+import string
+import threading
+import time
+import traceback
+
+import wikiquote
+
+from slackr.utils.constants import (HANGMAN_WORD_MAX, HANGMAN_WORD_MIN,
+                                    HANGMAN_WORDS_REFRESH_INTERVAL)
+
+CORPUS = os.path.join(os.path.dirname(__file__), 'data', 'hangman_words.txt')
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+# Letters that are rarely guessed early
+RARE_LETTERS = set('jkqvwxyz')
+
+
+def is_valid(word):
+    ''' Whether a word can be played, i.e. is only ASCII letters and within
+    the length limits '''
+    return HANGMAN_WORD_MIN <= len(word) <= HANGMAN_WORD_MAX and all(
+        char in string.ascii_letters for char in word)
+
+
+def difficulty(word):
+    ''' Rate a word by the letters that have to be guessed
+
+    Parameters:
+        word (str): The word
+
+    Returns:
+        (str): One of DIFFICULTIES
+
+    '''
+    letters = set(word.lower())
+    score = len(letters) + 2 * len(letters & RARE_LETTERS)
+    if score <= 6:
+        return 'easy'
+    if score <= 9:
+        return 'medium'
+    return 'hard'
+
+
+class WordBank:
+    ''' Playable words indexed by length and difficulty. The index is
+    rebuilt when words are added and swapped in whole, so sampling never
+    takes a lock.
+    '''
+    def __init__(self, words=()):
+        self._lock = threading.Lock()
+        self._words = ()
+        self._index = {}
+        self._thread = None
+        self.add(words)
+
+    def __len__(self):
+        return len(self._words)
+
+    def add(self, words):
+        ''' Add words to the bank, skipping any that are not playable or
+        already in it
+
+        Parameters:
+            words (iterable): Words to add
+
+        Returns:
+            (int): The number of words added
+
+        '''
+        with self._lock:
+            known = set(self._words)
+            added = [
+                word for word in dict.fromkeys(word.strip() for word in words)
+                if is_valid(word) and word not in known
+            ]
+            if not added:
+                return 0
+
+            words = self._words + tuple(added)
+            index = {}
+            for word in words:
+                level = difficulty(word)
+                for key in ((len(word), level), (len(word), None),
+                            (None, level)):
+                    index.setdefault(key, []).append(word)
+
+            self._words, self._index = words, index
+
+        return len(added)
+
+    def sample(self, length=None, level=None):
+        ''' Pick a random word
+
+        Parameters:
+            length (int): Length of the word, None for any
+            level (str): One of DIFFICULTIES, None for any
+
+        Returns:
+            (str): The word, or None if no word matches
+
+        '''
+        if length is None and level is None:
+            words = self._words
+        else:
+            words = self._index.get((length, level))
+
+        return random.choice(words) if words else None
+
+    def refresh(self):
+        ''' Add the titles of random Wikiquote pages that are playable words
+
+        Returns:
+            (int): The number of words added
+
+        '''
+        return self.add(wikiquote.random_titles(lang='en'))
+
+    def start_refresh(self, interval=HANGMAN_WORDS_REFRESH_INTERVAL):
+        ''' Start the thread that refreshes the bank every `interval`
+        seconds. Nothing is started when the interval is 0.
+        '''
+        if interval <= 0:
+            return
+
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._refresh_forever,
+                                            args=[interval],
+                                            daemon=True)
+        self._thread.start()
+
+    def _refresh_forever(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.refresh()
+            except Exception:  # pylint: disable=broad-except
+                traceback.print_exc()
+
+
+def load_corpus(path=CORPUS):
+    ''' Read the words of a corpus file, one per line '''
+    with open(path) as corpus:
+        return [line.strip() for line in corpus if line.strip()]
+
+
+WORD_BANK = WordBank(load_corpus())
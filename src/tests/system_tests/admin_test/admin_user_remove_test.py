@@ -5,6 +5,7 @@ import other
 import channel
 import channels
 import message as msg
+from channel_purger import PURGER
 from error import InputError, AccessError
 
 
@@ -173,3 +174,91 @@ def test_admin_user_remove_after_removal_token(reset, new_user):
 
     with pytest.raises(AccessError):
         channels.channels_create(member_user['token'], 'Channel', True)
+
+
+def test_admin_user_remove_shared_reacts(reset, new_user, new_channel):
+    '''Test that removing a user keeps reacts other users have made'''
+
+    admin_user = new_user(email='admin@slackr.com')
+    member_user = new_user(email='pleb@slackr.com')
+
+    test_channel = new_channel(admin_user)
+    channel.channel_join(member_user['token'], test_channel['channel_id'])
+
+    test_msg = msg.message_send(admin_user['token'],
+                                test_channel['channel_id'], 'Hello')
+    msg.message_react(admin_user['token'], test_msg['message_id'], 1)
+    msg.message_react(member_user['token'], test_msg['message_id'], 1)
+
+    admin.admin_user_remove(admin_user['token'], member_user['u_id'])
+
+    channel_msgs = channel.channel_messages(admin_user['token'],
+                                            test_channel['channel_id'],
+                                            0)['messages']
+    assert channel_msgs[0]['reacts'][0]['u_ids'] == [admin_user['u_id']]
+
+
+def test_admin_user_remove_lone_reacts(reset, new_user, new_channel):
+    '''Test that removing a user drops the reacts only they had made'''
+
+    admin_user = new_user(email='admin@slackr.com')
+    member_user = new_user(email='pleb@slackr.com')
+
+    test_channel = new_channel(admin_user)
+    channel.channel_join(member_user['token'], test_channel['channel_id'])
+
+    first = msg.message_send(admin_user['token'], test_channel['channel_id'],
+                             'First')
+    second = msg.message_send(admin_user['token'],
+                              test_channel['channel_id'], 'Second')
+    msg.message_react(member_user['token'], first['message_id'], 1)
+    msg.message_react(admin_user['token'], second['message_id'], 1)
+
+    admin.admin_user_remove(admin_user['token'], member_user['u_id'])
+
+    channel_msgs = channel.channel_messages(admin_user['token'],
+                                            test_channel['channel_id'],
+                                            0)['messages']
+    assert not channel_msgs[0]['reacts']
+    assert channel_msgs[1]['reacts'][0]['u_ids'] == [admin_user['u_id']]
+
+
+def test_admin_user_remove_large_user(reset, new_user, new_channel,
+                                      monkeypatch):
+    '''Test that a user with many messages is removed straight away and their
+    messages purged in the background'''
+
+    monkeypatch.setattr(PURGER, 'needs_purge', lambda messages: True)
+
+    admin_user = new_user(email='admin@slackr.com')
+    member_user = new_user(email='pleb@slackr.com')
+
+    test_channel = new_channel(admin_user)
+    channel.channel_join(member_user['token'], test_channel['channel_id'])
+
+    for i in range(5):
+        msg.message_send(member_user['token'], test_channel['channel_id'],
+                         f'Message {i}')
+
+    admin.admin_user_remove(admin_user['token'], member_user['u_id'])
+
+    with pytest.raises(AccessError):
+        channels.channels_list(member_user['token'])
+
+    with pytest.raises(InputError):
+        admin.admin_user_remove(admin_user['token'], member_user['u_id'])
+
+    assert member_user['u_id'] not in [
+        user['u_id'] for user in other.users_all(admin_user['token'])['users']
+    ]
+    assert len(channel.channel_details(
+        admin_user['token'], test_channel['channel_id'])['all_members']) == 1
+
+    # The email is free to register again
+    new_user(email='pleb@slackr.com')
+
+    PURGER.purge_pending()
+
+    assert not channel.channel_messages(admin_user['token'],
+                                        test_channel['channel_id'],
+                                        0)['messages']
@@ -0,0 +1,145 @@
+'''System tests for loading a client session in one request'''
+import json
+import pytest
+import bootstrap
+import channel
+import channels
+import message
+from error import InputError, AccessError
+from slackr import APP, db
+
+
+def count_queries(func):
+    '''Run a function and count the statements it sends to the database'''
+    statements = []
+
+    def count(*args):
+        statements.append(args)
+
+    db.event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        func()
+    finally:
+        db.event.remove(db.engine, 'before_cursor_execute', count)
+    return len(statements)
+
+
+def test_bootstrap_matches_endpoints(reset, test_user, new_user,
+                                     new_channel):
+    '''Test that each channel matches channel_details and channel_messages'''
+
+    member = new_user(email='member@email.com')
+    first = new_channel(test_user, name='First')
+    second = new_channel(test_user, name='Second', is_public=False)
+    channel.channel_join(member['token'], first['channel_id'])
+
+    for i in range(3):
+        message.message_send(test_user['token'], first['channel_id'],
+                             f'Message {i}')
+    sent = message.message_send(member['token'], first['channel_id'],
+                                'Reacted')
+    message.message_react(test_user['token'], sent['message_id'], 1)
+
+    result = bootstrap.bootstrap(test_user['token'])
+
+    assert result['user']['u_id'] == test_user['u_id']
+    assert [loaded['channel_id'] for loaded in result['channels']
+            ] == [first['channel_id'], second['channel_id']]
+
+    for loaded in result['channels']:
+        details = channel.channel_details(test_user['token'],
+                                          loaded['channel_id'])
+        messages = channel.channel_messages(test_user['token'],
+                                            loaded['channel_id'], 0)
+
+        assert loaded['name'] == details['name']
+        assert loaded['all_members'] == details['all_members']
+        assert sorted(member['u_id'] for member in loaded['owner_members']
+                      ) == sorted(member['u_id']
+                                  for member in details['owner_members'])
+        assert loaded['messages'] == messages['messages']
+        assert loaded['end'] == messages['end']
+
+    assert not result['channels'][1]['is_public']
+
+
+def test_bootstrap_full_page(reset, test_user, test_channel):
+    '''Test that only the first page of a long channel is loaded'''
+
+    for i in range(51):
+        message.message_send(test_user['token'], test_channel['channel_id'],
+                             f'Message {i}')
+
+    loaded = bootstrap.bootstrap(test_user['token'])['channels'][0]
+    assert len(loaded['messages']) == 50
+    assert loaded['messages'][0]['message'] == 'Message 0'
+    assert loaded['end'] == 50
+
+
+def test_bootstrap_fixed_queries(reset, test_user, new_channel):
+    '''Test that the number of queries does not grow with the channels'''
+
+    def load_with(count):
+        for i in range(count):
+            created = new_channel(test_user, name=f'Channel {i}')
+            message.message_send(test_user['token'], created['channel_id'],
+                                 'Hello')
+        return count_queries(lambda: bootstrap.bootstrap(test_user['token']))
+
+    assert load_with(2) == load_with(6)
+
+
+def test_bootstrap_stream(reset, test_user, new_channel, monkeypatch):
+    '''Test that the streamed response has one section per chunk of
+    channels'''
+
+    # The route uses the app's own module
+    monkeypatch.setattr('slackr.controllers.bootstrap.BOOTSTRAP_CHUNK_SIZE', 2)
+    for i in range(3):
+        new_channel(test_user, name=f'Channel {i}')
+
+    response = APP.test_client().get('/bootstrap',
+                                     query_string={
+                                         'token': test_user['token'],
+                                         'stream': 'true'
+                                     })
+    sections = [
+        json.loads(line) for line in response.data.decode().splitlines()
+    ]
+
+    assert sections[0]['user']['u_id'] == test_user['u_id']
+    assert [len(section['channels']) for section in sections] == [0, 2, 1]
+
+
+def test_bootstrap_no_channels(reset, test_user):
+    '''Test that a user in no channels gets only their profile'''
+
+    result = bootstrap.bootstrap(test_user['token'])
+    assert result['user']['u_id'] == test_user['u_id']
+    assert not result['channels']
+
+
+def test_bootstrap_insufficient_params(reset):
+    '''Test that a missing token raises an InputError'''
+
+    with pytest.raises(InputError):
+        bootstrap.bootstrap(None)
+
+
+def test_bootstrap_invalid_token(reset, invalid_token):
+    '''Test that an invalid token raises an AccessError'''
+
+    with pytest.raises(AccessError):
+        bootstrap.bootstrap(invalid_token)
+
+
+def test_bootstrap_left_channel(reset, test_user, test_channel):
+    '''Test that channels the user has left are not loaded'''
+
+    channels.channels_create(test_user['token'], 'Other', True)
+    channel.channel_leave(test_user['token'], test_channel['channel_id'])
+
+    assert [
+        loaded['name']
+        for loaded in bootstrap.bootstrap(test_user['token'])['channels']
+    ] == ['Other']
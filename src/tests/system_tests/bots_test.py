@@ -0,0 +1,128 @@
+'''System tests for bots answering events on their workers'''
+import pytest
+import hangman
+from error import InputError
+from slackr.bots import BOTS, BotDispatcher
+from slackr.models.message import Message
+from slackr.utils.bot_loader import load_hangman_bot
+from slackr.utils.constants import RESERVED_UID
+
+BOT_UID = RESERVED_UID['hangman_bot']
+
+
+@pytest.fixture
+def bot_channel(reset, test_channel):
+    '''A channel with the bot user loaded'''
+    load_hangman_bot()
+    return test_channel['channel_id']
+
+
+def collect():
+    '''A callback that records the replies it is called with'''
+    replies = []
+
+    def callback(channel_id, details):
+        replies.append((channel_id, details))
+
+    return callback, replies
+
+
+def test_dispatch_reply(bot_channel):
+    '''Test that a reply is posted as the bot and passed to the callback'''
+
+    bots = BotDispatcher(workers=2, queue_size=10)
+    bots.register('echo', BOT_UID, lambda channel_id, payload: payload['text'])
+    bots.start()
+
+    callback, replies = collect()
+    bots.dispatch('echo', bot_channel, {'text': 'Hello'}, callback)
+    bots.join()
+
+    assert [(channel_id, details['message'], details['u_id'])
+            for channel_id, details in replies] == [(bot_channel, 'Hello',
+                                                     BOT_UID)]
+    assert Message.query.filter_by(channel_id=bot_channel,
+                                   u_id=BOT_UID).count() == 1
+
+
+def test_dispatch_order(bot_channel):
+    '''Test that the events of a channel are answered in order'''
+
+    bots = BotDispatcher(workers=4, queue_size=50)
+    bots.register('count', BOT_UID,
+                  lambda channel_id, payload: str(payload['n']))
+    bots.start()
+
+    callback, replies = collect()
+    for n in range(20):
+        bots.dispatch('count', bot_channel, {'n': n}, callback)
+    bots.join()
+
+    assert [details['message'] for _, details in replies
+            ] == [str(n) for n in range(20)]
+
+
+def test_dispatch_rejected(bot_channel):
+    '''Test that a rejected event is dropped and later events are still
+    answered'''
+    def handler(channel_id, payload):
+        if payload['reject']:
+            raise InputError(description='Rejected')
+        return 'Accepted'
+
+    bots = BotDispatcher(workers=1, queue_size=10)
+    bots.register('check', BOT_UID, handler)
+    bots.start()
+
+    callback, replies = collect()
+    bots.dispatch('check', bot_channel, {'reject': True}, callback)
+    bots.dispatch('check', bot_channel, {'reject': False}, callback)
+    bots.join()
+
+    assert [details['message'] for _, details in replies] == ['Accepted']
+
+
+def test_dispatch_no_reply(bot_channel):
+    '''Test that nothing is posted when a handler has no reply'''
+
+    bots = BotDispatcher(workers=1, queue_size=10)
+    bots.register('quiet', BOT_UID, lambda channel_id, payload: None)
+    bots.start()
+
+    callback, replies = collect()
+    bots.dispatch('quiet', bot_channel, {}, callback)
+    bots.dispatch('unknown', bot_channel, {}, callback)
+    bots.join()
+
+    assert not replies
+    assert Message.query.filter_by(channel_id=bot_channel).count() == 0
+
+
+def test_dispatch_full(bot_channel):
+    '''Test that an event is refused when the worker's queue is full'''
+
+    # Not started, so nothing is taken off the queue
+    bots = BotDispatcher(workers=1, queue_size=1)
+    bots.register('echo', BOT_UID, lambda channel_id, payload: 'Hello')
+
+    bots.dispatch('echo', bot_channel)
+    with pytest.raises(InputError):
+        bots.dispatch('echo', bot_channel)
+
+
+def test_hangman_callback(reset, test_user, bot_channel, monkeypatch):
+    '''Test that the hangman bot answers on its workers when given a
+    callback'''
+
+    monkeypatch.setattr('slackr.models.hangman.get_word', lambda: 'Banana')
+    callback, replies = collect()
+
+    assert hangman.start_hangman(test_user['token'], bot_channel,
+                                 callback) == {}
+    assert hangman.guess_hangman(test_user['token'], bot_channel, 'a',
+                                 callback) == {}
+    BOTS.join()
+
+    assert [details['u_id'] for _, details in replies] == [BOT_UID, BOT_UID]
+    assert 'Welcome to Hangman!' in replies[0][1]['message']
+    assert 'That was right!' in replies[1][1]['message']
@@ -0,0 +1,175 @@
+'''
+System tests for channel changes function.
+'''
+
+import pytest
+import admin
+import channel
+import message
+from message_scheduler import SCHEDULER
+from slackr import db, helpers
+from slackr.models.scheduled_message import ScheduledMessage
+from error import InputError
+from error import AccessError
+
+
+def test_changes_all(reset, test_user, test_channel):
+    '''
+    Testing that syncing from 0 returns every message.
+    '''
+
+    for i in range(3):
+        message.message_send(test_user['token'], test_channel['channel_id'],
+                             f'Message {i}')
+
+    changes = channel.channel_changes(test_user['token'],
+                                      test_channel['channel_id'], 0)
+
+    assert [msg['message'] for msg in changes['messages']
+            ] == ['Message 0', 'Message 1', 'Message 2']
+    assert not changes['removed']
+    assert changes['seq'] == 3
+
+
+def test_changes_since(reset, test_user, test_channel, new_user):
+    '''
+    Testing that only edits, reacts, pins and removals after the sequence
+    number are returned.
+    '''
+
+    member = new_user(email='member@email.com')
+    channel.channel_join(member['token'], test_channel['channel_id'])
+    channel_id = test_channel['channel_id']
+
+    first = message.message_send(test_user['token'], channel_id, 'First')
+    second = message.message_send(test_user['token'], channel_id, 'Second')
+    third = message.message_send(test_user['token'], channel_id, 'Third')
+    message.message_send(test_user['token'], channel_id, 'Untouched')
+
+    seq = channel.channel_changes(test_user['token'], channel_id, 0)['seq']
+    assert not channel.channel_changes(test_user['token'], channel_id,
+                                       seq)['messages']
+
+    message.message_edit(test_user['token'], first['message_id'], 'Edited')
+    message.message_react(member['token'], second['message_id'], 1)
+    message.message_pin(test_user['token'], second['message_id'])
+    message.message_remove(test_user['token'], third['message_id'])
+
+    changes = channel.channel_changes(member['token'], channel_id, seq)
+
+    assert [msg['message'] for msg in changes['messages']
+            ] == ['Edited', 'Second']
+    reacted = changes['messages'][1]
+    assert reacted['is_pinned']
+    assert reacted['reacts'][0]['is_this_user_reacted']
+    assert changes['removed'] == [third['message_id']]
+    assert changes['seq'] == seq + 4
+
+    assert channel.channel_changes(member['token'], channel_id,
+                                   changes['seq']) == {
+                                       'messages': [],
+                                       'removed': [],
+                                       'seq': changes['seq']
+                                   }
+
+
+def test_changes_scheduled(reset, test_user, test_channel):
+    '''
+    Testing that a scheduled message only appears once it is sent.
+    '''
+
+    channel_id = test_channel['channel_id']
+    message.message_sendlater(test_user['token'], channel_id, 'Later',
+                              helpers.utc_now() + 60 * 60)
+
+    changes = channel.channel_changes(test_user['token'], channel_id, 0)
+    assert not changes['messages']
+
+    ScheduledMessage.query.update({'time_sent': 0})
+    db.session.commit()
+    SCHEDULER.fire_due()
+
+    changes = channel.channel_changes(test_user['token'], channel_id,
+                                      changes['seq'])
+    assert [msg['message'] for msg in changes['messages']] == ['Later']
+
+
+def test_changes_user_removed(reset, test_user, test_channel, new_user):
+    '''
+    Testing that removing a user reports their messages as removed and their
+    reacts as changes.
+    '''
+
+    member = new_user(email='member@email.com')
+    channel.channel_join(member['token'], test_channel['channel_id'])
+    channel_id = test_channel['channel_id']
+
+    kept = message.message_send(test_user['token'], channel_id, 'Kept')
+    gone = message.message_send(member['token'], channel_id, 'Gone')
+    message.message_react(member['token'], kept['message_id'], 1)
+
+    seq = channel.channel_changes(test_user['token'], channel_id, 0)['seq']
+    admin.admin_user_remove(test_user['token'], member['u_id'])
+
+    changes = channel.channel_changes(test_user['token'], channel_id, seq)
+    assert changes['removed'] == [gone['message_id']]
+    assert [msg['message_id'] for msg in changes['messages']
+            ] == [kept['message_id']]
+    assert not changes['messages'][0]['reacts']
+
+
+def test_changes_other_channel(reset, test_user, new_channel):
+    '''
+    Testing that changes to other channels are not returned.
+    '''
+
+    first = new_channel(test_user, name='First')
+    second = new_channel(test_user, name='Second')
+
+    message.message_send(test_user['token'], second['channel_id'], 'Elsewhere')
+
+    changes = channel.channel_changes(test_user['token'], first['channel_id'],
+                                      0)
+    assert not changes['messages']
+    assert changes['seq'] == 0
+
+
+def test_changes_insufficient_params(reset, test_user, test_channel):
+    '''
+    Testing that missing parameters raise an InputError.
+    '''
+
+    with pytest.raises(InputError):
+        channel.channel_changes(test_user['token'], test_channel['channel_id'],
+                                None)
+
+
+def test_changes_invalid_seq(reset, test_user, test_channel):
+    '''
+    Testing that a negative sequence number raises an InputError.
+    '''
+
+    with pytest.raises(InputError):
+        channel.channel_changes(test_user['token'], test_channel['channel_id'],
+                                -1)
+
+
+def test_changes_invalid_channel(reset, test_user):
+    '''
+    Testing that a channel that does not exist raises an InputError.
+    '''
+
+    with pytest.raises(InputError):
+        channel.channel_changes(test_user['token'], -1, 0)
+
+
+def test_changes_not_member(reset, test_channel, new_user):
+    '''
+    Testing that a user outside the channel raises an AccessError.
+    '''
+
+    outsider = new_user(email='outsider@email.com')
+
+    with pytest.raises(AccessError):
+        channel.channel_changes(outsider['token'], test_channel['channel_id'],
+                                0)
@@ -3,7 +3,12 @@ System tests for channel details function.
 '''
 
 import pytest
+import admin
 import channel
+import user
+from slackr import db, versions
+from slackr.models import user_channel_identifier
+from slackr.roster_cache import ROSTER_CACHE
 from error import InputError
 from error import AccessError
 
@@ -106,3 +111,113 @@ def test_details_insufficient_params(reset):
 
     with pytest.raises(InputError):
         channel.channel_details(None, None)
+
+
+def test_details_pages(reset, new_user, new_channel):
+    '''
+    Testing that members are paged in name order with the member counts.
+    '''
+
+    owner = new_user(email='owner@email.com')
+    test_channel = new_channel(owner)
+    channel_id = test_channel['channel_id']
+    for name in ('Dan', 'Bob', 'Cat', 'Amy'):
+        member = new_user(email=f'{name}@email.com')
+        user.user_profile_setname(member['token'], name, 'Member')
+        channel.channel_join(member['token'], channel_id)
+
+    first = channel.channel_details(owner['token'], channel_id, 0, 2)
+    second = channel.channel_details(owner['token'], channel_id, 4, 2)
+
+    assert [member['name_first'] for member in first['all_members']
+            ] == ['Amy', 'Bob']
+    assert (first['start'], first['end']) == (0, 2)
+    assert [member['name_first'] for member in second['all_members']
+            ] == ['First']
+    assert second['end'] == -1
+    assert second['member_count'] == 5
+    assert second['owner_count'] == 1
+    assert second['owner_members'][0]['u_id'] == owner['u_id']
+
+
+def test_details_invalid_page(reset, test_user, test_channel):
+    '''
+    Testing that a page outside the bounds raises an InputError.
+    '''
+
+    with pytest.raises(InputError):
+        channel.channel_details(test_user['token'],
+                                test_channel['channel_id'], -1, 10)
+
+    with pytest.raises(InputError):
+        channel.channel_details(test_user['token'],
+                                test_channel['channel_id'], 0, 0)
+
+
+def test_details_roster_updated(reset, new_user, new_channel):
+    '''
+    Testing that membership and profile changes update the cached roster
+    without loading it again.
+    '''
+
+    owner = new_user(email='owner@email.com')
+    member = new_user(email='member@email.com')
+    leaver = new_user(email='leaver@email.com')
+    test_channel = new_channel(owner)
+    channel_id = test_channel['channel_id']
+    channel.channel_join(leaver['token'], channel_id)
+
+    channel.channel_details(owner['token'], channel_id)
+    misses = ROSTER_CACHE.misses
+
+    channel.channel_invite(owner['token'], channel_id, member['u_id'])
+    channel.channel_addowner(owner['token'], channel_id, member['u_id'])
+    user.user_profile_setname(member['token'], 'Aaron', 'Member')
+    channel.channel_removeowner(owner['token'], channel_id, owner['u_id'])
+    channel.channel_leave(leaver['token'], channel_id)
+    cached = channel.channel_details(owner['token'], channel_id)
+
+    assert ROSTER_CACHE.misses == misses
+
+    ROSTER_CACHE.clear()
+    assert cached == channel.channel_details(owner['token'], channel_id)
+    assert [member['name_first'] for member in cached['all_members']
+            ] == ['Aaron', 'First']
+    assert [member['u_id'] for member in cached['owner_members']
+            ] == [member['u_id']]
+
+
+def test_details_user_removed(reset, test_user, test_channel, new_user):
+    '''
+    Testing that a removed user leaves the cached roster.
+    '''
+
+    member = new_user(email='member@email.com')
+    channel.channel_join(member['token'], test_channel['channel_id'])
+    channel.channel_details(test_user['token'], test_channel['channel_id'])
+
+    admin.admin_user_remove(test_user['token'], member['u_id'])
+
+    details = channel.channel_details(test_user['token'],
+                                      test_channel['channel_id'])
+    assert details['member_count'] == 1
+    assert details['all_members'][0]['u_id'] == test_user['u_id']
+
+
+def test_details_changed_elsewhere(reset, test_user, test_channel, new_user):
+    '''
+    Testing that a change the cache did not see, such as one made by another
+    worker, loads the roster again.
+    '''
+
+    member = new_user(email='member@email.com')
+    channel_id = test_channel['channel_id']
+    channel.channel_details(test_user['token'], channel_id)
+
+    db.session.execute(user_channel_identifier.insert().values(
+        u_id=member['u_id'], channel_id=channel_id))
+    versions.bump_channel(channel_id)
+    db.session.commit()
+
+    details = channel.channel_details(test_user['token'], channel_id)
+    assert details['member_count'] == 2
@@ -0,0 +1,128 @@
+'''
+System tests for channel history function.
+'''
+
+import pytest
+import channel
+import message
+from error import InputError
+from error import AccessError
+
+
+def test_history_latest(reset, test_user, test_channel):
+    '''
+    Testing that the latest page is returned in chronological order.
+    '''
+
+    for i in range(5):
+        message.message_send(test_user['token'], test_channel['channel_id'],
+                             f'Message {i}')
+
+    history = channel.channel_history(test_user['token'],
+                                      test_channel['channel_id'],
+                                      limit=3)
+
+    assert [msg['message'] for msg in history['messages']
+            ] == ['Message 2', 'Message 3', 'Message 4']
+    assert history['before'] == history['messages'][0]['message_id']
+    assert history['after'] == -1
+
+
+def test_history_before(reset, test_user, test_channel):
+    '''
+    Testing paging backwards through the history with the before cursor.
+    '''
+
+    for i in range(5):
+        message.message_send(test_user['token'], test_channel['channel_id'],
+                             f'Message {i}')
+
+    latest = channel.channel_history(test_user['token'],
+                                     test_channel['channel_id'],
+                                     limit=3)
+    older = channel.channel_history(test_user['token'],
+                                    test_channel['channel_id'],
+                                    before=latest['before'],
+                                    limit=3)
+
+    assert [msg['message'] for msg in older['messages']
+            ] == ['Message 0', 'Message 1']
+    assert older['before'] == -1
+    assert older['after'] == older['messages'][-1]['message_id']
+
+
+def test_history_after(reset, test_user, test_channel):
+    '''
+    Testing paging forwards through the history with the after cursor.
+    '''
+
+    first = message.message_send(test_user['token'],
+                                 test_channel['channel_id'], 'First')
+    message.message_send(test_user['token'], test_channel['channel_id'],
+                         'Second')
+
+    newer = channel.channel_history(test_user['token'],
+                                    test_channel['channel_id'],
+                                    after=first['message_id'])
+
+    assert [msg['message'] for msg in newer['messages']] == ['Second']
+    assert newer['after'] == -1
+
+
+def test_history_empty_page(reset, test_user, test_channel):
+    '''
+    Testing that an empty page keeps the cursor on the side with messages.
+    '''
+
+    first = message.message_send(test_user['token'],
+                                 test_channel['channel_id'], 'First')
+    message.message_send(test_user['token'], test_channel['channel_id'],
+                         'Second')
+
+    older = channel.channel_history(test_user['token'],
+                                    test_channel['channel_id'],
+                                    before=first['message_id'])
+
+    assert not older['messages']
+    assert older['before'] == -1
+    assert older['after'] == first['message_id']
+
+
+def test_history_invalid_cursor(reset, test_user, test_channel):
+    '''
+    Testing that an invalid cursor raises an InputError.
+    '''
+
+    with pytest.raises(InputError):
+        channel.channel_history(test_user['token'],
+                                test_channel['channel_id'],
+                                before=-1)
+
+    with pytest.raises(InputError):
+        channel.channel_history(test_user['token'],
+                                test_channel['channel_id'],
+                                before=1,
+                                after=1)
+
+
+def test_history_invalid_limit(reset, test_user, test_channel):
+    '''
+    Testing that a limit outside of the page bounds raises an InputError.
+    '''
+
+    with pytest.raises(InputError):
+        channel.channel_history(test_user['token'],
+                                test_channel['channel_id'],
+                                limit=0)
+
+
+def test_history_access(reset, new_user, test_channel):
+    '''
+    Checking for an AccessError when a non-member asks for the history.
+    '''
+
+    stranger = new_user(email='stranger@email.com')
+
+    with pytest.raises(AccessError):
+        channel.channel_history(stranger['token'],
+                                test_channel['channel_id'])
@@ -139,3 +139,60 @@ def test_messages_insufficient_params(reset):
 
     with pytest.raises(InputError):
         channel.channel_messages(None, None, None)
+
+
+def test_messages_reacts(reset, new_user, test_user, test_channel):
+    '''
+    Testing that the reacts of every message in the page are reported from
+    the perspective of the user asking for them.
+    '''
+
+    second_user = new_user(email='second@email.com')
+    channel.channel_join(second_user['token'], test_channel['channel_id'])
+
+    first = message.message_send(test_user['token'],
+                                 test_channel['channel_id'], 'First')
+    second = message.message_send(test_user['token'],
+                                  test_channel['channel_id'], 'Second')
+    message.message_send(test_user['token'], test_channel['channel_id'],
+                         'Third')
+
+    message.message_react(test_user['token'], first['message_id'], 1)
+    message.message_react(second_user['token'], first['message_id'], 1)
+    message.message_react(second_user['token'], second['message_id'], 1)
+
+    history = channel.channel_messages(test_user['token'],
+                                       test_channel['channel_id'], 0)
+    reacts = [msg['reacts'] for msg in history['messages']]
+
+    assert reacts[0] == [{
+        'react_id': 1,
+        'u_ids': [test_user['u_id'], second_user['u_id']],
+        'is_this_user_reacted': True
+    }]
+    assert reacts[1] == [{
+        'react_id': 1,
+        'u_ids': [second_user['u_id']],
+        'is_this_user_reacted': False
+    }]
+    assert reacts[2] == []
+
+
+def test_messages_full_page(reset, test_user, test_channel):
+    '''
+    Testing that a page of exactly 50 messages has an end.
+    '''
+
+    for i in range(50):
+        message.message_send(test_user['token'], test_channel['channel_id'],
+                             f'Message {i}')
+
+    history = channel.channel_messages(test_user['token'],
+                                       test_channel['channel_id'], 0)
+    assert len(history['messages']) == 50
+    assert history['end'] == 50
+
+    history = channel.channel_messages(test_user['token'],
+                                       test_channel['channel_id'], 50)
+    assert not history['messages']
+    assert history['end'] == -1
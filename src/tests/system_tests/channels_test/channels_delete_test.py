@@ -0,0 +1,96 @@
+''' System tests for channels_delete'''
+import pytest
+import channel
+import channels
+import message
+import other
+from channel_purger import PURGER
+from error import InputError, AccessError
+
+
+def test_delete_channel(reset, test_user, test_channel):
+    '''Test that a deleted channel and its messages are gone'''
+
+    msg = message.message_send(test_user['token'],
+                               test_channel['channel_id'], 'Hello')
+    message.message_react(test_user['token'], msg['message_id'], 1)
+
+    deleted = channels.channels_delete(test_user['token'],
+                                       test_channel['channel_id'])
+    assert deleted['channel_id'] == test_channel['channel_id']
+
+    with pytest.raises(InputError):
+        channel.channel_details(test_user['token'],
+                                test_channel['channel_id'])
+
+    with pytest.raises(InputError):
+        message.message_remove(test_user['token'], msg['message_id'])
+
+    assert not other.search(test_user['token'], 'Hello')['messages']
+
+
+def test_delete_keeps_other_channels(reset, test_user, new_channel):
+    '''Test that deleting a channel leaves other channels' messages alone'''
+
+    doomed = new_channel(test_user, name='Doomed')
+    kept = new_channel(test_user, name='Kept')
+
+    message.message_send(test_user['token'], doomed['channel_id'], 'Gone')
+    message.message_send(test_user['token'], kept['channel_id'], 'Staying')
+
+    channels.channels_delete(test_user['token'], doomed['channel_id'])
+
+    messages = channel.channel_messages(test_user['token'],
+                                        kept['channel_id'], 0)['messages']
+    assert [msg['message'] for msg in messages] == ['Staying']
+
+
+def test_delete_large_channel(reset, test_user, test_channel, monkeypatch):
+    '''Test that a large channel is hidden straight away and purged in the
+    background'''
+
+    monkeypatch.setattr(PURGER, 'needs_purge', lambda messages: True)
+
+    for i in range(5):
+        message.message_send(test_user['token'], test_channel['channel_id'],
+                             f'Message {i}')
+
+    channels.channels_delete(test_user['token'], test_channel['channel_id'])
+
+    assert not channels.channels_list(test_user['token'])['channels']
+    assert not channels.channels_listall(test_user['token'])['channels']
+
+    # The channel no longer exists for anyone, and cannot be deleted twice
+    with pytest.raises(InputError):
+        channel.channel_details(test_user['token'],
+                                test_channel['channel_id'])
+    with pytest.raises(InputError):
+        message.message_send(test_user['token'], test_channel['channel_id'],
+                             'Hello')
+    with pytest.raises(InputError):
+        channels.channels_delete(test_user['token'],
+                                 test_channel['channel_id'])
+
+    PURGER.purge_pending()
+
+    with pytest.raises(InputError):
+        channel.channel_details(test_user['token'],
+                                test_channel['channel_id'])
+    assert not other.search(test_user['token'], 'Message')['messages']
+
+
+def test_delete_not_owner(reset, test_channel, new_user):
+    '''Test that only owners of Slackr can delete channels'''
+
+    member = new_user(email='member@email.com')
+
+    with pytest.raises(AccessError):
+        channels.channels_delete(member['token'], test_channel['channel_id'])
+
+
+def test_delete_invalid_channel(reset, test_user):
+    '''Test that deleting a channel that does not exist raises an
+    InputError'''
+
+    with pytest.raises(InputError):
+        channels.channels_delete(test_user['token'], -1)
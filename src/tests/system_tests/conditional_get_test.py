@@ -0,0 +1,157 @@
+'''System tests for ETags and 304 responses on the polled GET routes'''
+import pytest
+import auth
+import channel
+import channels
+import message
+import user
+from slackr import APP
+
+
+@pytest.fixture
+def client():
+    '''Flask test client'''
+    return APP.test_client()
+
+
+def get(client, url, etag=None, **params):
+    '''GET a route, revalidating against an ETag when one is given'''
+    headers = {'If-None-Match': f'"{etag}"'} if etag is not None else {}
+    return client.get(url, query_string=params, headers=headers)
+
+
+def revalidate(client, url, **params):
+    '''GET a route twice, the second time with the first response's ETag'''
+    first = get(client, url, **params)
+    assert first.status_code == 200
+    etag, _ = first.get_etag()
+    return etag, get(client, url, etag, **params)
+
+
+def test_unchanged(reset, client, test_user, test_channel):
+    '''Test that every route answers 304 when nothing has changed'''
+
+    token = test_user['token']
+    channel_id = test_channel['channel_id']
+
+    routes = (
+        ('/channel/messages', {'channel_id': channel_id, 'start': 0}),
+        ('/channel/details', {'channel_id': channel_id}),
+        ('/channels/list', {}),
+        ('/channels/listall', {}),
+        ('/users/all', {}),
+    )
+
+    for url, params in routes:
+        _, second = revalidate(client, url, token=token, **params)
+        assert second.status_code == 304
+        assert not second.data
+
+
+def test_messages_changed(reset, client, test_user, test_channel):
+    '''Test that a new message changes the ETag of the channel's messages'''
+
+    params = {
+        'token': test_user['token'],
+        'channel_id': test_channel['channel_id'],
+        'start': 0
+    }
+    etag, _ = revalidate(client, '/channel/messages', **params)
+
+    message.message_send(test_user['token'], test_channel['channel_id'],
+                         'Hello')
+
+    response = get(client, '/channel/messages', etag, **params)
+    assert response.status_code == 200
+    assert response.get_json(force=True)['messages'][0]['message'] == 'Hello'
+
+
+def test_details_changed(reset, client, test_user, test_channel, new_user):
+    '''Test that joins and profile changes change the ETag of the details'''
+
+    params = {
+        'token': test_user['token'],
+        'channel_id': test_channel['channel_id']
+    }
+    etag, _ = revalidate(client, '/channel/details', **params)
+
+    member = new_user(email='member@email.com')
+    channel.channel_join(member['token'], test_channel['channel_id'])
+
+    response = get(client, '/channel/details', etag, **params)
+    assert response.status_code == 200
+    etag, _ = response.get_etag()
+
+    user.user_profile_setname(member['token'], 'New', 'Name')
+    assert get(client, '/channel/details', etag, **params).status_code == 200
+
+
+def test_lists_changed(reset, client, test_user, new_user):
+    '''Test that creating a channel changes the ETags of the channel lists'''
+
+    other = new_user(email='other@email.com')
+    list_etag, _ = revalidate(client,
+                              '/channels/list',
+                              token=test_user['token'])
+    listall_etag, _ = revalidate(client,
+                                 '/channels/listall',
+                                 token=other['token'])
+    other_list_etag, _ = revalidate(client,
+                                    '/channels/list',
+                                    token=other['token'])
+
+    channels.channels_create(test_user['token'], 'Channel', True)
+
+    assert get(client, '/channels/list', list_etag,
+               token=test_user['token']).status_code == 200
+    assert get(client, '/channels/listall', listall_etag,
+               token=other['token']).status_code == 200
+    assert get(client, '/channels/list', other_list_etag,
+               token=other['token']).status_code == 304
+
+
+def test_users_changed(reset, client, test_user):
+    '''Test that registering changes the ETag of the user directory'''
+
+    etag, _ = revalidate(client, '/users/all', token=test_user['token'])
+
+    auth.auth_register('new@email.com', 'password', 'New', 'User')
+
+    response = get(client, '/users/all', etag, token=test_user['token'])
+    assert response.status_code == 200
+    assert len(response.get_json(force=True)['users']) == 2
+
+
+def test_left_channel(reset, client, test_user, test_channel, new_user):
+    '''Test that a user who left a channel cannot revalidate its messages'''
+
+    member = new_user(email='member@email.com')
+    channel.channel_join(member['token'], test_channel['channel_id'])
+
+    params = {
+        'token': member['token'],
+        'channel_id': test_channel['channel_id'],
+        'start': 0
+    }
+    etag, _ = revalidate(client, '/channel/messages', **params)
+
+    channel.channel_leave(member['token'], test_channel['channel_id'])
+
+    assert get(client, '/channel/messages', etag,
+               **params).status_code != 304
+
+
+def test_users_page(reset, client, test_user, new_user):
+    '''Test that each page of the user directory has its own ETag'''
+
+    new_user(email='other@email.com')
+    first, _ = revalidate(client, '/users/all', token=test_user['token'],
+                          limit=1)
+    second, response = revalidate(client,
+                                  '/users/all',
+                                  token=test_user['token'],
+                                  cursor=test_user['u_id'],
+                                  limit=1)
+
+    assert first != second
+    assert response.status_code == 304
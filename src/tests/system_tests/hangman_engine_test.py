@@ -0,0 +1,153 @@
+'''System tests for games of hangman and their write-behind persistence'''
+import threading
+import pytest
+import hangman
+from error import InputError
+from slackr import db
+from slackr.hangman_engine import HANGMAN_ENGINE
+from slackr.models.hangman import Hangman
+from slackr.models.message import Message
+from slackr.utils.bot_loader import load_hangman_bot
+from slackr.utils.constants import RESERVED_UID
+
+
+@pytest.fixture
+def game(reset, test_user, test_channel, monkeypatch):
+    '''A game of hangman with the word Banana'''
+    load_hangman_bot()
+    monkeypatch.setattr('slackr.models.hangman.get_word', lambda: 'Banana')
+    hangman.start_hangman(test_user['token'], test_channel['channel_id'])
+    return test_channel['channel_id']
+
+
+def stored(channel_id):
+    '''The state of a channel's game as written to the database'''
+    db.session.expire_all()
+    return Hangman.find(channel_id).snapshot()
+
+
+def test_start_written(reset, game):
+    '''Test that a new game is written straight away'''
+
+    assert stored(game) == {
+        'is_active': True,
+        'word': 'Banana',
+        'guesses': '',
+        'incorrect': '',
+        'stage': 0
+    }
+
+
+def test_guess_write_behind(reset, test_user, game, monkeypatch):
+    '''Test that guesses are only written when the engine flushes'''
+
+    # Keeps the background writer from flushing first
+    monkeypatch.setattr(HANGMAN_ENGINE, 'interval', 60)
+    hangman.guess_hangman(test_user['token'], game, 'a')
+    hangman.guess_hangman(test_user['token'], game, 'x')
+    assert stored(game)['guesses'] == ''
+
+    assert HANGMAN_ENGINE.flush() == 1
+    assert stored(game)['guesses'] == 'ax'
+    assert stored(game)['incorrect'] == 'x'
+
+
+def test_guess_bot_message(reset, test_user, game):
+    '''Test that the bot replies in the channel and the game ends once the
+    word is guessed'''
+
+    for letter in 'ab':
+        hangman.guess_hangman(test_user['token'], game, letter)
+    reply = hangman.guess_hangman(test_user['token'], game, 'n')
+
+    assert reply['u_id'] == RESERVED_UID['hangman_bot']
+    assert 'You win!' in reply['message']
+    assert Message.query.filter_by(channel_id=game).count() == 4
+
+    with pytest.raises(InputError):
+        hangman.guess_hangman(test_user['token'], game, 'a')
+
+    HANGMAN_ENGINE.flush()
+    assert not stored(game)['is_active']
+
+
+def test_guess_lost(reset, test_user, game):
+    '''Test that the game is over after ten incorrect guesses'''
+
+    for letter in 'cdefghijk':
+        hangman.guess_hangman(test_user['token'], game, letter)
+    reply = hangman.guess_hangman(test_user['token'], game, 'l')
+
+    assert 'Game Over.' in reply['message']
+    assert 'Banana' in reply['message']
+
+
+def test_guess_concurrent(reset, game):
+    '''Test that concurrent guesses to one game are applied one at a time'''
+
+    letters = 'bncdefg'
+    threads = [
+        threading.Thread(target=HANGMAN_ENGINE.guess, args=[game, letter])
+        for letter in letters
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    HANGMAN_ENGINE.flush()
+    state = stored(game)
+    assert sorted(state['guesses']) == sorted(letters)
+    assert state['stage'] == len(state['incorrect']) == 5
+
+
+def test_start_twice(reset, test_user, game):
+    '''Test that a game cannot be started while one is in progress'''
+
+    with pytest.raises(InputError):
+        hangman.start_hangman(test_user['token'], game)
+
+
+def test_guess_no_game(reset, test_user, test_channel):
+    '''Test that guessing without a game raises an InputError'''
+
+    with pytest.raises(InputError):
+        hangman.guess_hangman(test_user['token'], test_channel['channel_id'],
+                              'a')
+
+
+def test_finished_dropped(reset, test_user, game):
+    '''Test that a game is dropped from memory once it is over and written,
+    and that a new one can then be started'''
+
+    for letter in 'abn':
+        hangman.guess_hangman(test_user['token'], game, letter)
+    HANGMAN_ENGINE.flush()
+
+    games = HANGMAN_ENGINE._games  # pylint: disable=protected-access
+    assert game not in games
+    assert 'Welcome to Hangman!' in hangman.start_hangman(
+        test_user['token'], game)['message']
+
+
+def test_no_game_not_kept(reset, test_user, test_channel):
+    '''Test that a guess without a game leaves nothing in memory'''
+
+    with pytest.raises(InputError):
+        hangman.guess_hangman(test_user['token'], test_channel['channel_id'],
+                              'a')
+    games = HANGMAN_ENGINE._games  # pylint: disable=protected-access
+    assert test_channel['channel_id'] not in games
+
+
+def test_game_restored(reset, test_user, game):
+    '''Test that a game is picked up from the database by a fresh engine,
+    e.g. after a restart'''
+
+    hangman.guess_hangman(test_user['token'], game, 'a')
+    HANGMAN_ENGINE.flush()
+    HANGMAN_ENGINE.clear()
+
+    reply = hangman.guess_hangman(test_user['token'], game, 'b')
+    assert '_ a_ a_ a' not in reply['message']
+    assert 'Ba_ a_ a' in reply['message']
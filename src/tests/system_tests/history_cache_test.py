@@ -0,0 +1,204 @@
+'''System tests for the channel history ring buffer'''
+import pytest
+import channel
+import message
+from history_cache import HISTORY_CACHE, HistoryCache
+from slackr import db, helpers
+from slackr.models.channel import Channel
+from slackr.models.message import Message
+
+
+def latest(user, channel_id, limit=None):
+    '''The newest page of a channel's history'''
+    return channel.channel_history(user['token'], channel_id,
+                                   limit=limit)['messages']
+
+
+def test_cache_hits(reset, test_user, test_channel):
+    '''Test that repeated reads of the newest page are served from the
+    buffer'''
+
+    message.message_send(test_user['token'], test_channel['channel_id'],
+                         'Hello')
+
+    latest(test_user, test_channel['channel_id'])
+    hits = HISTORY_CACHE.stats()['hits']
+
+    assert [msg['message'] for msg in latest(test_user,
+                                              test_channel['channel_id'])
+            ] == ['Hello']
+    assert HISTORY_CACHE.stats()['hits'] == hits + 1
+
+
+def test_cache_follows_writes(reset, test_user, test_channel, new_user):
+    '''Test that sends, edits, reacts, pins and removals are reflected in
+    the buffer'''
+
+    member = new_user(email='member@email.com')
+    channel.channel_join(member['token'], test_channel['channel_id'])
+    channel_id = test_channel['channel_id']
+
+    first = message.message_send(test_user['token'], channel_id, 'First')
+    latest(test_user, channel_id)
+
+    second = message.message_send(test_user['token'], channel_id, 'Second')
+    message.message_edit(test_user['token'], first['message_id'], 'Edited')
+    assert [msg['message'] for msg in latest(test_user, channel_id)
+            ] == ['Edited', 'Second']
+
+    message.message_react(member['token'], second['message_id'], 1)
+    message.message_pin(test_user['token'], second['message_id'])
+
+    newest = latest(test_user, channel_id)[-1]
+    assert newest['is_pinned']
+    assert newest['reacts'][0]['u_ids'] == [member['u_id']]
+    assert not newest['reacts'][0]['is_this_user_reacted']
+    assert latest(member, channel_id)[-1]['reacts'][0]['is_this_user_reacted']
+
+    message.message_unreact(member['token'], second['message_id'], 1)
+    message.message_unpin(test_user['token'], second['message_id'])
+
+    newest = latest(test_user, channel_id)[-1]
+    assert not newest['is_pinned']
+    assert not newest['reacts']
+
+    message.message_remove(test_user['token'], second['message_id'])
+    assert [msg['message'] for msg in latest(test_user, channel_id)
+            ] == ['Edited']
+
+
+def test_cache_full_buffer(reset, test_user, test_channel, monkeypatch):
+    '''Test that a channel with more messages than the buffer holds is paged
+    correctly'''
+
+    monkeypatch.setattr(HISTORY_CACHE, 'size', 3)
+    channel_id = test_channel['channel_id']
+
+    sent = [
+        message.message_send(test_user['token'], channel_id, f'Message {i}')
+        for i in range(5)
+    ]
+
+    page = channel.channel_history(test_user['token'], channel_id, limit=2)
+    assert [msg['message'] for msg in page['messages']
+            ] == ['Message 3', 'Message 4']
+    assert page['before'] == sent[3]['message_id']
+
+    messages = channel.channel_messages(test_user['token'], channel_id,
+                                        0)['messages']
+    assert len(messages) == 5
+
+    message.message_remove(test_user['token'], sent[4]['message_id'])
+    assert [msg['message'] for msg in latest(test_user, channel_id, 3)
+            ] == ['Message 1', 'Message 2', 'Message 3']
+
+
+def test_cache_eviction(reset, test_user, new_channel):
+    '''Test that the least recently read channel is evicted'''
+
+    cache = HistoryCache(channels=1, size=10, ttl=60)
+
+    first = new_channel(test_user, name='First')
+    second = new_channel(test_user, name='Second')
+
+    class Viewer:
+        '''Stand-in for a user object'''
+        u_id = test_user['u_id']
+
+    cache.latest(Channel.find(first['channel_id']), 5, Viewer)
+    cache.latest(Channel.find(second['channel_id']), 5, Viewer)
+
+    stats = cache.stats()
+    assert stats['channels'] == 1
+    assert stats['evictions'] == 1
+
+
+def test_cache_page_newest(reset, test_user, test_channel, monkeypatch):
+    '''Test that offsets within the newest messages are served from the
+    buffer, and older ones from the database'''
+
+    monkeypatch.setattr(HISTORY_CACHE, 'size', 3)
+    monkeypatch.setattr('slackr.controllers.channel.MESSAGE_PAGE_SIZE', 2)
+    channel_id = test_channel['channel_id']
+
+    for i in range(5):
+        message.message_send(test_user['token'], channel_id, f'Message {i}')
+
+    def page(start):
+        return channel.channel_messages(test_user['token'], channel_id, start)
+
+    misses = HISTORY_CACHE.stats()['misses']
+    newest = page(3)
+    assert [msg['message'] for msg in newest['messages']
+            ] == ['Message 3', 'Message 4']
+    assert newest['end'] == 5
+    assert HISTORY_CACHE.stats()['misses'] == misses + 1
+
+    hits = HISTORY_CACHE.stats()['hits']
+    assert [msg['message'] for msg in page(4)['messages']] == ['Message 4']
+    assert HISTORY_CACHE.stats()['hits'] == hits + 1
+
+    assert [msg['message'] for msg in page(1)['messages']
+            ] == ['Message 1', 'Message 2']
+    assert HISTORY_CACHE.stats()['hits'] == hits + 1
+
+
+def test_cache_other_worker(reset, test_user, test_channel):
+    '''Test that a buffer is reloaded after another worker changes the
+    channel'''
+
+    channel_id = test_channel['channel_id']
+    message.message_send(test_user['token'], channel_id, 'Hello')
+    latest(test_user, channel_id)
+
+    # Written outside the session, as another worker would
+    with db.engine.begin() as connection:
+        connection.execute(Message.__table__.insert().values(
+            message='Elsewhere',
+            u_id=test_user['u_id'],
+            channel_id=channel_id,
+            time_created=helpers.utc_now() + 1,
+            is_pinned=False,
+            is_hidden=False))
+        connection.execute(Channel.__table__.update().where(
+            Channel.channel_id == channel_id).values(
+                change_seq=Channel.change_seq + 1))
+    db.session.expire_all()
+
+    assert [msg['message'] for msg in latest(test_user, channel_id)
+            ] == ['Hello', 'Elsewhere']
+
+
+def test_cache_own_writes_kept(reset, test_user, test_channel):
+    '''Test that this worker's own writes do not reload the buffer'''
+
+    channel_id = test_channel['channel_id']
+    message.message_send(test_user['token'], channel_id, 'Hello')
+    latest(test_user, channel_id)
+
+    misses = HISTORY_CACHE.stats()['misses']
+    message.message_send(test_user['token'], channel_id, 'Again')
+    assert [msg['message'] for msg in latest(test_user, channel_id)
+            ] == ['Hello', 'Again']
+    assert HISTORY_CACHE.stats()['misses'] == misses
+
+
+def test_cache_failed_refresh(reset, test_user, test_channel, monkeypatch):
+    '''Test that changes are reloaded again after a failed refresh'''
+
+    channel_id = test_channel['channel_id']
+    sent = message.message_send(test_user['token'], channel_id, 'Hello')
+    latest(test_user, channel_id)
+
+    message.message_edit(test_user['token'], sent['message_id'], 'Edited')
+
+    def broken(*args, **kwargs):
+        raise RuntimeError('Database is unavailable')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(Message, 'details_batch', broken)
+        with pytest.raises(RuntimeError):
+            latest(test_user, channel_id)
+
+    assert [msg['message'] for msg in latest(test_user, channel_id)
+            ] == ['Edited']
@@ -0,0 +1,99 @@
+'''System tests for the durable message scheduler'''
+import pytest
+import channel
+import message
+import helpers
+from message_scheduler import MessageScheduler
+from slackr import db
+from slackr.models.scheduled_message import ScheduledMessage
+
+# Far enough ahead that the app's own scheduler does not reveal the message
+LATER = 60 * 60
+
+
+def send_later(user, channel_id, text):
+    '''Schedule a message an hour from now'''
+    return message.message_sendlater(user['token'], channel_id, text,
+                                     helpers.utc_now() + LATER)
+
+
+def make_due():
+    '''Move every scheduled send into the past'''
+    ScheduledMessage.query.update({'time_sent': 0})
+    db.session.commit()
+
+
+def test_scheduler_reload(reset, test_user, test_channel):
+    '''Test that a restarted scheduler picks up sends that are pending'''
+
+    send_later(test_user, test_channel['channel_id'], 'Later')
+    time_sent = ScheduledMessage.query.one().time_sent
+
+    restarted = MessageScheduler()
+    restarted._reload()  # pylint: disable=protected-access
+    assert restarted._heap == [time_sent]  # pylint: disable=protected-access
+
+    make_due()
+    assert restarted.fire_due() == 1
+
+    messages = channel.channel_messages(test_user['token'],
+                                        test_channel['channel_id'],
+                                        0)['messages']
+    assert [msg['message'] for msg in messages] == ['Later']
+    assert not ScheduledMessage.query.count()
+
+
+def test_scheduler_batches(reset, test_user, test_channel):
+    '''Test that due sends are revealed a batch per transaction'''
+
+    for i in range(5):
+        send_later(test_user, test_channel['channel_id'], f'Later {i}')
+    make_due()
+
+    commits = []
+
+    def count_commit(session):
+        commits.append(session)
+
+    revealed = []
+    batched = MessageScheduler(batch_size=2)
+    batched.add_listener(lambda details, channel_id: revealed.append(details))
+
+    db.event.listen(db.session, 'after_commit', count_commit)
+    try:
+        assert batched.fire_due() == 5
+    finally:
+        db.event.remove(db.session, 'after_commit', count_commit)
+
+    assert len(commits) == 3
+    assert sorted(details['message'] for details in revealed
+                  ) == [f'Later {i}' for i in range(5)]
+
+
+def test_scheduler_skip_locked(reset, test_user, test_channel):
+    '''Test that a send claimed by another worker is not revealed twice'''
+
+    if db.engine.dialect.name != 'postgresql':
+        pytest.skip('SKIP LOCKED needs PostgreSQL')
+
+    for i in range(2):
+        send_later(test_user, test_channel['channel_id'], f'Later {i}')
+    make_due()
+
+    claimed = ScheduledMessage.query.order_by(ScheduledMessage.id).first().id
+    db.session.commit()
+
+    # Another worker holds the first send while revealing it
+    other_worker = db.engine.connect()
+    transaction = other_worker.begin()
+    try:
+        other_worker.execute(
+            db.select([ScheduledMessage.__table__.c.id
+                       ]).where(ScheduledMessage.id == claimed).with_for_update())
+
+        assert MessageScheduler().fire_due() == 1
+    finally:
+        transaction.rollback()
+        other_worker.close()
+
+    assert [job.id for job in ScheduledMessage.query.all()] == [claimed]
@@ -0,0 +1,125 @@
+'''System tests for schema migrations'''
+import hashlib
+from sqlalchemy import create_engine, inspect
+from migrations import migrate, migrations
+
+LEGACY_SCHEMA = (
+    'CREATE TABLE user (u_id INTEGER PRIMARY KEY, handle_str VARCHAR(20))',
+    'CREATE TABLE channel (channel_id INTEGER PRIMARY KEY)',
+    '''CREATE TABLE message (message_id INTEGER PRIMARY KEY, u_id INTEGER,
+    channel_id INTEGER, is_hidden BOOLEAN, time_created INTEGER)''',
+    'CREATE TABLE react (id INTEGER PRIMARY KEY, message_id INTEGER)',
+    'CREATE TABLE user_channel_identifier (u_id INTEGER, channel_id INTEGER)',
+    'CREATE TABLE owner_channel_identifier (u_id INTEGER, channel_id INTEGER)',
+    'CREATE TABLE message_react_identifier (message_id INTEGER, id INTEGER)',
+    'CREATE TABLE user_react_identifier (u_id INTEGER, id INTEGER)',
+    'CREATE TABLE expired_token (token_id INTEGER PRIMARY KEY, token TEXT)',
+)
+
+
+def legacy_engine():
+    '''An in-memory database with the schema from before migrations'''
+    engine = create_engine('sqlite://')
+    for statement in LEGACY_SCHEMA:
+        engine.execute(statement)
+    return engine
+
+
+def test_migrate_primary_keys():
+    '''Test that duplicate memberships are collapsed into a primary key'''
+    engine = legacy_engine()
+    engine.execute('INSERT INTO user_channel_identifier VALUES (1, 1)')
+    engine.execute('INSERT INTO user_channel_identifier VALUES (1, 1)')
+    engine.execute('INSERT INTO user_channel_identifier VALUES (2, 1)')
+
+    migrate(engine)
+
+    pk = inspect(engine).get_pk_constraint('user_channel_identifier')
+    assert sorted(pk['constrained_columns']) == ['channel_id', 'u_id']
+
+    rows = engine.execute('SELECT u_id, channel_id FROM '
+                          'user_channel_identifier ORDER BY u_id').fetchall()
+    assert [tuple(row) for row in rows] == [(1, 1), (2, 1)]
+
+
+def test_migrate_indexes():
+    '''Test that the lookup indexes are created'''
+    engine = legacy_engine()
+
+    migrate(engine)
+
+    indexes = {index['name'] for index in inspect(engine).get_indexes('message')}
+    assert {'ix_message_channel_history', 'ix_message_u_id'} <= indexes
+
+
+def test_migrate_idempotent():
+    '''Test that every migration is applied exactly once'''
+    engine = legacy_engine()
+
+    assert len(migrate(engine)) == len(migrations())
+    assert not migrate(engine)
+
+
+def test_migrate_expired_tokens():
+    '''Test that logged out tokens stay revoked under their hashed id'''
+    engine = legacy_engine()
+    engine.execute("INSERT INTO expired_token (token) VALUES ('first')")
+    engine.execute("INSERT INTO expired_token (token) VALUES ('first')")
+    engine.execute("INSERT INTO expired_token (token) VALUES ('second')")
+
+    migrate(engine)
+
+    assert not engine.dialect.has_table(engine, 'expired_token')
+
+    rows = engine.execute(
+        'SELECT token_id, expires_at FROM revoked_token').fetchall()
+    assert sorted(tuple(row) for row in rows) == sorted(
+        (hashlib.sha256(token.encode()).hexdigest(), None)
+        for token in ('first', 'second'))
+
+
+def test_migrate_change_seq():
+    '''Test that existing channels start with no changes'''
+    engine = legacy_engine()
+    engine.execute('INSERT INTO channel (channel_id) VALUES (1)')
+
+    migrate(engine)
+
+    assert engine.execute('SELECT change_seq FROM channel').scalar() == 0
+
+
+def test_migrate_version_counters():
+    '''Test that existing channels and users start at version 0'''
+    engine = legacy_engine()
+    engine.execute('INSERT INTO channel (channel_id) VALUES (1)')
+    engine.execute('INSERT INTO user (u_id) VALUES (1)')
+
+    migrate(engine)
+
+    assert engine.execute(
+        'SELECT details_version FROM channel').scalar() == 0
+    assert engine.execute('SELECT channels_version FROM user').scalar() == 0
+
+
+def test_migrate_lazy_channel_state():
+    '''Test that only the standups and games in progress are kept'''
+    engine = legacy_engine()
+    engine.execute('CREATE TABLE standup (id INTEGER PRIMARY KEY, '
+                   'is_active BOOLEAN, channel_id INTEGER)')
+    engine.execute('CREATE TABLE standup_entry (id INTEGER PRIMARY KEY, '
+                   'standup_id INTEGER)')
+    engine.execute('CREATE TABLE hangman (id INTEGER PRIMARY KEY, '
+                   'is_active BOOLEAN, channel_id INTEGER)')
+    engine.execute('INSERT INTO standup VALUES (1, 0, 1), (2, 1, 2), '
+                   '(3, NULL, 3)')
+    engine.execute('INSERT INTO standup_entry VALUES (1, 1), (2, 2)')
+    engine.execute('INSERT INTO hangman VALUES (1, 0, 1), (2, 1, 2)')
+
+    migrate(engine)
+
+    for table in ('standup', 'standup_entry', 'hangman'):
+        assert engine.execute(f'SELECT id FROM {table}').fetchall() == [(2, )]
+    assert 'ix_standup_channel_id' in {
+        index['name']
+        for index in inspect(engine).get_indexes('standup')
+    }
@@ -0,0 +1,106 @@
+'''System tests for full-text message search'''
+import pytest
+import channel
+import message
+import other
+from error import AccessError, InputError
+
+
+def test_search_messages_words(reset, test_user, test_channel):
+    '''Test that only messages containing every word are returned'''
+
+    message.message_send(test_user['token'], test_channel['channel_id'],
+                         'The deployment finished')
+    message.message_send(test_user['token'], test_channel['channel_id'],
+                         'Deployment failed again')
+    message.message_send(test_user['token'], test_channel['channel_id'],
+                         'Lunch is ready')
+
+    results = other.search_messages(test_user['token'],
+                                    'deployment failed')['messages']
+    assert [msg['message'] for msg in results] == ['Deployment failed again']
+
+    results = other.search_messages(test_user['token'],
+                                    'deployment')['messages']
+    assert len(results) == 2
+
+
+def test_search_messages_prefix(reset, test_user, test_channel):
+    '''Test that the words in the query match as prefixes'''
+
+    message.message_send(test_user['token'], test_channel['channel_id'],
+                         'Hello world!')
+
+    results = other.search_messages(test_user['token'], 'hel')['messages']
+    assert len(results) == 1
+
+
+def test_search_messages_index_updates(reset, test_user, test_channel):
+    '''Test that edited and removed messages are searched by their current
+    text'''
+
+    msg = message.message_send(test_user['token'],
+                               test_channel['channel_id'], 'Original text')
+
+    message.message_edit(test_user['token'], msg['message_id'],
+                         'Replacement text')
+    assert not other.search_messages(test_user['token'],
+                                     'original')['messages']
+    assert other.search_messages(test_user['token'],
+                                 'replacement')['messages']
+
+    message.message_remove(test_user['token'], msg['message_id'])
+    assert not other.search_messages(test_user['token'],
+                                     'replacement')['messages']
+
+
+def test_search_messages_pages(reset, test_user, test_channel):
+    '''Test that results are paginated'''
+
+    for i in range(5):
+        message.message_send(test_user['token'], test_channel['channel_id'],
+                             f'Status update {i}')
+
+    first = other.search_messages(test_user['token'], 'status', limit=3)
+    assert len(first['messages']) == 3
+    assert first['end'] == 3
+
+    second = other.search_messages(test_user['token'],
+                                   'status',
+                                   start=first['end'],
+                                   limit=3)
+    assert len(second['messages']) == 2
+    assert second['end'] == -1
+
+    found = first['messages'] + second['messages']
+    assert len({msg['message_id'] for msg in found}) == 5
+
+
+def test_search_messages_unauthorised_channels(reset, test_user,
+                                               test_channel, new_user):
+    '''Test that messages in channels the user has not joined are hidden'''
+
+    stranger = new_user(email='stranger@email.com')
+
+    message.message_send(test_user['token'], test_channel['channel_id'],
+                         'Members only')
+
+    assert not other.search_messages(stranger['token'],
+                                     'members')['messages']
+
+    channel.channel_join(stranger['token'], test_channel['channel_id'])
+    assert other.search_messages(stranger['token'], 'members')['messages']
+
+
+def test_search_messages_invalid_limit(reset, test_user):
+    '''Test that a limit outside of the page bounds raises an InputError'''
+
+    with pytest.raises(InputError):
+        other.search_messages(test_user['token'], 'hello', limit=0)
+
+
+def test_search_messages_invalid_token(reset, invalid_token):
+    '''Test search_messages with an invalid token'''
+
+    with pytest.raises(AccessError):
+        other.search_messages(invalid_token, 'hello')
@@ -133,3 +133,62 @@ def test_search_react(reset, test_user, new_channel):
                                               0)['messages'][0]
     msg_in_search = other.search(test_user['token'], 'hello')['messages'][0]
     assert msg_in_channel == msg_in_search
+
+
+def test_search_substring(reset, test_user, new_channel):
+    '''Test that substrings within and across words are matched'''
+
+    test_channel = new_channel(test_user, 'Channel')
+    message.message_send(test_user['token'], test_channel['channel_id'],
+                         'Hello world!')
+
+    assert len(other.search(test_user['token'], 'lo wo')['messages']) == 1
+    assert len(other.search(test_user['token'], 'ORLD!')['messages']) == 1
+    assert not other.search(test_user['token'], 'world?')['messages']
+
+
+def test_search_wildcard_characters(reset, test_user, new_channel):
+    '''Test that wildcard characters in the query are matched literally'''
+
+    test_channel = new_channel(test_user, 'Channel')
+    message.message_send(test_user['token'], test_channel['channel_id'],
+                         '100% done')
+    message.message_send(test_user['token'], test_channel['channel_id'],
+                         '1000 done')
+
+    assert len(other.search(test_user['token'], '0% d')['messages']) == 1
+    assert len(other.search(test_user['token'], '0_ d')['messages']) == 0
+
+
+def test_search_edited_message(reset, test_user, new_channel):
+    '''Test that edited and removed messages are searched by their current
+    text'''
+
+    test_channel = new_channel(test_user, 'Channel')
+    msg = message.message_send(test_user['token'], test_channel['channel_id'],
+                               'Before the edit')
+
+    message.message_edit(test_user['token'], msg['message_id'],
+                         'After the edit')
+    assert not other.search(test_user['token'], 'before')['messages']
+    assert len(other.search(test_user['token'], 'after')['messages']) == 1
+
+    message.message_remove(test_user['token'], msg['message_id'])
+    assert not other.search(test_user['token'], 'after')['messages']
+
+
+def test_search_reused_message_id(reset, test_user, test_channel):
+    '''Test that a message is found when it reuses the id of a removed one'''
+
+    message.message_send(test_user['token'], test_channel['channel_id'],
+                         'First')
+    other.search(test_user['token'], 'first')
+
+    second = message.message_send(test_user['token'],
+                                  test_channel['channel_id'], 'Second')
+    message.message_remove(test_user['token'], second['message_id'])
+    message.message_send(test_user['token'], test_channel['channel_id'],
+                         'Banana split')
+
+    results = other.search(test_user['token'], 'banana')['messages']
+    assert [msg['message'] for msg in results] == ['Banana split']
@@ -1,8 +1,12 @@
 '''System tests for users_all'''
 import pytest
+import admin
 import other
 import user
-from error import AccessError
+from error import AccessError, InputError
+from slackr import db
+from slackr.user_directory import USER_DIRECTORY
+from slackr.utils.constants import PERMISSIONS
 
 
 def test_users_all_single_user(reset, test_user):
@@ -33,3 +37,87 @@ def test_users_all_invalid_token(reset, invalid_token):
 
     with pytest.raises(AccessError):
         other.users_all(invalid_token)
+
+
+def test_users_all_pages(reset, new_user):
+    '''Test that following the cursor returns every user once, in order'''
+
+    users = [new_user(f'user_{i}@email.com') for i in range(5)]
+
+    pages = []
+    cursor = None
+    while cursor != -1:
+        page = other.users_all(users[0]['token'], cursor, 2)
+        pages.append([profile['u_id'] for profile in page['users']])
+        cursor = page['cursor']
+
+    assert pages == [[users[0]['u_id'], users[1]['u_id']],
+                     [users[2]['u_id'], users[3]['u_id']],
+                     [users[4]['u_id']]]
+
+
+def test_users_all_invalid_limit(reset, test_user):
+    '''Test that a limit outside the page bounds raises an InputError'''
+
+    with pytest.raises(InputError):
+        other.users_all(test_user['token'], None, 0)
+
+    with pytest.raises(InputError):
+        other.users_all(test_user['token'], 'start', 2)
+
+
+def test_users_all_no_password(reset, test_user):
+    '''Test that the directory never loads the password column'''
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    USER_DIRECTORY.clear()
+    db.event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        other.users_all(test_user['token'])
+    finally:
+        db.event.remove(db.engine, 'before_cursor_execute', record)
+
+    # Authenticating loads the caller, but the directory excludes reserved
+    # users in SQL
+    directory = [statement for statement in statements
+                 if 'NOT IN' in statement]
+    assert len(directory) == 1
+    assert 'handle_str' in directory[0]
+    assert 'password' not in directory[0]
+
+
+def test_users_all_invalidated(reset, test_user, new_user):
+    '''Test that profile, permission and user changes reach the directory'''
+
+    member = new_user('member@email.com')
+    other.users_all(test_user['token'])
+
+    user.user_profile_setname(member['token'], 'New', 'Name')
+    profiles = other.users_all(test_user['token'])['users']
+    assert profiles[1]['name_first'] == 'New'
+
+    misses = USER_DIRECTORY.misses
+    admin.admin_userpermission_change(test_user['token'], member['u_id'],
+                                      PERMISSIONS['owner'])
+    other.users_all(test_user['token'])
+    assert USER_DIRECTORY.misses == misses + 1
+
+    admin.admin_user_remove(test_user['token'], member['u_id'])
+    assert [profile['u_id'] for profile in other.users_all(
+        test_user['token'])['users']] == [test_user['u_id']]
+
+
+def test_users_all_cached(reset, test_user):
+    '''Test that reading an unchanged directory does not load it again'''
+
+    other.users_all(test_user['token'])
+    misses = USER_DIRECTORY.misses
+
+    other.users_all(test_user['token'])
+    other.users_all_serialized(test_user['token'])
+
+    assert USER_DIRECTORY.misses == misses
@@ -0,0 +1,41 @@
+'''System tests for the permission resolver'''
+import channel
+from permissions import resolve
+
+
+def test_resolve_owner(reset, test_user, test_channel):
+    '''Test that the creator of a channel is a member and an owner'''
+    perms = resolve(test_user['u_id'], test_channel['channel_id'])
+
+    assert perms.exists
+    assert perms.is_member
+    assert perms.is_owner
+    assert perms.is_admin
+    assert not perms.is_bot
+
+
+def test_resolve_member(reset, test_user, test_channel, new_user):
+    '''Test the permissions of a member who does not own the channel'''
+    member = new_user(email='member@email.com')
+
+    perms = resolve(member['u_id'], test_channel['channel_id'])
+    assert perms.exists
+    assert not perms.is_member
+
+    channel.channel_join(member['token'], test_channel['channel_id'])
+
+    perms = resolve(member['u_id'], test_channel['channel_id'])
+    assert perms.is_member
+    assert not perms.is_owner
+    assert not perms.is_global_owner
+    assert not perms.is_admin
+
+
+def test_resolve_invalid_channel(reset, test_user):
+    '''Test that a channel that does not exist is reported as such'''
+    perms = resolve(test_user['u_id'], 1)
+
+    assert not perms.exists
+    assert not perms.is_member
+    assert perms.is_global_owner
+    assert perms.is_admin
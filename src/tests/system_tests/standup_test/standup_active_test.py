@@ -7,6 +7,8 @@ from time import sleep
 import pytest
 from error import InputError, AccessError
 import standup
+from slackr.models.hangman import Hangman
+from slackr.models.standup import Standup
 
 NoneType = type(None)
 
@@ -91,3 +93,17 @@ def test_active_invalidtoken(reset, test_channel, invalid_token):
 
     with pytest.raises(AccessError):
         standup.standup_active(invalid_token, test_channel['channel_id'])
+
+
+def test_active_no_state(reset, test_channel, test_user):
+    '''
+    Testing that a new channel has no standup or hangman rows, and that
+    checking for a standup does not create one.
+    '''
+
+    standup_return = standup.standup_active(test_user['token'],
+                                            test_channel['channel_id'])
+
+    assert standup_return == {'is_active': False, 'time_finish': None}
+    assert Standup.query.count() == 0
+    assert Hangman.query.count() == 0
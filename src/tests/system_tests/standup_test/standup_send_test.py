@@ -8,6 +8,7 @@ from error import InputError, AccessError
 import standup
 import auth
 import channel
+import admin
 
 # =====================================================
 # ========== TESTING STANDUP SEND FUNCTION ============
@@ -130,3 +131,79 @@ def test_standupsend_invalid_token(reset, new_channel, new_user):
 
     with pytest.raises(AccessError):
         standup.standup_send(first_user['token'], first_channel['channel_id'], 'Message')
+
+
+def test_standupsend_summary_order(reset, test_channel, test_user, new_user):
+    '''
+    Testing that the standup summary lists every entry in the order sent.
+    '''
+
+    second_user = new_user(email='second@email.com')
+    channel.channel_join(second_user['token'], test_channel['channel_id'])
+
+    standup.standup_start(test_user['token'], test_channel['channel_id'], 1)
+
+    standup.standup_send(test_user['token'], test_channel['channel_id'], 'First')
+    standup.standup_send(second_user['token'], test_channel['channel_id'], 'Second')
+    standup.standup_send(test_user['token'], test_channel['channel_id'], 'Third')
+
+    sleep(1.1)
+
+    message_list = channel.channel_messages(test_user['token'], test_channel['channel_id'], 0)
+
+    summary = message_list['messages'][0]['message'].split('\n')
+    assert [line.split(': ')[1] for line in summary] == ['First', 'Second', 'Third']
+
+
+def test_standupsend_summary_split(reset, test_channel, test_user):
+    '''
+    Testing that a summary longer than 1,000 characters is sent as several
+    messages that each fit within the limit.
+    '''
+
+    standup.standup_start(test_user['token'], test_channel['channel_id'], 1)
+
+    for _ in range(3):
+        standup.standup_send(test_user['token'], test_channel['channel_id'], 'i' * 600)
+
+    sleep(1.1)
+
+    message_list = channel.channel_messages(test_user['token'], test_channel['channel_id'], 0)
+
+    assert len(message_list['messages']) == 3
+    for msg in message_list['messages']:
+        assert len(msg['message']) <= 1000
+
+
+def test_standupsend_stale_timer(reset, test_channel, test_user):
+    '''
+    Testing that the timer of an earlier standup does not stop a later one.
+    '''
+
+    started = standup.standup_start(test_user['token'], test_channel['channel_id'], 60)
+
+    standup.stop_standup(test_channel['channel_id'], time_finish=started['time_finish'] - 1)
+    assert standup.standup_active(test_user['token'], test_channel['channel_id'])['is_active']
+
+    standup.stop_standup(test_channel['channel_id'], time_finish=started['time_finish'])
+    assert not standup.standup_active(test_user['token'], test_channel['channel_id'])['is_active']
+
+
+def test_standupsend_starter_removed(reset, test_channel, test_user, new_user):
+    '''
+    Testing that a standup whose starter was removed still sends its summary.
+    '''
+
+    second_user = new_user(email='second@email.com')
+    channel.channel_join(second_user['token'], test_channel['channel_id'])
+
+    standup.standup_start(second_user['token'], test_channel['channel_id'], 60)
+    standup.standup_send(test_user['token'], test_channel['channel_id'], 'Entry')
+
+    admin.admin_user_remove(test_user['token'], second_user['u_id'])
+    standup.stop_standup(test_channel['channel_id'])
+
+    message_list = channel.channel_messages(test_user['token'], test_channel['channel_id'], 0)
+    assert [msg['u_id'] for msg in message_list['messages']] == [test_user['u_id']]
+
+    standup.standup_start(test_user['token'], test_channel['channel_id'], 60)
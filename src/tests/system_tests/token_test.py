@@ -3,9 +3,10 @@ from datetime import datetime, timedelta
 from time import sleep
 import pytest
 import jwt
+from admin import admin_user_remove
 from auth import auth_logout
 from error import AccessError
-from token_validation import decode_token, SECRET
+from token_validation import decode_token, SECRET, TOKEN_CACHE
 from workspace import workspace_reset
 
 
@@ -67,3 +68,31 @@ def test_userless_token(reset, new_user):
     token = jwt.encode(payload, SECRET, algorithm='HS256').decode('utf-8')
     with pytest.raises(AccessError):
         decode_token(token)
+
+
+def test_cached_token_hit(reset, new_user):
+    '''Test that decoding a token again is answered by the token cache'''
+    user = new_user()
+    decode_token(user['token'])
+    hits = TOKEN_CACHE.stats()['hits']
+    assert decode_token(user['token'])['u_id'] == user['u_id']
+    assert TOKEN_CACHE.stats()['hits'] == hits + 1
+
+
+def test_cached_token_logout(reset, new_user):
+    '''Test that a cached token is invalid after logging out'''
+    user = new_user()
+    decode_token(user['token'])
+    auth_logout(user['token'])
+    with pytest.raises(AccessError):
+        decode_token(user['token'])
+
+
+def test_cached_token_user_removed(reset, new_user):
+    '''Test that a cached token is invalid after its user is removed'''
+    admin = new_user(email='admin@email.com')
+    user = new_user(email='user@email.com')
+    decode_token(user['token'])
+    admin_user_remove(admin['token'], user['u_id'])
+    with pytest.raises(AccessError):
+        decode_token(user['token'])
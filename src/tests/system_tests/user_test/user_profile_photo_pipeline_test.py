@@ -0,0 +1,269 @@
+'''
+System tests for downloading, cropping and rendering profile photos, using a
+local HTTP server in place of the image host.
+'''
+
+import io
+
+import eventlet
+import eventlet.wsgi
+import pytest
+from PIL import Image
+
+import user
+from error import AccessError, InputError
+from slackr import profile_photos
+from slackr.utils.constants import PHOTO_SIZES
+
+# Red on the left half and blue on the right half
+WIDTH, HEIGHT = 4000, 3000
+
+
+def jpeg(width=WIDTH, height=HEIGHT):
+    '''Encode a test image as a JPEG'''
+    img = Image.new('RGB', (width, height), (255, 0, 0))
+    img.paste((0, 0, 255), (width // 2, 0, width, height))
+    body = io.BytesIO()
+    img.save(body, 'JPEG')
+    return body.getvalue()
+
+
+class ImageHost:
+    '''A WSGI app serving the bodies in `images`, recording the requests'''
+    def __init__(self, images):
+        self.images = images
+        self.requests = []
+        self.url = None
+
+    def __call__(self, environ, start_response):
+        path = environ['PATH_INFO']
+        self.requests.append(path)
+        body = self.images.get(path)
+        if body is None:
+            start_response('404 Not Found', [])
+            return [b'']
+
+        # Without a Content-Length the body is sent in chunks
+        headers = []
+        if not path.startswith('/unsized'):
+            headers.append(('Content-Length', str(len(body))))
+        start_response('200 OK', headers)
+        return [body[i:i + 4096] for i in range(0, len(body), 4096)]
+
+
+@pytest.fixture
+def image_host():
+    '''A local HTTP server of test images'''
+    host = ImageHost({'/photo.jpg': jpeg(), '/unsized.jpg': jpeg()})
+    listener = eventlet.listen(('127.0.0.1', 0))
+    server = eventlet.spawn(eventlet.wsgi.server,
+                            listener,
+                            host,
+                            log_output=False)
+    host.url = f'http://127.0.0.1:{listener.getsockname()[1]}'
+    yield host
+    server.kill()
+    listener.close()
+
+
+@pytest.fixture
+def image_dir(tmp_path, monkeypatch):
+    '''Write rendered images to a temporary directory'''
+    monkeypatch.setattr(profile_photos, 'PROFILE_IMAGE_DIR', str(tmp_path))
+    return tmp_path
+
+
+def test_uploadphoto_renders_sizes(reset, test_user, image_host, image_dir):
+    '''Test that the crop is written as a JPEG and a WebP at every size'''
+
+    user.user_profile_uploadphoto(test_user['token'],
+                                  f'{image_host.url}/photo.jpg',
+                                  (0, 0, 1600, 1200))
+
+    profile = user.user_profile(test_user['token'], test_user['u_id'])['user']
+    img_id = profile['profile_img_url'].rsplit('/', 1)[-1][:-len('.jpg')]
+
+    with Image.open(image_dir / f'{img_id}.jpg') as img:
+        assert img.size == (512, 384)
+    for size in PHOTO_SIZES:
+        with Image.open(image_dir / f'{img_id}_{size}.webp') as img:
+            assert img.format == 'WEBP'
+            assert img.size == (size, size * 3 // 4)
+
+
+def test_uploadphoto_profile_downscaled(reset, test_user, image_host,
+                                        image_dir):
+    '''Test that the profile image is scaled down to the largest size, not
+    kept at the resolution of the crop'''
+
+    user.user_profile_uploadphoto(test_user['token'],
+                                  f'{image_host.url}/photo.jpg',
+                                  (0, 0, WIDTH, HEIGHT))
+
+    profile = user.user_profile(test_user['token'], test_user['u_id'])['user']
+    img_id = profile['profile_img_url'].rsplit('/', 1)[-1][:-len('.jpg')]
+    with Image.open(image_dir / f'{img_id}.jpg') as img:
+        assert max(img.size) == PHOTO_SIZES[0]
+        assert img.size == (PHOTO_SIZES[0], PHOTO_SIZES[0] * 3 // 4)
+
+
+def raw_host(response):
+    '''A local server that answers every connection with the same raw bytes,
+    for responses eventlet.wsgi will not send'''
+    listener = eventlet.listen(('127.0.0.1', 0))
+
+    def serve():
+        while True:
+            conn, _ = listener.accept()
+            conn.recv(65536)
+            conn.sendall(response)
+            conn.close()
+
+    return listener, eventlet.spawn(serve)
+
+
+def test_uploadphoto_malformed_length(reset, test_user, image_dir,
+                                      monkeypatch):
+    '''Test that a malformed Content-Length is ignored in favour of the cap
+    on the body'''
+
+    listener, server = raw_host(b'HTTP/1.1 200 OK\r\n'
+                                b'Content-Length: many\r\n'
+                                b'Connection: close\r\n\r\n' +
+                                jpeg(400, 300))
+    url = f'http://127.0.0.1:{listener.getsockname()[1]}/photo.jpg'
+
+    try:
+        user.user_profile_uploadphoto(test_user['token'], url,
+                                      (0, 0, 200, 200))
+
+        monkeypatch.setattr(profile_photos, 'PHOTO_MAX_BYTES', 1024)
+        with pytest.raises(InputError):
+            user.user_profile_uploadphoto(test_user['token'], url,
+                                          (0, 0, 200, 200))
+    finally:
+        server.kill()
+        listener.close()
+
+
+def test_uploadphoto_one_request(reset, test_user, image_host, image_dir):
+    '''Test that the image is downloaded once'''
+
+    user.user_profile_uploadphoto(test_user['token'],
+                                  f'{image_host.url}/photo.jpg',
+                                  (0, 0, 200, 200))
+    assert image_host.requests == ['/photo.jpg']
+
+
+def test_crop_draft(reset):
+    '''Test that a large crop is decoded at a reduced scale and still covers
+    the area asked for'''
+
+    img = profile_photos.crop(jpeg(), (WIDTH // 4, 0, WIDTH, HEIGHT))
+
+    assert PHOTO_SIZES[0] <= img.size[0] < WIDTH * 3 // 4
+    # A third red, two thirds blue
+    red = img.getpixel((img.size[0] // 6, img.size[1] // 2))
+    blue = img.getpixel((img.size[0] * 5 // 6, img.size[1] // 2))
+    assert red[0] > 200 and red[2] < 50
+    assert blue[2] > 200 and blue[0] < 50
+
+
+def test_crop_small_full_scale(reset):
+    '''Test that a crop smaller than the largest size is decoded in full'''
+
+    img = profile_photos.crop(jpeg(), (1900, 0, 2100, 100))
+
+    assert img.size == (200, 100)
+    assert img.getpixel((50, 50))[0] > 200
+    assert img.getpixel((150, 50))[2] > 200
+
+
+def test_uploadphoto_too_large(reset, test_user, image_host, image_dir,
+                               monkeypatch):
+    '''Test that an image over the byte limit is refused, with or without a
+    Content-Length'''
+
+    monkeypatch.setattr(profile_photos, 'PHOTO_MAX_BYTES', 1024)
+    for path in ('/photo.jpg', '/unsized.jpg'):
+        with pytest.raises(InputError):
+            user.user_profile_uploadphoto(test_user['token'],
+                                          f'{image_host.url}{path}',
+                                          (0, 0, 200, 200))
+    assert not list(image_dir.iterdir())
+
+
+def test_uploadphoto_too_many_pixels(reset, test_user, image_host, image_dir,
+                                     monkeypatch):
+    '''Test that an image with too many pixels is refused before decoding'''
+
+    monkeypatch.setattr(profile_photos, 'PHOTO_MAX_PIXELS', WIDTH * HEIGHT - 1)
+    with pytest.raises(InputError):
+        user.user_profile_uploadphoto(test_user['token'],
+                                      f'{image_host.url}/photo.jpg',
+                                      (0, 0, 200, 200))
+
+
+def test_uploadphoto_missing(reset, test_user, image_host, image_dir):
+    '''Test that a URL without an image raises an InputError'''
+
+    with pytest.raises(InputError):
+        user.user_profile_uploadphoto(test_user['token'],
+                                      f'{image_host.url}/missing.jpg',
+                                      (0, 0, 200, 200))
+
+
+def test_uploadphoto_not_jpeg(reset, test_user, image_host, image_dir):
+    '''Test that a body that is not a JPEG raises an InputError'''
+
+    body = io.BytesIO()
+    Image.new('RGB', (300, 300)).save(body, 'PNG')
+    image_host.images['/disguised.jpg'] = body.getvalue()
+
+    with pytest.raises(InputError):
+        user.user_profile_uploadphoto(test_user['token'],
+                                      f'{image_host.url}/disguised.jpg',
+                                      (0, 0, 200, 200))
+
+
+@pytest.mark.parametrize('area', [(0, 0, WIDTH + 1, 200),
+                                  (0, 0, 200, HEIGHT + 1),
+                                  (200, 0, 0, 200), (0, 0, 0, 200)])
+def test_uploadphoto_invalid_area(reset, test_user, image_host, image_dir,
+                                  area):
+    '''Test that a crop outside the image or of no area raises an
+    InputError'''
+
+    with pytest.raises(InputError):
+        user.user_profile_uploadphoto(test_user['token'],
+                                      f'{image_host.url}/photo.jpg', area)
+
+
+def test_uploadphoto_served(reset, test_user, image_host, image_dir,
+                            monkeypatch):
+    '''Test that the rendered sizes are served under /imgurl'''
+
+    from slackr import APP  # pylint: disable=import-outside-toplevel
+    monkeypatch.setattr('slackr.routes.img_url_route.PROFILE_IMAGE_DIR',
+                        str(image_dir))
+
+    user.user_profile_uploadphoto(test_user['token'],
+                                  f'{image_host.url}/photo.jpg',
+                                  (0, 0, 200, 200))
+    profile = user.user_profile(test_user['token'], test_user['u_id'])['user']
+    img_id = profile['profile_img_url'].rsplit('/', 1)[-1][:-len('.jpg')]
+
+    response = APP.test_client().get(f'/imgurl/{img_id}_64.webp')
+    assert response.status_code == 200
+    assert response.data[8:12] == b'WEBP'
+
+
+def test_uploadphoto_pipeline_invalid_token(reset, invalid_token, image_host,
+                                            image_dir):
+    '''Test that an invalid token raises an AccessError before any download'''
+
+    with pytest.raises(AccessError):
+        user.user_profile_uploadphoto(invalid_token,
+                                      f'{image_host.url}/photo.jpg',
+                                      (0, 0, 200, 200))
+    assert not image_host.requests
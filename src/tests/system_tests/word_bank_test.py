@@ -0,0 +1,52 @@
+'''System tests for the hangman word bank'''
+from slackr.models.hangman import Hangman
+from slackr.word_bank import WORD_BANK, WordBank, difficulty, is_valid
+
+
+def test_bundled_words():
+    '''Test that the bundled corpus is loaded and every word is playable'''
+
+    assert len(WORD_BANK) > 500
+    assert is_valid(WORD_BANK.sample())
+
+
+def test_sample_index():
+    '''Test that words are sampled by length and difficulty'''
+
+    bank = WordBank(['cat', 'jazz', 'zebra', 'quixotic'])
+
+    assert bank.sample(length=4) == 'jazz'
+    assert bank.sample(level='easy') == 'cat'
+    assert bank.sample(length=8, level=difficulty('quixotic')) == 'quixotic'
+    assert bank.sample(length=20) is None
+
+
+def test_add_skips_unplayable():
+    '''Test that words with other characters or seen before are skipped'''
+
+    bank = WordBank(['apple'])
+
+    assert bank.add(['apple', 'two words', 'café', 'x', 'banana',
+                     'banana']) == 1
+    assert len(bank) == 2
+
+
+def test_refresh(monkeypatch):
+    '''Test that playable titles from Wikiquote are added'''
+
+    bank = WordBank(['apple'])
+    monkeypatch.setattr('slackr.word_bank.wikiquote.random_titles',
+                        lambda lang: ['Socrates', 'Albert Einstein'])
+
+    assert bank.refresh() == 1
+    assert bank.sample(length=8) == 'Socrates'
+
+
+def test_dashed():
+    '''Test that unguessed letters are shown as dashes'''
+
+    game = Hangman(word='Banana', guesses='a')
+    assert game.get_dashed() == '_ a_ a_ a'
+
+    game.guesses = 'abn'
+    assert game.get_dashed() == 'Banana'